@@ -1,14 +1,18 @@
 # ai_processor.py
 import json
 import os
-import httpx
-from openai import OpenAI
-from random import randint, sample, choice
-from flask import current_app
+from flask import current_app, has_app_context
 
+from llm_cache import cached_chat_completion, stream_chat_completion
+from openai_client import get_client_manager
+from prompt_budget import prepare_product_context, product_budgets
+from warm_paths import rank_by_warm_paths
 
-def configure_openai():
-    """Initialize OpenAI client"""
+_dotenv_checked = False
+
+
+def resolve_openai_api_key():
+    """Find the OpenAI API key in the app config, the environment or a .env file"""
     # Try multiple ways to get the API key
     api_key = None
     
@@ -22,8 +26,10 @@ def configure_openai():
     if not api_key or api_key == 'your-openai-api-key-here':
         api_key = os.environ.get('OPENAI_API_KEY')
     
-    # 3. If still not found, check for a .env file in the current directory
-    if not api_key:
+    # 3. If still not found, check for a .env file in the current directory (once per process)
+    global _dotenv_checked
+    if not api_key and not _dotenv_checked:
+        _dotenv_checked = True
         try:
             from dotenv import load_dotenv
             # Try loading from .env file in current directory
@@ -35,26 +41,37 @@ def configure_openai():
     # Print debug info
     if not api_key or api_key == 'your-openai-api-key-here':
         print("WARNING: No valid OpenAI API key found! Using fallback methods.")
-        
-    # Create a custom HTTP client without proxies
-    http_client = httpx.Client()
-    
-    # Create the OpenAI client with the custom HTTP client
-    return OpenAI(
-        api_key=api_key,
-        http_client=http_client
-    )
+    return api_key
 
-def generate_icp_and_personas(product_description):
-    """Generate Ideal Customer Profile and Buyer/User Personas using AI"""
-    # Use the configure_openai function to create the client
-    client = configure_openai()
-    
-    prompt = f"""
+def resolve_openai_base_url():
+    """Optional API base URL (e.g. a local fake server for benchmarks)"""
+    try:
+        return current_app.config.get('OPENAI_BASE_URL') or os.environ.get('OPENAI_BASE_URL') or None
+    except RuntimeError:
+        return os.environ.get('OPENAI_BASE_URL') or None
+
+def openai_client_manager():
+    """The process-wide OpenAI client manager, configured from the app on first use"""
+    try:
+        config = current_app.config
+    except RuntimeError:
+        config = {}
+    return get_client_manager(config)
+
+def configure_openai():
+    """Shared OpenAI client (pooled keep-alive connections, built on first use)"""
+    return openai_client_manager().get_client(resolve_openai_api_key(), resolve_openai_base_url())
+
+def build_icp_prompt(product_description):
+    """Prompt asking GPT for the ICP and personas as JSON (description compacted to its token budget)"""
+    icp_budget, _ = product_budgets()
+    product_context = prepare_product_context(product_description, icp_budget, 'icp',
+                                              current_app.config.get('GPT_MODEL', 'gpt-4'))
+    return f"""
     Based on this product description, generate an Ideal Customer Profile (ICP) and Buyer/User Personas:
     
     PRODUCT DESCRIPTION:
-    {product_description}
+    {product_context}
     
     Please format your response as a JSON with the following structure:
     {{
@@ -78,131 +95,115 @@ def generate_icp_and_personas(product_description):
         }}
     }}
     """
+
+def parse_icp_response(result_text):
+    """ICP JSON from the model's reply, or default values if it can't be parsed"""
+    result_text = result_text.strip()
     
+    # Extract JSON from the response
     try:
-        response = client.chat.completions.create(
-            model=current_app.config['GPT_MODEL'],
-            messages=[{"role": "user", "content": prompt}],
-            temperature=current_app.config['TEMPERATURE']
-        )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        # Extract JSON from the response
-        try:
-            import re
-            json_match = re.search(r'{.*}', result_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                return json.loads(json_str)
-            return json.loads(result_text)
-        except Exception as e:
-            print(f"Error parsing JSON: {e}")
-            return {
-                "icp": {
-                    "industry": "Technology",
-                    "company_size": "50-1000 employees",
-                    "geography": "North America",
-                    "other_criteria": ["B2B focused", "Growth stage"]
-                },
-                "buyer_persona": {
-                    "title": "VP of Sales",
-                    "role": "Decision maker",
-                    "pain_points": ["Low conversion rates", "Inefficient sales process"],
-                    "search_terms": "VP Sales OR Head of Sales OR Sales Director"
-                },
-                "user_persona": {
-                    "title": "Sales Representative",
-                    "role": "End user",
-                    "pain_points": ["Cold outreach difficulties", "Low response rates"],
-                    "search_terms": "Sales Representative OR Account Executive OR BDR"
-                }
+        import re
+        json_match = re.search(r'{.*}', result_text, re.DOTALL)
+        if json_match:
+            json_str = json_match.group(0)
+            return json.loads(json_str)
+        return json.loads(result_text)
+    except Exception as e:
+        print(f"Error parsing JSON: {e}")
+        return {
+            "icp": {
+                "industry": "Technology",
+                "company_size": "50-1000 employees",
+                "geography": "North America",
+                "other_criteria": ["B2B focused", "Growth stage"]
+            },
+            "buyer_persona": {
+                "title": "VP of Sales",
+                "role": "Decision maker",
+                "pain_points": ["Low conversion rates", "Inefficient sales process"],
+                "search_terms": "VP Sales OR Head of Sales OR Sales Director"
+            },
+            "user_persona": {
+                "title": "Sales Representative",
+                "role": "End user",
+                "pain_points": ["Cold outreach difficulties", "Low response rates"],
+                "search_terms": "Sales Representative OR Account Executive OR BDR"
             }
+        }
+
+def generate_icp_and_personas(product_description, regenerate=False):
+    """Generate Ideal Customer Profile and Buyer/User Personas using AI (cached unless `regenerate`)"""
+    # Use the configure_openai function to create the client
+    client = configure_openai()
+    
+    try:
+        content, cached = cached_chat_completion(client, current_app.config['GPT_MODEL'],
+                                                 build_icp_prompt(product_description),
+                                                 temperature=current_app.config['TEMPERATURE'],
+                                                 regenerate=regenerate)
+        if cached:
+            print("Using cached ICP and personas for this product description")
+        return parse_icp_response(content)
     except Exception as e:
         print(f"Error generating ICP: {e}")
         return None
 
-def find_mutual_connections(profile_list, trusted_network):
+def stream_icp_and_personas(product_description, regenerate=False):
+    """
+    Streaming generate_icp_and_personas: yields ('token', text) as the reply
+    arrives, then ('done', icp_data), where icp_data is None on failure.
+    """
+    try:
+        client = configure_openai()
+        parts = []
+        for text in stream_chat_completion(client, current_app.config['GPT_MODEL'],
+                                           build_icp_prompt(product_description),
+                                           temperature=current_app.config['TEMPERATURE'],
+                                           regenerate=regenerate):
+            parts.append(text)
+            yield 'token', text
+        icp_data = parse_icp_response(''.join(parts))
+    except Exception as e:
+        print(f"Error generating ICP: {e}")
+        icp_data = None
+    yield 'done', icp_data
+
+def find_mutual_connections(profile_list, trusted_network, graph=None):
     """Find mutual connections between profiles and trusted network"""
-    # This would require advanced LinkedIn scraping or use of the LinkedIn API
-    # For simplification, we'll simulate finding mutual connections
-    
-    # Create a dictionary mapping connection levels to numbers (for sorting later)
-    connection_level_map = {
-        "1st": 1,
-        "2nd": 2,
-        "3rd+": 3
-    }
-    
-    # Process each profile
+    # Normalize connection levels first
     for profile in profile_list:
-        # Get the connection level from the profile
         raw_connection = profile.get("connection_level", "3rd+")
-        
-        # Normalize the connection level text
         connection_level = "1st" if "1st" in raw_connection else "2nd" if "2nd" in raw_connection else "3rd+"
         profile["connection_level"] = connection_level
-        
-        # Set numeric connection level for sorting
-        profile["connection_level_numeric"] = connection_level_map.get(connection_level, 3)
-        
-        # For 1st connections, no mutual connections needed
-        if connection_level == "1st":
-            profile["mutual_connections"] = []
-            profile["tnl_connection"] = False
-            continue
-            
-        # For 2nd connections, find or simulate mutual connections
-        if connection_level == "2nd" and trusted_network:
-            # In a real implementation, this would involve scraping LinkedIn
-            # Only show trusted network connections (no random connections)
-            if trusted_network:
-                mutual_contacts = []
-                
-                # Determine how many TNL connections to show (1-3)
-                num_tnl = randint(1, min(3, len(trusted_network)))
-                
-                # Select random TNL contacts without duplication
-                selected_indices = set()
-                for _ in range(num_tnl):
-                    if len(selected_indices) >= len(trusted_network):
-                        break
-                    
-                    # Find a new random index not already selected
-                    while True:
-                        idx = randint(0, len(trusted_network) - 1)
-                        if idx not in selected_indices:
-                            selected_indices.add(idx)
-                            break
-                    
-                    mutual = trusted_network[idx]
-                    mutual_contacts.append({
-                        "name": mutual["name"],
-                        "in_tnl": True,
-                        "tnl_score": mutual.get("trust_score", 5)
-                    })
-                
-                profile["mutual_connections"] = mutual_contacts
-                profile["tnl_connection"] = len(mutual_contacts) > 0
-            else:
-                profile["mutual_connections"] = []
-                profile["tnl_connection"] = False
-        else:
-            profile["mutual_connections"] = []
-            profile["tnl_connection"] = False
     
-    # Sort by: 1) TNL connection, 2) Connection level, 3) Number of mutual connections
+    # Match profiles to the TNL and find the cheapest intro paths through the
+    # warm-path graph. Pass a long-lived graph to only redo what changed.
+    rank_by_warm_paths(profile_list, trusted_network, graph)
+    
+    # Sort by: 1) TNL connection, 2) Warmest path cost (cold last),
+    # 3) Number of mutual connections; ties keep the search order
     return sorted(
         profile_list,
         key=lambda p: (
             not p.get("tnl_connection", False),
-            p.get("connection_level_numeric", 3),
+            p["path_cost"] if p.get("path_cost") is not None else float("inf"),
             -len(p.get("mutual_connections", []))
         )
     )
 
-def generate_outreach_message(profile, product_description=None, connection_path=None):
-    """Generate a hyper-personalized outreach message based on the profile"""
+def best_connection_path(profile):
+    """
+    The best TNL path, else the first mutual connection, else None.
+    mutual_connections is already best first, so this is the contact the
+    ranking and the intro request both use.
+    """
+    if not profile.get('mutual_connections'):
+        return None
+    tnl_connections = [c for c in profile['mutual_connections'] if c.get('in_tnl', False)]
+    return tnl_connections[0] if tnl_connections else profile['mutual_connections'][0]
+
+def build_outreach_request(profile, product_description=None, connection_path=None):
+    """Work out the message type and build the GPT prompt for one profile"""
     # Extract name
     full_name = profile.get('name', '')
     first_name = full_name.split(' ')[0] if full_name else "there"
@@ -223,13 +224,24 @@ def generate_outreach_message(profile, product_description=None, connection_path
         company = ""
     
     # Build the connection path text
+    connection_path = connection_path or best_connection_path(profile)
     connection_text = ""
     if connection_path:
-        if connection_path.get("in_tnl", False):
+        if connection_path.get("match") == "company":
+            # Not a shared connection: a TNL contact with the prospect's company in their history
+            connection_text = (f"{connection_path['name']}, who I work closely with, worked at "
+                               f"{connection_path.get('via') or company}.")
+        elif connection_path.get("in_tnl", False):
             connection_text = f"I noticed we're both connected with {connection_path['name']}, who I work closely with."
         else:
             connection_text = f"I noticed we're both connected with {connection_path['name']}."
     
+    # Compact product summary within the per-message token budget
+    # Defaults outside the app, e.g. BulkOutreachGenerator run from the command line
+    _, outreach_budget = product_budgets()
+    model = current_app.config.get('GPT_MODEL', 'gpt-4') if has_app_context() else 'gpt-4'
+    product_context = prepare_product_context(product_description, outreach_budget, 'outreach', model)
+    
     # Determine message type
     if profile.get("connection_level") == "1st":
         message_type = "direct_existing"
@@ -238,13 +250,8 @@ def generate_outreach_message(profile, product_description=None, connection_path
     else:
         message_type = "cold_outreach"
     
-    # Try to use OpenAI for message generation
-    try:
-        # Use the configure_openai function to create the client
-        client = configure_openai()
-        
-        # Create base prompt with profile research instructions
-        base_prompt = f"""
+    # Create base prompt with profile research instructions
+    base_prompt = f"""
         Create a hyper-personalized LinkedIn message for {full_name}, who works as {role} {f"at {company}" if company else ""}.
         
         PROFILE CONTEXT:
@@ -255,7 +262,7 @@ def generate_outreach_message(profile, product_description=None, connection_path
         - Mutual Connections: {len(profile.get('mutual_connections', [])) if profile.get('mutual_connections') else 0}
         
         PRODUCT CONTEXT:
-        {product_description[:500] if product_description else ""}
+        {product_context}
         
         CONNECTION CONTEXT:
         {connection_text if connection_text else "No direct mutual connections."}
@@ -269,59 +276,113 @@ def generate_outreach_message(profile, product_description=None, connection_path
         6. Avoid generic phrases and obvious templated language
         7. Keep it concise and impactful
         """
-        
-        # Add message type specific instructions
-        if message_type == "direct_existing":
-            prompt = base_prompt + """
+    
+    # Add message type specific instructions
+    if message_type == "direct_existing":
+        prompt = base_prompt + """
             ADDITIONAL REQUIREMENTS:
             1. Acknowledge the existing connection warmly
             2. Reference any past interactions if available
             3. Make a clear but soft ask for a conversation
             4. Keep it under 2000 characters
             """
-        elif message_type == "intro_request":
-            connection_name = profile["mutual_connections"][0]["name"] if profile["mutual_connections"] else "our mutual connection"
-            prompt = base_prompt + f"""
+    elif message_type == "intro_request":
+        connection_name = connection_path["name"] if connection_path else "our mutual connection"
+        if connection_path and connection_path.get("match") == "company":
+            relationship = f"who worked at {connection_path.get('via') or company} (not a shared connection)"
+        else:
+            relationship = f"who is connected with {full_name}"
+        prompt = base_prompt + f"""
             ADDITIONAL REQUIREMENTS:
-            1. Write to {connection_name} requesting an introduction
+            1. Write to {connection_name}, {relationship}, requesting an introduction
             2. Explain clearly why connecting with {full_name} would be valuable
             3. Make it easy for them to make the introduction
             4. Keep it under 2000 characters
             """
-        else:
-            prompt = base_prompt + """
+    else:
+        prompt = base_prompt + """
             ADDITIONAL REQUIREMENTS:
             1. Create a compelling reason for connecting
             2. Make the value proposition clear but subtle
             3. Keep it under 300 characters (LinkedIn connection request limit)
             """
+    
+    return {
+        "prompt": prompt,
+        "type": message_type,
+        "first_name": first_name,
+        "role": role,
+        "company": company,
+        "recipient": full_name if message_type != "intro_request" else connection_path["name"] if connection_path else "Mutual Connection"
+    }
+
+def clean_generated_message(message, message_type):
+    """Strip wrapping quotes and enforce the connection-request length limit"""
+    message = message.strip()
+    
+    # Clean up formatting
+    if message.startswith('"') and message.endswith('"'):
+        message = message[1:-1]
         
-        response = client.chat.completions.create(
-            model=current_app.config.get('GPT_MODEL', 'gpt-4'),
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=800
-        )
+    # Ensure message fits LinkedIn character limit for connection requests
+    if message_type == "cold_outreach" and len(message) > 300:
+        message = message[:297] + "..."
+    return message
+
+def generate_outreach_message(profile, product_description=None, connection_path=None, regenerate=False):
+    """Generate a hyper-personalized outreach message based on the profile (cached unless `regenerate`)"""
+    request = build_outreach_request(profile, product_description, connection_path)
+    message_type = request["type"]
+    
+    # Try to use OpenAI for message generation
+    try:
+        # Use the configure_openai function to create the client
+        client = configure_openai()
         
-        message = response.choices[0].message.content.strip()
+        content, _ = cached_chat_completion(client, current_app.config.get('GPT_MODEL', 'gpt-4'), request["prompt"],
+                                            temperature=0.7, max_tokens=800, regenerate=regenerate)
         
-        # Clean up formatting
-        if message.startswith('"') and message.endswith('"'):
-            message = message[1:-1]
-            
-        # Ensure message fits LinkedIn character limit for connection requests
-        if message_type == "cold_outreach" and len(message) > 300:
-            message = message[:297] + "..."
+        message = clean_generated_message(content, message_type)
             
     except Exception as e:
         print(f"Error generating message: {e}")
         # Fallback message generation without API
-        message = create_fallback_message(first_name, role, company, profile, message_type, connection_path)
+        message = create_fallback_message(request["first_name"], request["role"], request["company"], profile,
+                                          message_type, connection_path)
     
     return {
         "message": message,
         "type": message_type,
-        "recipient": full_name if message_type != "intro_request" else profile["mutual_connections"][0]["name"] if profile.get("mutual_connections") else "Mutual Connection"
+        "recipient": request["recipient"]
+    }
+
+def stream_outreach_message(profile, product_description=None, connection_path=None, regenerate=False):
+    """
+    Streaming generate_outreach_message: yields ('token', text) as the reply
+    arrives, then ('done', message_data). The final message is cleaned up
+    (or replaced by the fallback template on error), so it may differ from
+    the raw tokens.
+    """
+    request = build_outreach_request(profile, product_description, connection_path)
+    message_type = request["type"]
+    
+    try:
+        client = configure_openai()
+        parts = []
+        for text in stream_chat_completion(client, current_app.config.get('GPT_MODEL', 'gpt-4'), request["prompt"],
+                                           temperature=0.7, max_tokens=800, regenerate=regenerate):
+            parts.append(text)
+            yield 'token', text
+        message = clean_generated_message(''.join(parts), message_type)
+    except Exception as e:
+        print(f"Error generating message: {e}")
+        message = create_fallback_message(request["first_name"], request["role"], request["company"], profile,
+                                          message_type, connection_path)
+    
+    yield 'done', {
+        "message": message,
+        "type": message_type,
+        "recipient": request["recipient"]
     }
 
 def create_fallback_message(first_name, role, company, profile, message_type, connection_path=None):
@@ -337,7 +398,16 @@ def create_fallback_message(first_name, role, company, profile, message_type, co
         
     elif message_type == "intro_request":
         # Intro request template
-        connection_name = profile["mutual_connections"][0]["name"].split()[0] if profile.get("mutual_connections") else "Hi"
+        connection_path = connection_path or best_connection_path(profile)
+        connection_name = connection_path["name"].split()[0] if connection_path else "Hi"
+        if connection_path and connection_path.get("match") == "company":
+            # A former colleague at the prospect's company rather than a shared connection
+            former_company = connection_path.get("via") or company or "their company"
+            templates = [
+                f"Hi {connection_name}, I see {profile.get('name', 'someone')} ({role}) is at {former_company}, where you worked. Do you know them, or someone there who could introduce us?",
+                f"Hi {connection_name}, since you spent time at {former_company}, would you be open to introducing me to {profile.get('name', 'someone there')}, or pointing me to someone who could?"
+            ]
+            return templates[hash(connection_name) % len(templates)]
         templates = [
             f"Hi {connection_name}, I noticed you're connected with {profile.get('name', 'your connection')} and their work in {role} aligns perfectly with some initiatives I'm working on. Would you be comfortable making an introduction?",
             f"Hi {connection_name}, would you be willing to introduce me to {profile.get('name', 'your connection')}? Their expertise in {role} is impressive, and I'd love to explore potential collaboration opportunities.",
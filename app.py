@@ -1,18 +1,30 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import (Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response,
+                   stream_with_context)
 import os
 from werkzeug.utils import secure_filename
 import json
 import time
 from pathlib import Path
 from datetime import datetime
-import pandas as pd
 from functools import wraps
 
 # Import utility modules
 from utils import allowed_file, extract_text_from_file, ensure_data_dir
 from linkedin_scraper import linkedin_search, save_cookies, load_cookies
-from ai_processor import generate_icp_and_personas, find_mutual_connections, generate_outreach_message
-from data_manager import save_trusted_network, load_trusted_network
+from ai_processor import (generate_icp_and_personas, generate_outreach_message, best_connection_path,
+                          build_outreach_request, stream_icp_and_personas, stream_outreach_message,
+                          resolve_openai_api_key, resolve_openai_base_url, openai_client_manager)
+from data_manager import (save_trusted_network, load_trusted_network, save_profile_data, load_csill_profile,
+                          save_message, load_messages, count_messages, save_approved_message,
+                          load_approved_messages, count_approved_messages, save_search)
+from results_engine import ensure_ranked_results, query_results
+from job_queue import JobQueue, COMPLETED, FAILED, CANCELLED
+from batch_search import batch_linkedin_search
+from bulk_outreach import BulkOutreachGenerator
+from search_cache import cached_linkedin_search, get_cached_search, get_search_cache
+from llm_cache import get_llm_cache
+from tnl_import import read_trusted_network_csv, describe_report
+from prompt_budget import precompute_product_summaries, prompt_stats
 
 # Import US states
 from us_states import US_STATES
@@ -24,6 +36,13 @@ class Config:
     DATA_DIR = 'data'
     ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc', 'txt', 'csv'}
     OPENAI_API_KEY = 'your-openai-api-key-here'
+    # SQLite store for profiles, TNL, messages and searches (default DATA_DIR/iclout.db)
+    DATABASE_PATH = os.getenv('DATABASE_PATH')
+    # Saved messages are appended to DATA_DIR/messages.jsonl and folded into
+    # the database once the journal reaches this size (or on the next read)
+    MESSAGE_JOURNAL_COMPACT_BYTES = int(os.getenv('MESSAGE_JOURNAL_COMPACT_BYTES', 256 * 1024))
+    DASHBOARD_PAGE_SIZE = int(os.getenv('DASHBOARD_PAGE_SIZE', 50))
+    RESULTS_PAGE_SIZE = int(os.getenv('RESULTS_PAGE_SIZE', 24))
 
     # Pull LinkedIn credentials from environment variables or use fallback
     LINKEDIN_EMAIL = os.getenv('LINKEDIN_EMAIL', 'your-linkedin-email')
@@ -31,6 +50,119 @@ class Config:
 
     GPT_MODEL = 'gpt-4'
     TEMPERATURE = 0.7
+    # Point at another OpenAI-compatible endpoint (e.g. fake_openai_server.py)
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')
+    # Shared OpenAI connection pool (see openai_client.py)
+    OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', 20))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 10))
+    OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 30))
+    OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 60))
+    OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', 10))
+    OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', 2))
+
+    # Bulk drafting: concurrent requests, retries per message, and how many
+    # top-ranked leads to draft for when none are selected
+    BULK_MESSAGE_CONCURRENCY = int(os.getenv('BULK_MESSAGE_CONCURRENCY', 8))
+    BULK_MESSAGE_MAX_RETRIES = int(os.getenv('BULK_MESSAGE_MAX_RETRIES', 4))
+    BULK_MESSAGE_LIMIT = int(os.getenv('BULK_MESSAGE_LIMIT', 50))
+
+    # Background jobs (searches run off the request thread)
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    JOB_RETENTION = int(os.getenv('JOB_RETENTION', 3600))
+    # How often a worker marks its unfinished jobs as alive, and how long a
+    # job can go unmarked before it is failed as "worker exited" (seconds)
+    JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', 15))
+    JOB_STALE_AFTER = float(os.getenv('JOB_STALE_AFTER', 90))
+
+    # Scraping browser pool (one warm Chromium per job worker)
+    BROWSER_HEADLESS = os.getenv('BROWSER_HEADLESS', 'False').lower() == 'true'
+    BROWSER_SLOW_MO = int(os.getenv('BROWSER_SLOW_MO', 100))
+    BROWSER_MAX_USES = int(os.getenv('BROWSER_MAX_USES', 20))
+    # Chrome/Chromium binary to use instead of Playwright's bundled one
+    BROWSER_EXECUTABLE_PATH = os.getenv('BROWSER_EXECUTABLE_PATH', '')
+    # Where the scraper finds LinkedIn; point at mock_sales_nav_server for offline runs
+    LINKEDIN_BASE_URL = os.getenv('LINKEDIN_BASE_URL', 'https://www.linkedin.com')
+
+    # Scraper waits: upper bound as a multiple of the fixed sleep each wait
+    # replaced, and the quiet period that counts as "DOM settled"
+    WAIT_BOUND_FACTOR = float(os.getenv('WAIT_BOUND_FACTOR', 1.0))
+    WAIT_SETTLE_MS = int(os.getenv('WAIT_SETTLE_MS', 300))
+
+    # Result card extraction: 'in_page' (one evaluate per page), 'html'
+    # (parse page.content() with lxml) or 'handles' (per-field round trips).
+    # Searches with SEARCH_PIPELINE use PIPELINE_EXTRACTION_ENGINE instead
+    EXTRACTION_ENGINE = os.getenv('EXTRACTION_ENGINE', 'in_page')
+    # Archive each result page's HTML under DATA_DIR/snapshots
+    SAVE_PAGE_SNAPSHOTS = os.getenv('SAVE_PAGE_SNAPSHOTS', 'False').lower() == 'true'
+    # Parse result pages on a background thread while the browser paginates
+    SEARCH_PIPELINE = os.getenv('SEARCH_PIPELINE', 'True').lower() == 'true'
+    # Engine of the pipelined path. Only 'html' parses on the background
+    # thread (falling back to 'in_page' if the first page has no cards it
+    # recognises); 'in_page' and 'handles' extract on the browser thread
+    PIPELINE_EXTRACTION_ENGINE = os.getenv('PIPELINE_EXTRACTION_ENGINE', 'html')
+    # 'record' saves each search as a HAR plus page snapshots under
+    # SCRAPER_HAR_DIR (default DATA_DIR/recordings); 'replay' serves a search
+    # from SCRAPER_HAR_REPLAY (default: the newest recording) with no network
+    SCRAPER_HAR_MODE = os.getenv('SCRAPER_HAR_MODE', 'off')
+    SCRAPER_HAR_DIR = os.getenv('SCRAPER_HAR_DIR', '')
+    SCRAPER_HAR_REPLAY = os.getenv('SCRAPER_HAR_REPLAY', '')
+    # Scraper screenshots / page dumps: 'off', 'on_error' (kept in memory and
+    # written only when a search fails), 'sampled' (SAMPLE_RATE of searches
+    # captured in full) or 'full'. Written to DATA_DIR/debug by a background
+    # thread; only the newest DEBUG_ARTIFACTS_KEEP searches are kept
+    DEBUG_ARTIFACTS = os.getenv('DEBUG_ARTIFACTS', 'on_error')
+    DEBUG_ARTIFACTS_SAMPLE_RATE = float(os.getenv('DEBUG_ARTIFACTS_SAMPLE_RATE', '0.05'))
+    DEBUG_ARTIFACTS_RING = int(os.getenv('DEBUG_ARTIFACTS_RING', '20'))
+    DEBUG_ARTIFACTS_KEEP = int(os.getenv('DEBUG_ARTIFACTS_KEEP', '20'))
+    DEBUG_ARTIFACTS_QUEUE = int(os.getenv('DEBUG_ARTIFACTS_QUEUE', '64'))
+    # Record a Playwright trace of each search, saved only when it fails
+    DEBUG_TRACE_ON_FAILURE = os.getenv('DEBUG_TRACE_ON_FAILURE', 'False').lower() == 'true'
+    # Requests the scraping browser aborts, per stage (see request_policy.py);
+    # 'off' loads everything and keeps the browser's HTTP cache, which any
+    # blocking turns off. Extra comma-separated URL substrings to block as
+    # trackers, or to always allow
+    RESOURCE_BLOCKING = os.getenv('RESOURCE_BLOCKING', 'login=trackers;*=image,media,font,trackers')
+    RESOURCE_BLOCK_PATTERNS = os.getenv('RESOURCE_BLOCK_PATTERNS', '')
+    RESOURCE_ALLOW_PATTERNS = os.getenv('RESOURCE_ALLOW_PATTERNS', '')
+    # Open Sales Navigator searches by URL with keywords and filters encoded
+    # (geography IDs learned from earlier searches) instead of driving the
+    # filter UI; see sales_nav_urls.py
+    SEARCH_URL_DIRECT = os.getenv('SEARCH_URL_DIRECT', 'True').lower() == 'true'
+
+    # Batch (multi-query) searches: browsers per batch, browsers across all
+    # batches, and how many searches may start per minute
+    BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', 3))
+    BATCH_GLOBAL_CONCURRENCY = int(os.getenv('BATCH_GLOBAL_CONCURRENCY', 3))
+    BATCH_SEARCHES_PER_MINUTE = float(os.getenv('BATCH_SEARCHES_PER_MINUTE', 6))  # 0 = no limit
+    BATCH_RATE_BURST = int(os.getenv('BATCH_RATE_BURST', 3))
+
+    # Search result cache (DATA_DIR/cache/searches), keyed by query + filters
+    SEARCH_CACHE_ENABLED = os.getenv('SEARCH_CACHE_ENABLED', 'True').lower() == 'true'
+    SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 6 * 3600))
+    SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 200))
+    SEARCH_CACHE_MAX_BYTES = int(os.getenv('SEARCH_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+
+    # LLM response cache (DATA_DIR/cache/llm), keyed by model + temperature + prompt
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True').lower() == 'true'
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 30 * 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 5000))
+    LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+
+    # Token budget for the product description in each prompt; longer
+    # descriptions are sent as a cached extractive summary
+    ICP_PRODUCT_TOKEN_BUDGET = int(os.getenv('ICP_PRODUCT_TOKEN_BUDGET', 2000))
+    OUTREACH_PRODUCT_TOKEN_BUDGET = int(os.getenv('OUTREACH_PRODUCT_TOKEN_BUDGET', 150))
+
+    # Uploaded documents are extracted page by page, capped at MAX_CHARS, and
+    # cached by file hash (DATA_DIR/cache/extracted). Files of at least
+    # SUBPROCESS_BYTES run in a child process killed after TIMEOUT seconds
+    TEXT_EXTRACT_TIMEOUT = float(os.getenv('TEXT_EXTRACT_TIMEOUT', 60))
+    TEXT_EXTRACT_MAX_CHARS = int(os.getenv('TEXT_EXTRACT_MAX_CHARS', 2000000))
+    TEXT_EXTRACT_MAX_PAGES = int(os.getenv('TEXT_EXTRACT_MAX_PAGES', 0))
+    TEXT_EXTRACT_SUBPROCESS_BYTES = int(os.getenv('TEXT_EXTRACT_SUBPROCESS_BYTES', 512 * 1024))
+
+    # Trusted network CSVs are read and cleaned this many rows at a time
+    TNL_IMPORT_CHUNK_ROWS = int(os.getenv('TNL_IMPORT_CHUNK_ROWS', 20000))
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -40,6 +172,9 @@ app.config.from_object(Config)
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['DATA_DIR'], exist_ok=True)
 
+# Background job queue for long-running searches
+job_queue = JobQueue(app)
+
 def credentials_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -80,17 +215,15 @@ def upload_product():
         with open(os.path.join(app.config['DATA_DIR'], 'product_description.txt'), 'w') as f:
             f.write(product_text)
         
-        # Generate ICP and Personas
-        icp_data = generate_icp_and_personas(product_text)
+        # Compact it once for every prompt budget, so no later call pays for that
+        precompute_product_summaries(product_text, app.config['GPT_MODEL'])
         
-        if icp_data:
-            with open(os.path.join(app.config['DATA_DIR'], 'icp_and_personas.json'), 'w') as f:
-                json.dump(icp_data, f)
-            
-            # Store in session for convenience
-            session['icp'] = icp_data.get('icp', {})
-            session['buyer_persona'] = icp_data.get('buyer_persona', {})
-            session['user_persona'] = icp_data.get('user_persona', {})
+        # Stream the analysis on its own page instead of blocking this request
+        if request.form.get('stream') == '1':
+            return redirect(url_for('analyze_product_page'))
+        
+        # Generate ICP and Personas (an unchanged description is answered from the LLM cache)
+        analyze_product(product_text)
         
         flash('Product description uploaded and analyzed successfully', 'success')
         return redirect(url_for('view_product'))
@@ -98,6 +231,104 @@ def upload_product():
     flash('Invalid file type', 'error')
     return redirect(url_for('index'))
 
+def analyze_product(product_text, regenerate=False):
+    """Generate the ICP and personas for a product description and save them."""
+    icp_data = generate_icp_and_personas(product_text, regenerate=regenerate)
+    
+    if icp_data:
+        with open(os.path.join(app.config['DATA_DIR'], 'icp_and_personas.json'), 'w') as f:
+            json.dump(icp_data, f)
+        
+        # Store in session for convenience
+        session['icp'] = icp_data.get('icp', {})
+        session['buyer_persona'] = icp_data.get('buyer_persona', {})
+        session['user_persona'] = icp_data.get('user_persona', {})
+    return icp_data
+
+def sse_event(event, data):
+    """One server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    """Stream (event, data) pairs to the browser as they are produced."""
+    def generate():
+        start = time.perf_counter()
+        first_token = None
+        for event, data in events:
+            if event == 'token' and first_token is None:
+                first_token = time.perf_counter() - start
+                print(f"First token after {first_token:.2f}s")
+            if event == 'done':
+                data = {'result': data, 'first_token_s': round(first_token or 0, 3),
+                        'total_s': round(time.perf_counter() - start, 3)}
+            elif event == 'token':
+                data = {'text': data}
+            yield sse_event(event, data)
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/analyze_product')
+@credentials_required
+def analyze_product_page():
+    """Page that streams the ICP analysis of the uploaded product description."""
+    return render_template('analyze_product.html', regenerate=request.args.get('regenerate') == '1')
+
+@app.route('/analyze_product/stream')
+@credentials_required
+def analyze_product_stream():
+    """Server-sent events: ICP generation tokens, then the parsed ICP (saved like /upload_product does)."""
+    try:
+        with open(os.path.join(app.config['DATA_DIR'], 'product_description.txt'), 'r') as f:
+            product_text = f.read()
+    except OSError:
+        return jsonify({'error': 'No product description uploaded'}), 404
+    regenerate = request.args.get('regenerate') == '1'
+    
+    def events():
+        for event, data in stream_icp_and_personas(product_text, regenerate=regenerate):
+            if event == 'done' and data:
+                with open(os.path.join(app.config['DATA_DIR'], 'icp_and_personas.json'), 'w') as f:
+                    json.dump(data, f)
+            yield event, data
+    return sse_response(events())
+
+@app.route('/analyze_product/done')
+@credentials_required
+def analyze_product_done():
+    """After a streamed analysis: put the saved ICP in the session and show it."""
+    # The page passes failed=1 when generation failed or the stream broke off;
+    # icp_and_personas.json then still holds the previous analysis
+    if request.args.get('failed') == '1':
+        flash('Could not analyze the product description, please try again', 'error')
+        return redirect(url_for('view_product'))
+    try:
+        with open(os.path.join(app.config['DATA_DIR'], 'icp_and_personas.json'), 'r') as f:
+            icp_data = json.load(f)
+        session['icp'] = icp_data.get('icp', {})
+        session['buyer_persona'] = icp_data.get('buyer_persona', {})
+        session['user_persona'] = icp_data.get('user_persona', {})
+        flash('Product description uploaded and analyzed successfully', 'success')
+    except (OSError, ValueError):
+        flash('Could not analyze the product description, please try again', 'error')
+    return redirect(url_for('view_product'))
+
+@app.route('/regenerate_icp', methods=['POST'])
+@credentials_required
+def regenerate_icp():
+    """Ask GPT for a fresh ICP and personas, bypassing the LLM cache."""
+    try:
+        with open(os.path.join(app.config['DATA_DIR'], 'product_description.txt'), 'r') as f:
+            product_text = f.read()
+    except OSError:
+        flash('Upload a product description first', 'warning')
+        return redirect(url_for('index'))
+    
+    if analyze_product(product_text, regenerate=True):
+        flash('ICP and personas regenerated', 'success')
+    else:
+        flash('Could not regenerate the ICP, please try again', 'error')
+    return redirect(url_for('view_product'))
+
 @app.route('/view_product')
 @credentials_required
 def view_product():
@@ -165,27 +396,16 @@ def trusted_network():
                 
                 # Process uploaded file (CSV expected)
                 try:
-                    tnl_data = pd.read_csv(filepath)
-                    
-                    # Minimal required fields: name, [optional: trust_score]
-                    if 'name' not in tnl_data.columns:
-                        flash('CSV must contain a "name" column', 'error')
-                        return redirect(url_for('trusted_network'))
-                    
-                    # Convert to list of dicts
-                    trusted_network_list = []
-                    for _, row in tnl_data.iterrows():
-                        network_entry = {
-                            'name': row['name'],
-                            'trust_score': int(row['trust_score']) if 'trust_score' in row and not pd.isna(row['trust_score']) else 5,
-                            'notes': row['notes'] if 'notes' in row and not pd.isna(row['notes']) else ''
-                        }
-                        trusted_network_list.append(network_entry)
+                    trusted_network_list, report = read_trusted_network_csv(filepath, app.config['TNL_IMPORT_CHUNK_ROWS'])
                     
                     # Save trusted network
                     save_trusted_network(trusted_network_list)
                     
-                    flash('Trusted network uploaded successfully', 'success')
+                    flash(describe_report(report), 'success')
+                    if report['issues']:
+                        shown = '; '.join(f"row {i['row']}: {i['reason']}" for i in report['issues'][:5])
+                        more = sum(report['issue_counts'].values()) - 5
+                        flash(f"Rows needing attention: {shown}{f' and {more} more' if more > 0 else ''}", 'warning')
                     return redirect(url_for('trusted_network'))
                 except Exception as e:
                     flash(f'Error processing CSV: {e}', 'error')
@@ -301,6 +521,7 @@ def search():
     max_results = int(request.form.get('max_results', 20))
     selected_state = request.form.get('selected_state', '')
     company_size = request.form.get('company_size', '')
+    force_refresh = request.form.get('force_refresh') == 'on'
     
     # Store in session
     session['search_query'] = search_query
@@ -308,58 +529,246 @@ def search():
     session['selected_state'] = selected_state
     session['company_size'] = company_size
     
-    # Perform LinkedIn search with location and company size filters
-    profiles = linkedin_search(
+    # Answer repeated searches straight from the cache
+    if not force_refresh:
+        profiles = get_cached_search(search_query, max_results, selected_state, company_size)
+        if profiles:
+            save_profile_data(profiles)
+            flash(f'Found {len(profiles)} profiles matching your search (cached)', 'success')
+            return redirect(url_for('results'))
+    
+    # Queue the LinkedIn search so this worker is free while the browser runs
+    job = job_queue.submit('search', run_search_job, {
+        'search_query': search_query,
+        'max_results': max_results,
+        'selected_state': selected_state,
+        'company_size': company_size,
+        'force_refresh': True  # cache already checked above; refresh the entry
+    })
+    session['search_job_id'] = job.id
+    
+    return redirect(url_for('search_progress', job_id=job.id))
+
+def run_search_job(job, search_query, max_results, selected_state, company_size, force_refresh=False):
+    """Background job: run a LinkedIn search and report progress on the job."""
+    streamed = []
+    
+    def on_profiles(page_num, page_profiles):
+        # Results stream in per page while later pages are still loading
+        streamed.extend(page_profiles)
+        job.update_progress(profiles=len(streamed))
+    
+    profiles = cached_linkedin_search(
         search_query=search_query,
         max_results=max_results,
         selected_state=selected_state,
-        company_size=company_size
+        company_size=company_size,
+        force_refresh=force_refresh,
+        progress_callback=job.update_progress,
+        profiles_callback=on_profiles
     )
+    save_search(search_query, selected_state, company_size, max_results, len(profiles))
+    job.update_progress(stage='done', profiles=len(profiles))
+    return {'profiles': len(profiles)}
+
+@app.route('/search/batch', methods=['POST'])
+@credentials_required
+def search_batch():
+    """Run several search queries (e.g. a persona sweep) concurrently."""
+    search_query = request.form.get('search_query', '')
+    max_results = int(request.form.get('max_results', 20))
+    selected_state = request.form.get('selected_state', '')
+    company_size = request.form.get('company_size', '')
+    extra_queries = request.form.get('batch_queries', '').splitlines()
+    force_refresh = request.form.get('force_refresh') == 'on'
+    
+    # One search per distinct query, all with the same filters
+    queries = []
+    for query in [search_query] + extra_queries:
+        query = query.strip()
+        if query and query not in queries:
+            queries.append(query)
+    
+    if not queries:
+        flash('Enter at least one search query', 'error')
+        return redirect(url_for('search_form'))
     
-    if profiles:
-        flash(f'Found {len(profiles)} profiles matching your search', 'success')
+    session['search_query'] = search_query
+    session['max_results'] = max_results
+    session['selected_state'] = selected_state
+    session['company_size'] = company_size
+    
+    searches = [{'search_query': q, 'selected_state': selected_state, 'company_size': company_size}
+                for q in queries]
+    job = job_queue.submit('batch_search', run_batch_search_job, {
+        'searches': searches,
+        'max_results': max_results,
+        'force_refresh': force_refresh
+    })
+    session['search_job_id'] = job.id
+    
+    return redirect(url_for('search_progress', job_id=job.id))
+
+def run_batch_search_job(job, searches, max_results, force_refresh=False):
+    """Background job: run several searches concurrently and merge the results."""
+    profiles, queries = batch_linkedin_search(searches, max_results=max_results, force_refresh=force_refresh,
+                                              progress_callback=job.update_progress, return_query_counts=True)
+    # Each query's history entry counts what that query found, not the merged batch
+    for search in queries:
+        save_search(search['search_query'], search['selected_state'], search['company_size'], max_results,
+                    search['profiles'])
+    return {'profiles': len(profiles), 'queries': len(searches)}
+
+@app.route('/search/progress/<job_id>')
+@credentials_required
+def search_progress(job_id):
+    """Show a progress page that polls the search job status."""
+    job = job_queue.get(job_id)
+    if not job:
+        flash('Search job not found', 'error')
+        return redirect(url_for('search_form'))
+    return render_template('search_progress.html', job=job.to_dict())
+
+@app.route('/search/status/<job_id>')
+@credentials_required
+def search_status(job_id):
+    """Return the status and progress of a search job as JSON."""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    status = job.to_dict()
+    status['result'] = job.result
+    return jsonify(status)
+
+@app.route('/search/cancel/<job_id>', methods=['POST'])
+@credentials_required
+def cancel_search(job_id):
+    """Cancel a pending or running search job."""
+    job = job_queue.cancel(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+        return jsonify(job.to_dict())
+    flash('Search cancelled', 'warning')
+    return redirect(url_for('search_form'))
+
+@app.route('/search/done/<job_id>')
+@credentials_required
+def search_done(job_id):
+    """Redirect to results (or back to the form) once a search job finishes."""
+    job = job_queue.get(job_id)
+    if not job or job.status == FAILED:
+        flash(f'Search failed: {job.error if job else "job not found"}', 'error')
+        return redirect(url_for('search_form'))
+    if job.status == CANCELLED:
+        flash('Search cancelled', 'warning')
+        return redirect(url_for('search_form'))
+    if job.status != COMPLETED:
+        return redirect(url_for('search_progress', job_id=job_id))
+    
+    profile_count = (job.result or {}).get('profiles', 0)
+    if profile_count:
+        flash(f'Found {profile_count} profiles matching your search', 'success')
         return redirect(url_for('results'))
     else:
         flash('No profiles found, please try a different search query', 'error')
         return redirect(url_for('search_form'))
 
+@app.route('/search/cache')
+@credentials_required
+def search_cache_stats():
+    """Return search cache hit/miss counters and size as JSON."""
+    cache = get_search_cache()
+    if cache is None:
+        return jsonify({'enabled': False})
+    stats = cache.summary()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route('/search/cache/clear', methods=['POST'])
+@credentials_required
+def clear_search_cache():
+    """Drop every cached search result."""
+    cache = get_search_cache()
+    if cache is not None:
+        cache.clear()
+    flash('Search cache cleared', 'success')
+    return redirect(url_for('search_form'))
+
+@app.route('/llm/cache')
+@credentials_required
+def llm_cache_stats():
+    """Return LLM cache hit rate, tokens saved and size as JSON."""
+    cache = get_llm_cache()
+    if cache is None:
+        return jsonify({'enabled': False})
+    stats = cache.summary()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route('/llm/cache/clear', methods=['POST'])
+@credentials_required
+def clear_llm_cache():
+    """Drop every cached LLM response."""
+    cache = get_llm_cache()
+    if cache is not None:
+        cache.clear()
+    flash('Generation cache cleared', 'success')
+    return redirect(request.referrer or url_for('index'))
+
+@app.route('/llm/prompts')
+@credentials_required
+def llm_prompt_stats():
+    """Return product-context token counts and tokens saved by compaction as JSON."""
+    return jsonify(prompt_stats.summary())
+
+@app.route('/openai/stats')
+@credentials_required
+def openai_stats():
+    """Return OpenAI request and connection-reuse counters as JSON."""
+    return jsonify(openai_client_manager().summary())
+
+def results_query_from_request():
+    """Page and filters for the results views, from the query string."""
+    return query_results(page=request.args.get('page', 1, type=int),
+                         per_page=min(request.args.get('per_page', app.config['RESULTS_PAGE_SIZE'], type=int), 200),
+                         connection_level=request.args.get('connection_level') or None,
+                         tnl_only=request.args.get('tnl_only') in ('1', 'true', 'on'),
+                         location=request.args.get('location'))
+
 @app.route('/results')
 @credentials_required
 def results():
     try:
-        # Load profiles from file
-        with open(os.path.join(app.config['DATA_DIR'], 'profiles.json'), 'r') as f:
-            profiles = json.load(f)
-        
-        # Load trusted network
-        trusted_network_list = load_trusted_network()
-        
-        # Find and sort by mutual connections
-        sorted_profiles = find_mutual_connections(profiles, trusted_network_list)
-        
-        # Save the sorted profiles
-        with open(os.path.join(app.config['DATA_DIR'], 'csill.json'), 'w') as f:
-            json.dump(sorted_profiles, f)
-        
-        return render_template('results.html', profiles=sorted_profiles)
+        # Rank the latest search against the TNL once; later views just page
+        ensure_ranked_results()
+        page = results_query_from_request()
+        if not page['total'] and not any(page['filters'].values()):
+            flash('No search results yet, run a search first', 'warning')
+            return redirect(url_for('search_form'))
+        
+        return render_template('results.html', **page)
     except Exception as e:
         flash(f'Error loading results: {e}', 'error')
         return redirect(url_for('search_form'))
 
+@app.route('/api/results')
+@credentials_required
+def results_json():
+    """One page of the ranked lead list as JSON (same filters as /results)."""
+    ensure_ranked_results()
+    return jsonify(results_query_from_request())
+
 @app.route('/message_form/<int:profile_id>')
 @credentials_required
 def message_form(profile_id):
     try:
-        # Load sorted profiles
-        with open(os.path.join(app.config['DATA_DIR'], 'csill.json'), 'r') as f:
-            profiles = json.load(f)
-        
-        if profile_id >= len(profiles):
+        # Load the sorted profile
+        profile = load_csill_profile(profile_id)
+        if profile is None:
             flash('Profile not found', 'error')
             return redirect(url_for('results'))
         
-        profile = profiles[profile_id]
-        
         # Load product description for context
         with open(os.path.join(app.config['DATA_DIR'], 'product_description.txt'), 'r') as f:
             product_description = f.read()
@@ -379,15 +788,11 @@ def generate_message_route():
     
     try:
         # Load profile
-        with open(os.path.join(app.config['DATA_DIR'], 'csill.json'), 'r') as f:
-            profiles = json.load(f)
-        
-        if profile_id >= len(profiles):
+        profile = load_csill_profile(profile_id)
+        if profile is None:
             flash('Profile not found', 'error')
             return redirect(url_for('results'))
         
-        profile = profiles[profile_id]
-        
         # Try to load product description if it exists, but don't require it
         try:
             with open(os.path.join(app.config['DATA_DIR'], 'product_description.txt'), 'r') as f:
@@ -395,18 +800,23 @@ def generate_message_route():
         except:
             product_description = None
         
-        # Determine best connection path for message
-        connection_path = None
-        if profile.get('mutual_connections'):
-            # Get highest scored TNL connection if available
-            tnl_connections = [c for c in profile['mutual_connections'] if c.get('in_tnl', False)]
-            if tnl_connections:
-                connection_path = max(tnl_connections, key=lambda c: c.get('tnl_score', 0))
-            else:
-                connection_path = profile['mutual_connections'][0]
+        regenerate = request.form.get('regenerate') == '1'
+        
+        # Streaming: render the review page now and let it pull tokens over SSE
+        if request.form.get('stream') == '1':
+            outreach = build_outreach_request(profile, product_description, best_connection_path(profile))
+            return render_template('message_review.html',
+                                   profile=profile,
+                                   profile_id=profile_id,
+                                   message='',
+                                   message_type=outreach['type'],
+                                   recipient=outreach['recipient'],
+                                   stream_url=url_for('generate_message_stream', profile_id=profile_id,
+                                                      regenerate='1' if regenerate else None))
         
-        # Generate message
-        message_data = generate_outreach_message(profile, product_description, connection_path)
+        # Generate message via the best connection path (highest-trust TNL contact first)
+        message_data = generate_outreach_message(profile, product_description, best_connection_path(profile),
+                                                 regenerate=regenerate)
         
         # Store generated message in the session
         session['generated_message'] = message_data
@@ -421,6 +831,124 @@ def generate_message_route():
         flash(f'Error generating message: {e}', 'error')
         return redirect(url_for('message_form', profile_id=profile_id))
 
+@app.route('/messages/bulk', methods=['POST'])
+@credentials_required
+def bulk_messages():
+    """Queue drafts for the selected leads (or the top-ranked ones)."""
+    profile_ids = [int(p) for p in request.form.getlist('profile_ids') if p.isdigit()]
+    if not profile_ids:
+        ensure_ranked_results()
+        top = query_results(per_page=app.config['BULK_MESSAGE_LIMIT'])
+        profile_ids = [profile['profile_id'] for profile in top['profiles']]
+    if not profile_ids:
+        flash('No leads to draft messages for, run a search first', 'warning')
+        return redirect(url_for('search_form'))
+    
+    job = job_queue.submit('bulk_messages', run_bulk_message_job, {
+        'profile_ids': profile_ids,
+        'regenerate': request.form.get('regenerate') == '1'
+    })
+    flash(f'Drafting messages for {len(profile_ids)} leads', 'info')
+    return redirect(url_for('drafts', job_id=job.id))
+
+def run_bulk_message_job(job, profile_ids, regenerate=False):
+    """Background job: draft outreach for many profiles concurrently, saving each draft as it lands."""
+    try:
+        with open(os.path.join(app.config['DATA_DIR'], 'product_description.txt'), 'r') as f:
+            product_description = f.read()
+    except OSError:
+        product_description = None
+    
+    items = []
+    for profile_id in profile_ids:
+        profile = load_csill_profile(profile_id)
+        if profile is not None:
+            items.append((profile_id, profile, best_connection_path(profile)))
+    job.update_progress(stage='drafting', total=len(items), completed=0)
+    
+    def on_draft(profile_id, draft):
+        save_message(profile_id, draft['message'], status='draft', type=draft['type'],
+                     recipient=draft['recipient'], fallback=draft['fallback'])
+    
+    def on_progress(stats):
+        job.update_progress(**stats.summary())
+    
+    generator = BulkOutreachGenerator(resolve_openai_api_key(), resolve_openai_base_url(),
+                                      model=app.config['GPT_MODEL'],
+                                      temperature=app.config['TEMPERATURE'],
+                                      concurrency=app.config['BULK_MESSAGE_CONCURRENCY'],
+                                      max_retries=app.config['BULK_MESSAGE_MAX_RETRIES'],
+                                      client_manager=openai_client_manager(),
+                                      cache=get_llm_cache(),
+                                      regenerate=regenerate)
+    _, stats = generator.generate(items, product_description, on_draft=on_draft, on_progress=on_progress)
+    job.update_progress(stage='done', **stats)
+    print(f"Drafted {stats['completed']} messages ({stats['cached']} cached, {stats['failed']} fallbacks) "
+          f"in {stats['elapsed_s']}s, {stats['per_minute']}/min")
+    return stats
+
+@app.route('/drafts')
+@credentials_required
+def drafts():
+    """Generated drafts awaiting review, with the progress of a running bulk job."""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = app.config['DASHBOARD_PAGE_SIZE']
+    total = count_messages(status='draft')
+    job = job_queue.get(request.args.get('job_id', ''))
+    
+    return render_template('drafts.html',
+                           drafts=load_messages(offset=(page - 1) * per_page, limit=per_page, status='draft'),
+                           job=job.to_dict() if job else None,
+                           total=total,
+                           page=page,
+                           total_pages=max((total + per_page - 1) // per_page, 1))
+
+@app.route('/drafts/<int:profile_id>/review')
+@credentials_required
+def review_draft(profile_id):
+    """Open the latest draft for a profile on the usual review page."""
+    profile = load_csill_profile(profile_id)
+    drafts_for_profile = load_messages(profile_id=profile_id, status='draft')
+    if profile is None or not drafts_for_profile:
+        flash('Draft not found', 'error')
+        return redirect(url_for('drafts'))
+    
+    draft = drafts_for_profile[-1]
+    return render_template('message_review.html',
+                           profile=profile,
+                           profile_id=profile_id,
+                           message=draft['message'],
+                           message_type=draft.get('type', 'cold_outreach'),
+                           recipient=draft.get('recipient', profile.get('name')))
+
+@app.route('/generate_message/stream/<int:profile_id>')
+@credentials_required
+def generate_message_stream(profile_id):
+    """Server-sent events: message tokens as GPT writes them, then the final message."""
+    profile = load_csill_profile(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    try:
+        with open(os.path.join(app.config['DATA_DIR'], 'product_description.txt'), 'r') as f:
+            product_description = f.read()
+    except:
+        product_description = None
+    
+    return sse_response(stream_outreach_message(profile, product_description, best_connection_path(profile),
+                                                regenerate=request.args.get('regenerate') == '1'))
+
+@app.route('/generate_message/stream/<int:profile_id>/done', methods=['POST'])
+@credentials_required
+def generate_message_stream_done(profile_id):
+    """Store a streamed message in the session, as /generate_message does."""
+    data = request.get_json(silent=True) or {}
+    session['generated_message'] = {
+        'message': data.get('message', ''),
+        'type': data.get('type'),
+        'recipient': data.get('recipient')
+    }
+    return ('', 204)
+
 @app.route('/approve_message', methods=['POST'])
 @credentials_required
 def approve_message():
@@ -429,26 +957,7 @@ def approve_message():
     action = request.form.get('action', '')
     
     # Store the approved/edited message
-    with open(os.path.join(app.config['DATA_DIR'], 'approved_messages.json'), 'a+') as f:
-        f.seek(0)
-        try:
-            messages = json.load(f)
-        except:
-            messages = []
-        
-        message_entry = {
-            'profile_id': profile_id,
-            'message': edited_message,
-            'status': action,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        messages.append(message_entry)
-        
-        # Seek to beginning and write updated messages
-        f.seek(0)
-        f.truncate()
-        json.dump(messages, f)
+    save_approved_message(profile_id, edited_message, action)
     
     if action == 'approve':
         flash('Message approved and ready to send', 'success')
@@ -463,30 +972,20 @@ def approve_message():
 @app.route('/dashboard')
 @credentials_required
 def dashboard():
-    # Load approved messages
-    try:
-        with open(os.path.join(app.config['DATA_DIR'], 'approved_messages.json'), 'r') as f:
-            messages = json.load(f)
-    except:
-        messages = []
+    # Load one page of reviewed messages, optionally filtered by status
+    status = request.args.get('status') or None
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = app.config['DASHBOARD_PAGE_SIZE']
     
-    # Load csill for profile info
-    try:
-        with open(os.path.join(app.config['DATA_DIR'], 'csill.json'), 'r') as f:
-            profiles = json.load(f)
-        
-        # Add profile info to messages
-        for message in messages:
-            p_id = message.get('profile_id')
-            if p_id < len(profiles):
-                message['profile'] = profiles[p_id]
-            else:
-                message['profile'] = {'name': 'Unknown', 'headline': '', 'location': ''}
-    except:
-        for message in messages:
-            message['profile'] = {'name': 'Unknown', 'headline': '', 'location': ''}
+    total = count_approved_messages(status=status)
+    messages = load_approved_messages(offset=(page - 1) * per_page, limit=per_page, status=status)
     
-    return render_template('dashboard.html', messages=messages)
+    return render_template('dashboard.html',
+                           messages=messages,
+                           status=status,
+                           page=page,
+                           total_pages=max((total + per_page - 1) // per_page, 1),
+                           total=total)
 
 @app.route('/credentials', methods=['GET'])
 def credentials():
@@ -0,0 +1,205 @@
+# batch_search.py
+import queue
+import threading
+import time
+from flask import current_app
+
+from browser_pool import close_browser_pool
+from data_manager import save_profile_data
+from job_queue import JobCancelled
+from linkedin_scraper import merge_profiles_by_best_connection, create_sample_profiles
+from search_cache import cached_linkedin_search, get_cached_search
+
+# Process-wide cap on browsers used by batch searches, shared by all batches
+_global_slots = None
+_global_slots_lock = threading.Lock()
+_rate_limiter = None
+
+
+class RateLimiter:
+    """
+    Token bucket: allows `rate` acquisitions per `per` seconds, with bursts
+    up to `burst`. A rate of 0 or less means no limit.
+    """
+
+    def __init__(self, rate, per=60.0, burst=None):
+        self.interval = per / float(rate) if rate and rate > 0 else 0.0
+        self.capacity = burst or 1
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop=None):
+        """
+        Block until a token is available. Returns seconds spent waiting.
+        If `stop` (a threading.Event) is set while waiting, returns early
+        without taking a token.
+        """
+        if not self.interval:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) * self.interval
+            if stop is None:
+                time.sleep(delay)
+            elif stop.wait(delay):
+                return waited
+            waited += delay
+
+
+def _get_global_slots():
+    global _global_slots, _rate_limiter
+    with _global_slots_lock:
+        if _global_slots is None:
+            config = current_app.config
+            _global_slots = threading.BoundedSemaphore(config.get('BATCH_GLOBAL_CONCURRENCY', 3))
+            _rate_limiter = RateLimiter(rate=config.get('BATCH_SEARCHES_PER_MINUTE', 6),
+                                        burst=config.get('BATCH_RATE_BURST', 3))
+        return _global_slots, _rate_limiter
+
+
+def normalize_search(search):
+    """Accept a bare query string or a dict of linkedin_search filters."""
+    if isinstance(search, str):
+        search = {'search_query': search}
+    return {
+        'search_query': (search.get('search_query') or '').strip(),
+        'selected_state': search.get('selected_state') or None,
+        'company_size': search.get('company_size') or None
+    }
+
+
+def batch_linkedin_search(searches, max_results=20, max_concurrency=None, force_refresh=False,
+                          progress_callback=None, return_query_counts=False):
+    """
+    Run several searches concurrently, each in its own browser context, and
+    merge the results with merge_profiles_by_best_connection.
+
+    Concurrency is bounded by `max_concurrency` for this batch and by
+    BATCH_GLOBAL_CONCURRENCY across all batches; search starts are spaced out
+    by a shared rate limiter (BATCH_SEARCHES_PER_MINUTE). Returns the merged
+    profiles, which are also saved to profiles.json.
+
+    Each query goes through the search result cache, so only queries without
+    a fresh cached result (or all of them, with force_refresh) open a browser.
+    
+    With return_query_counts, returns (profiles, queries) where queries are
+    the normalized searches, each with the number of profiles it found itself.
+    """
+    searches = [normalize_search(s) for s in searches]
+    searches = [s for s in searches if s['search_query']]
+    if not searches:
+        return ([], []) if return_query_counts else []
+
+    app = current_app._get_current_object()
+    max_concurrency = max_concurrency or app.config.get('BATCH_MAX_CONCURRENCY', 3)
+    slots, rate_limiter = _get_global_slots()
+
+    work = queue.Queue()
+    for index, search in enumerate(searches):
+        work.put((index, search))
+
+    results = {}
+    statuses = {i: 'queued' for i in range(len(searches))}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def report(**progress):
+        if progress_callback:
+            with lock:
+                progress['queries'] = dict(statuses)
+            progress_callback(**progress)
+
+    def check_stop(**progress):
+        if stop.is_set():
+            raise JobCancelled()
+
+    def worker():
+        # Each worker thread owns its browser pool (and so its own isolated
+        # context) and closes it when the queue runs dry
+        with app.app_context():
+            try:
+                while not stop.is_set():
+                    try:
+                        index, search = work.get_nowait()
+                    except queue.Empty:
+                        break
+                    # Cached queries don't need a browser, a slot or a rate token;
+                    # misses skip the second lookup in cached_linkedin_search
+                    cached = None if force_refresh else get_cached_search(max_results=max_results, **search)
+                    if cached is not None:
+                        with lock:
+                            results[index] = cached
+                            statuses[index] = 'cached'
+                        continue
+                    waited = rate_limiter.acquire(stop)
+                    if stop.is_set():
+                        break
+                    if waited:
+                        print(f"Rate limiter delayed query {index + 1} by {waited:.1f}s")
+                    with slots:
+                        with lock:
+                            statuses[index] = 'running'
+                        start = time.time()
+                        try:
+                            profiles = cached_linkedin_search(max_results=max_results, save_results=False,
+                                                              allow_sample=False, force_refresh=True,
+                                                              progress_callback=check_stop, **search)
+                            with lock:
+                                results[index] = profiles
+                                statuses[index] = 'done'
+                        except Exception as e:
+                            print(f"Batch query {index + 1} ({search['search_query']}) failed: {e}")
+                            with lock:
+                                results[index] = []
+                                statuses[index] = 'failed'
+                        print(f"Batch query {index + 1} finished in {time.time() - start:.1f}s")
+            except JobCancelled:
+                print("Batch search cancelled")
+            finally:
+                close_browser_pool()
+
+    threads = [threading.Thread(target=worker, name=f'batch-search-{i}', daemon=True)
+               for i in range(min(max_concurrency, len(searches)))]
+    for t in threads:
+        t.start()
+
+    # Poll worker progress from the calling thread so cancellation (raised by
+    # the progress callback) is seen promptly
+    try:
+        while any(t.is_alive() for t in threads):
+            with lock:
+                done = sum(1 for s in statuses.values() if s in ('done', 'cached', 'failed'))
+                found = sum(len(p) for p in results.values())
+            report(stage='batch', completed=done, total=len(searches), profiles=found)
+            # Wait on one live thread at a time so progress is reported (and
+            # cancellation noticed) about once a second however many workers run
+            alive = next((t for t in threads if t.is_alive()), None)
+            if alive:
+                alive.join(timeout=1.0)
+    except BaseException:
+        stop.set()
+        raise
+
+    # Merge in query order so ties keep the earlier query's profile
+    all_profiles = [p for index in sorted(results) for p in results[index]]
+    final_profiles = merge_profiles_by_best_connection(all_profiles)
+    if not final_profiles:
+        print("No profiles found in batch, returning sample data")
+        final_profiles = create_sample_profiles(searches[0]['search_query'])
+
+    save_profile_data(final_profiles)
+
+    report(stage='done', completed=len(searches), total=len(searches), profiles=len(final_profiles))
+    print(f"Batch result: {len(final_profiles)} unique profiles from {len(searches)} queries")
+    if return_query_counts:
+        return final_profiles, [dict(search, profiles=len(results.get(index, [])))
+                                for index, search in enumerate(searches)]
+    return final_profiles
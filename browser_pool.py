@@ -0,0 +1,203 @@
+# browser_pool.py
+import atexit
+import threading
+from contextlib import contextmanager
+from playwright.sync_api import sync_playwright
+from flask import current_app
+
+# Playwright's sync API objects can only be used from the thread that created
+# them, so every worker thread keeps its own pool. Search jobs run on a small,
+# long-lived thread pool (see job_queue.py), which keeps these browsers warm.
+_local = threading.local()
+_pools = []
+_pools_lock = threading.Lock()
+
+BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-setuid-sandbox'
+]
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+VIEWPORT = {"width": 1280, "height": 800}
+
+
+class BrowserLease:
+    """A warm browser context (plus its page) for one LinkedIn account."""
+
+    def __init__(self, account, context, page):
+        self.account = account
+        self.context = context
+        self.page = page
+        self.uses = 0
+        self.logged_in = False
+        self.broken = False
+        self.disposable = False
+        self.request_policy = None
+
+    def discard(self):
+        """Mark this context as unusable; it is closed when released."""
+        self.broken = True
+
+    def is_healthy(self):
+        try:
+            if self.broken or self.page.is_closed():
+                return False
+            self.page.evaluate("1")
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            self.context.close()
+        except Exception:
+            pass
+
+
+class BrowserPool:
+    """Long-lived Chromium instance with one logged-in context per account.
+
+    Contexts are health-checked when leased, recycled after `max_uses`
+    searches, and the whole browser is relaunched if it disconnects.
+    """
+
+    def __init__(self, headless=False, slow_mo=100, max_uses=20, on_new_context=None, executable_path=None):
+        self.headless = headless
+        self.executable_path = executable_path
+        self.slow_mo = slow_mo
+        self.max_uses = max_uses
+        self.on_new_context = on_new_context
+        self._playwright = None
+        self._browser = None
+        self._leases = {}
+        self.stats = {'launches': 0, 'contexts_created': 0, 'leases': 0, 'reused': 0, 'recycled': 0}
+
+    def _ensure_browser(self):
+        if self._browser is not None and self._browser.is_connected():
+            return self._browser
+
+        # Browser crashed or was never started - drop stale contexts and relaunch
+        if self._browser is not None:
+            print("Browser disconnected, relaunching")
+        self._leases.clear()
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+        options = {'executable_path': self.executable_path} if self.executable_path else {}
+        self._browser = self._playwright.chromium.launch(
+            headless=self.headless,
+            slow_mo=self.slow_mo,
+            args=BROWSER_ARGS,
+            **options
+        )
+        self.stats['launches'] += 1
+        return self._browser
+
+    def _new_lease(self, account, context_options=None):
+        browser = self._ensure_browser()
+        context = browser.new_context(user_agent=USER_AGENT, viewport=VIEWPORT, **(context_options or {}))
+        if self.on_new_context:
+            self.on_new_context(context)
+        page = context.new_page()
+        self.stats['contexts_created'] += 1
+        return BrowserLease(account, context, page)
+
+    @contextmanager
+    def lease(self, account, context_options=None):
+        """
+        Lease the warm context for `account`, creating it if needed. With
+        `context_options` (e.g. HAR recording) a fresh context is made with
+        them and closed on release instead of being kept warm.
+        """
+        if context_options is not None:
+            lease = self._new_lease(account, context_options)
+            lease.disposable = True
+            lease.uses += 1
+            self.stats['leases'] += 1
+            try:
+                yield lease
+            finally:
+                lease.close()
+            return
+
+        lease = self._leases.pop(account, None)
+        if lease is not None and not (self._browser and self._browser.is_connected() and lease.is_healthy()):
+            lease.close()
+            lease = None
+
+        if lease is None:
+            lease = self._new_lease(account)
+        else:
+            self.stats['reused'] += 1
+
+        lease.uses += 1
+        self.stats['leases'] += 1
+        try:
+            yield lease
+        finally:
+            self._release(lease)
+
+    def _release(self, lease):
+        if lease.uses >= self.max_uses or not lease.is_healthy():
+            self.stats['recycled'] += 1
+            lease.close()
+        else:
+            self._leases[lease.account] = lease
+
+    def close(self):
+        for lease in self._leases.values():
+            lease.close()
+        self._leases.clear()
+        try:
+            if self._browser is not None:
+                self._browser.close()
+        except Exception:
+            pass
+        try:
+            if self._playwright is not None:
+                self._playwright.stop()
+        except Exception:
+            pass
+        self._browser = None
+        self._playwright = None
+
+
+def get_browser_pool():
+    """Return this thread's browser pool, configured from the Flask app."""
+    pool = getattr(_local, 'pool', None)
+    if pool is None:
+        config = current_app.config
+        pool = BrowserPool(
+            headless=config.get('BROWSER_HEADLESS', False),
+            slow_mo=config.get('BROWSER_SLOW_MO', 100),
+            max_uses=config.get('BROWSER_MAX_USES', 20),
+            executable_path=config.get('BROWSER_EXECUTABLE_PATH') or None
+        )
+        _local.pool = pool
+        with _pools_lock:
+            _pools.append(pool)
+    return pool
+
+
+def browser_pool_stats():
+    """Return launch/lease counters for every live pool."""
+    with _pools_lock:
+        return [dict(pool.stats) for pool in _pools]
+
+
+def close_browser_pool():
+    """Close the current thread's browser pool, if it has one."""
+    pool = getattr(_local, 'pool', None)
+    if pool is not None:
+        pool.close()
+        _local.pool = None
+        with _pools_lock:
+            if pool in _pools:
+                _pools.remove(pool)
+
+
+@atexit.register
+def _close_pools_at_exit():
+    # Only pools owned by the exiting thread can be closed safely; browsers in
+    # other threads are torn down with the Playwright driver process.
+    close_browser_pool()
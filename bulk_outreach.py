@@ -0,0 +1,270 @@
+# bulk_outreach.py
+import asyncio
+import random
+import re
+import time
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+from ai_processor import build_outreach_request, clean_generated_message, create_fallback_message
+from llm_cache import completion_entry, llm_cache_key
+from openai_client import OpenAIClientManager
+
+# Drafting outreach for a whole lead list. Requests run concurrently on one
+# event loop, bounded by a semaphore; 429s and transient failures are retried
+# with exponential backoff, and the API's x-ratelimit-* headers pause the
+# whole pool (not just one request) when the budget runs out. Each draft is
+# handed to `on_draft` as soon as it completes.
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_reset(value):
+    """Seconds from a rate-limit header: '1.5' / '20ms' / '6m0s' -> float, or None."""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class BulkStats:
+    """Throughput counters for one bulk run."""
+
+    def __init__(self, total):
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.cached = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.paused_s = 0.0
+        self.tokens = 0
+        self.latencies = []
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        done = self.completed + self.failed
+        latencies = sorted(self.latencies)
+        return {
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'cached': self.cached,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+            'paused_s': round(self.paused_s, 2),
+            'tokens': self.tokens,
+            'elapsed_s': round(elapsed, 2),
+            'per_minute': round(done * 60 / elapsed, 1) if elapsed > 0 else 0,
+            'avg_latency_s': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'p95_latency_s': round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 3)
+            if latencies else None
+        }
+
+
+class BulkOutreachGenerator:
+    """
+    Generate outreach drafts for many profiles with bounded concurrency.
+
+    Profiles whose request still fails after `max_retries` get the same
+    template fallback as single-message generation, and count as failed.
+    """
+
+    def __init__(self, api_key, base_url=None, model='gpt-4', temperature=0.7, max_tokens=800, concurrency=8,
+                 max_retries=4, backoff_base=1.0, backoff_max=30.0, timeout=60.0, client_manager=None, cache=None,
+                 regenerate=False):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.concurrency = max(int(concurrency), 1)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.client_manager = client_manager
+        self.cache = cache
+        self.regenerate = regenerate
+        self._pause_until = 0.0
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter so retries from many requests don't arrive together
+        return random.uniform(0, min(self.backoff_base * 2 ** attempt, self.backoff_max))
+
+    def _pause_pool(self, seconds, stats):
+        until = time.monotonic() + seconds
+        if until > self._pause_until:
+            self._pause_until = until
+            stats.paused_s += seconds
+
+    async def _wait_for_pool(self):
+        while True:
+            delay = self._pause_until - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def _observe_headers(self, headers, stats):
+        """Pause every worker until the reset once the request budget hits zero."""
+        remaining = headers.get('x-ratelimit-remaining-requests')
+        if remaining is not None and remaining.isdigit() and int(remaining) == 0:
+            reset = parse_reset(headers.get('x-ratelimit-reset-requests'))
+            if reset:
+                self._pause_pool(reset, stats)
+
+    async def _complete(self, client, prompt, stats):
+        attempt = 0
+        while True:
+            await self._wait_for_pool()
+            try:
+                raw = await client.chat.completions.with_raw_response.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens
+                )
+                self._observe_headers(raw.headers, stats)
+                return raw.parse()
+            except (RateLimitError, APIStatusError, APIConnectionError, APITimeoutError) as e:
+                status = getattr(e, 'status_code', None)
+                if isinstance(e, APIStatusError) and status not in RETRYABLE_STATUS:
+                    raise
+                if attempt >= self.max_retries:
+                    raise
+                retry_after = None
+                response = getattr(e, 'response', None)
+                if response is not None:
+                    self._observe_headers(response.headers, stats)
+                    retry_after = parse_reset(response.headers.get('retry-after'))
+                delay = self._backoff(attempt, retry_after)
+                if status == 429:
+                    stats.rate_limited += 1
+                    # A 429 means the pool as a whole is too fast
+                    self._pause_pool(delay, stats)
+                stats.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _draft(self, client, semaphore, item, product_description, stats, on_draft, on_progress):
+        profile_id, profile, connection_path = item
+        request = build_outreach_request(profile, product_description, connection_path)
+        key = llm_cache_key(self.model, self.temperature, request['prompt'], self.max_tokens)
+        entry = None
+        if self.cache is not None:
+            if self.regenerate:
+                self.cache.bypass()
+            else:
+                entry = self.cache.get_completion(key)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if entry is not None:
+                    stats.cached += 1
+                else:
+                    response = await self._complete(client, request['prompt'], stats)
+                    entry = completion_entry(response, self.model)
+                    stats.tokens += entry['tokens']
+                    if self.cache is not None:
+                        self.cache.set(key, entry)
+                message = clean_generated_message(entry['content'], request['type'])
+                stats.completed += 1
+                fallback = False
+            except Exception as e:
+                print(f"Error drafting message for profile {profile_id}: {e}")
+                message = create_fallback_message(request['first_name'], request['role'], request['company'],
+                                                  profile, request['type'], connection_path)
+                stats.failed += 1
+                fallback = True
+            stats.latencies.append(time.perf_counter() - start)
+
+        draft = {'message': message, 'type': request['type'], 'recipient': request['recipient'],
+                 'fallback': fallback}
+        if on_draft:
+            on_draft(profile_id, draft)
+        if on_progress:
+            on_progress(stats)
+        return draft
+
+    async def run(self, items, product_description=None, on_draft=None, on_progress=None):
+        """
+        Draft a message for each (profile_id, profile, connection_path).
+        Returns (drafts by profile_id, stats summary).
+        """
+        items = list(items)
+        stats = BulkStats(len(items))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        manager = self.client_manager or OpenAIClientManager(timeout=self.timeout)
+        # Async pools belong to one event loop, so each run opens its own,
+        # sized to the concurrency, with the manager's timeouts and metrics
+        async with manager.async_http_client(max_connections=self.concurrency) as http_client:
+            # Retries are ours (pool-wide backoff), not the SDK's per-request ones
+            client = manager.get_async_client(self.api_key, self.base_url, http_client=http_client, max_retries=0)
+            drafts = await asyncio.gather(*[
+                self._draft(client, semaphore, item, product_description, stats, on_draft, on_progress)
+                for item in items
+            ])
+        stats.finished = time.perf_counter()
+        return {item[0]: draft for item, draft in zip(items, drafts)}, stats.summary()
+
+    def generate(self, items, product_description=None, on_draft=None, on_progress=None):
+        """Blocking wrapper around run() for worker threads."""
+        return asyncio.run(self.run(items, product_description, on_draft, on_progress))
+
+
+def benchmark_bulk_outreach(n_profiles=200, concurrency=16, latency=0.3, requests_per_minute=0, rate_limit_rate=0.05):
+    """Draft messages for synthetic profiles against the local fake API, sequentially and in bulk."""
+    from fake_openai_server import start_fake_server
+    from tnl_matcher import _synthetic_data
+
+    profiles, _ = _synthetic_data(n_profiles, 10, 0)
+    items = [(i, profile, None) for i, profile in enumerate(profiles)]
+    server, base_url = start_fake_server(latency=latency, jitter=latency / 3, requests_per_minute=requests_per_minute,
+                                         rate_limit_rate=rate_limit_rate, seed=1)
+    try:
+        sample = min(n_profiles, 20)
+        sequential = BulkOutreachGenerator('test-key', base_url, concurrency=1, backoff_base=0.2)
+        _, sequential_stats = sequential.generate(items[:sample])
+
+        manager = OpenAIClientManager()
+        bulk = BulkOutreachGenerator('test-key', base_url, concurrency=concurrency, backoff_base=0.2,
+                                     client_manager=manager)
+        _, stats = bulk.generate(items)
+        stats['sequential_per_minute'] = sequential_stats['per_minute']
+        stats['connections'] = manager.summary()
+        stats['server'] = dict(server.state.stats)
+        return stats
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    #   python bulk_outreach.py [n_profiles] [concurrency] [latency] [requests_per_minute]
+    import sys
+
+    results = benchmark_bulk_outreach(int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+                                      int(sys.argv[2]) if len(sys.argv) > 2 else 16,
+                                      float(sys.argv[3]) if len(sys.argv) > 3 else 0.3,
+                                      int(sys.argv[4]) if len(sys.argv) > 4 else 0)
+    print(f"Drafted {results['completed']}/{results['total']} messages in {results['elapsed_s']}s "
+          f"({results['per_minute']}/min vs {results['sequential_per_minute']}/min sequentially)")
+    print(f"Retries: {results['retries']} ({results['rate_limited']} rate limited, "
+          f"{results['paused_s']}s paused), failed: {results['failed']}")
+    print(f"Latency avg {results['avg_latency_s']}s, p95 {results['p95_latency_s']}s; "
+          f"server saw max {results['server']['max_in_flight']} in flight")
+    print(f"Connections: {results['connections']['new_connections']} opened for "
+          f"{results['connections']['requests']} requests")
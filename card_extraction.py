@@ -0,0 +1,303 @@
+# card_extraction.py
+import re
+import time
+
+from tnl_matcher import parse_shared_connections
+
+# Result card containers, tried in order until one matches
+CARD_SELECTORS = [
+    'div[data-x-search-result="LEAD"]',
+    'ol.search-results__result-list > li',
+    'li.search-results__result-item',
+    'div.search-results__result-container',
+    'div.ember-view.artdeco-list__item'  # More generic selector
+]
+
+# Per-field fallback selectors, tried in order inside each card
+CARD_FIELD_SELECTORS = {
+    'name': [
+        'a[data-anonymize="person-name"]',
+        '.artdeco-entity-lockup__title a',
+        '.artdeco-entity-lockup__title span',
+        'a[data-control-name="view_lead_panel_via_search_lead_name"]',
+        'span[data-anonymize="person-name"]'
+    ],
+    'headline': [
+        'span[data-anonymize="title"]',
+        '.artdeco-entity-lockup__subtitle',
+        '.artdeco-entity-lockup__content .artdeco-entity-lockup__subtitle',
+        '.search-result__info-container .result-lockup__highlight-keyword'
+    ],
+    'location': [
+        'span[data-anonymize="location"]',
+        '.artdeco-entity-lockup__caption',
+        '.artdeco-entity-lockup__content .artdeco-entity-lockup__caption',
+        '.search-result__info-container .result-lockup__position-location'
+    ],
+    'connection': [
+        '.artdeco-entity-lockup__degree',
+        '.artdeco-entity-lockup__badge',
+        '.search-result__social-proof-status',
+        '.search-result__connection-level',
+        '.result-lockup__badge-text'
+    ],
+    'url': [
+        'a[data-anonymize="person-name"]',
+        'a[data-lead-search-result^="profile-link"]',
+        '.artdeco-entity-lockup__title a',
+        'a[data-control-name="view_lead_panel_via_search_lead_name"]'
+    ],
+    'image': [
+        'img.artdeco-entity-lockup__image',
+        '.artdeco-entity-lockup__image img',
+        'img.presence-entity__image',
+        '.search-result__image-wrapper img',
+        '.result-lockup__icon-link img',
+        '.profile-photo-edit__preview',
+        'img[data-anonymize="person-photo"]',
+        '.artdeco-entity-lockup__image img[src]'
+    ],
+    'shared': [
+        'a[href*="SHARED_CONNECTIONS"]',
+        'button[aria-label*="mutual connection"]',
+        '.artdeco-entity-lockup__metadata'
+    ]
+}
+
+DEFAULT_PROFILE_URL = "https://www.linkedin.com/sales/"
+
+# Runs in the page and returns the raw fields of every card in one call.
+# Text fields hold the first matching element's innerText (null if no
+# selector matched); url/image hold one candidate per selector, in order.
+EXTRACT_CARDS_JS = """
+({cardSelectors, fields, maxResults}) => {
+    let cards = [];
+    let usedSelector = null;
+    for (const selector of cardSelectors) {
+        const found = document.querySelectorAll(selector);
+        if (found.length) {
+            cards = Array.from(found);
+            usedSelector = selector;
+            break;
+        }
+    }
+    const firstMatch = (card, selectors) => {
+        for (const selector of selectors) {
+            const el = card.querySelector(selector);
+            if (el) return el;
+        }
+        return null;
+    };
+    const text = (card, selectors) => {
+        const el = firstMatch(card, selectors);
+        return el ? el.innerText.trim() : null;
+    };
+    const attrs = (card, selectors, attr) => selectors.map(selector => {
+        const el = card.querySelector(selector);
+        return el ? el.getAttribute(attr) : null;
+    });
+    return {
+        selector: usedSelector,
+        total: cards.length,
+        cards: cards.slice(0, maxResults).map(card => {
+            const leadEl = card.querySelector('[data-lead-id]');
+            return {
+                name: text(card, fields.name),
+                headline: text(card, fields.headline),
+                location: text(card, fields.location),
+                connection: text(card, fields.connection),
+                shared: text(card, fields.shared),
+                url_candidates: attrs(card, fields.url, 'href'),
+                lead_id: leadEl ? leadEl.getAttribute('data-lead-id') : null,
+                links: Array.from(card.querySelectorAll('a')).map(a => a.getAttribute('href')).filter(Boolean),
+                image_candidates: attrs(card, fields.image, 'src')
+            };
+        })
+    };
+}
+"""
+
+
+def placeholder_image(i):
+    """Placeholder portrait used when a card has no usable photo."""
+    gender = "women" if i % 2 else "men"
+    return f"https://randomuser.me/api/portraits/{gender}/{(i % 10) + 20}.jpg"
+
+
+def parse_connection_level(text, default="2nd"):
+    """Map badge text such as '2nd degree connection' to 1st/2nd/3rd+."""
+    if not text:
+        return default
+    if "1st" in text:
+        return "1st"
+    if "2nd" in text:
+        return "2nd"
+    if "3rd" in text:
+        return "3rd+"
+    return default
+
+
+def resolve_profile_url(url_candidates, lead_id, links):
+    """Pick the best profile URL from a card's hrefs (same order as the handle path)."""
+    profile_url = DEFAULT_PROFILE_URL
+
+    # Approach 1: direct href from the name/profile links
+    for href in url_candidates:
+        if href and 'linkedin.com' in href:
+            profile_url = href
+            break
+
+    # Approach 2: construct a URL from a lead ID
+    if profile_url == DEFAULT_PROFILE_URL:
+        if not lead_id:
+            for href in links:
+                if 'lead/' in href:
+                    id_match = re.search(r'lead/([^,]+)', href)
+                    if id_match:
+                        lead_id = id_match.group(1)
+                        break
+        if lead_id:
+            profile_url = f"https://www.linkedin.com/sales/lead/{lead_id}"
+
+    # Approach 3: any LinkedIn profile URL in the card
+    if profile_url == DEFAULT_PROFILE_URL:
+        for href in links:
+            if 'linkedin.com/in/' in href or 'linkedin.com/sales/lead/' in href:
+                profile_url = href
+                break
+
+    # Sanitize URL - ensure it's properly formatted
+    if '?' in profile_url and not profile_url.startswith('http'):
+        profile_url = f"https://www.linkedin.com{profile_url}"
+
+    return profile_url
+
+
+def build_profile(raw, i):
+    """Turn the raw fields of one card into a profile dict."""
+    profile_image = ""
+    for src in raw.get('image_candidates') or []:
+        if src and src.strip() and not src.endswith('ghost_person.png'):
+            profile_image = src
+            break
+
+    shared_connections, shared_count = parse_shared_connections(raw.get('shared'))
+
+    return {
+        "name": raw['name'] if raw.get('name') is not None else f"Profile #{i+1}",
+        "headline": raw['headline'] if raw.get('headline') is not None else "Sales Professional",
+        "location": raw['location'] if raw.get('location') is not None else "United States",
+        "connection_level": parse_connection_level(raw.get('connection')),
+        "profile_url": resolve_profile_url(raw.get('url_candidates') or [], raw.get('lead_id'), raw.get('links') or []),
+        "profile_image": profile_image or placeholder_image(i),
+        "shared_connections": shared_connections,
+        "shared_connection_count": shared_count,
+        "mutual_connections": [],
+        "tnl_connection": False
+    }
+
+
+def extract_profiles_in_page(page, max_results=50, card_selectors=None, field_selectors=None):
+    """
+    Extract every result card with a single page.evaluate call.
+    Returns (profiles, used_selector, card_count).
+    """
+    raw = page.evaluate(EXTRACT_CARDS_JS, {
+        'cardSelectors': card_selectors or CARD_SELECTORS,
+        'fields': field_selectors or CARD_FIELD_SELECTORS,
+        'maxResults': max_results
+    })
+    profiles = [build_profile(card, i) for i, card in enumerate(raw['cards'])]
+    for profile in profiles:
+        print(f"Extracted profile: {profile['name']} ({profile['connection_level']})")
+    return profiles, raw['selector'], raw['total']
+
+
+class _RoundTripCounter:
+    """Proxy that counts calls on a page/element handle and the handles it returns."""
+
+    def __init__(self, target, counts):
+        self._target = target
+        self._counts = counts
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self._counts['round_trips'] += 1
+            return self._wrap(attr(*args, **kwargs))
+        return call
+
+    def _wrap(self, value):
+        if isinstance(value, list):
+            return [self._wrap(v) for v in value]
+        if hasattr(value, 'query_selector'):
+            return _RoundTripCounter(value, self._counts)
+        return value
+
+
+def benchmark_extraction(page, max_results=50, repeats=3):
+    """
+    Compare the element-handle path with the single in-page evaluation on the
+    page's current results. Returns round trips and best wall time per engine.
+    """
+    # Imported here: linkedin_scraper imports this module
+    from linkedin_scraper import extract_profile_from_card
+
+    results = {}
+
+    def run_handles():
+        counts = {'round_trips': 0}
+        counted_page = _RoundTripCounter(page, counts)
+        cards = []
+        for selector in CARD_SELECTORS:
+            cards = counted_page.query_selector_all(selector)
+            if cards:
+                break
+        profiles = [extract_profile_from_card(card, i) for i, card in enumerate(cards[:max_results])]
+        return profiles, counts['round_trips']
+
+    def run_in_page():
+        counts = {'round_trips': 0}
+        profiles, _, _ = extract_profiles_in_page(_RoundTripCounter(page, counts), max_results=max_results)
+        return profiles, counts['round_trips']
+
+    for engine, run in (('handles', run_handles), ('in_page', run_in_page)):
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            profiles, round_trips = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[engine] = {'profiles': len(profiles), 'round_trips': round_trips, 'seconds': round(best, 4)}
+
+    results['speedup'] = round(results['handles']['seconds'] / max(results['in_page']['seconds'], 1e-9), 1)
+    return results
+
+
+if __name__ == '__main__':
+    # Benchmark against a saved result page, or a synthetic one:
+    #   python card_extraction.py [snapshot.html]
+    import sys
+    from playwright.sync_api import sync_playwright
+    from sales_nav_fixtures import render_results_page
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            html = f.read()
+    else:
+        html = render_results_page(page_num=1, per_page=25)
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.set_content(html)
+        results = benchmark_extraction(page)
+        browser.close()
+
+    for engine in ('handles', 'in_page'):
+        r = results[engine]
+        print(f"{engine:>8}: {r['profiles']} profiles, {r['round_trips']} round trips, {r['seconds'] * 1000:.1f} ms")
+    print(f"speedup: {results['speedup']}x")
@@ -1,28 +1,29 @@
 # data_manager.py
 import os
 import json
-import pandas as pd
 from flask import current_app
 from datetime import datetime
 
+import storage
+from message_journal import get_message_journal
+from tnl_import import read_trusted_network_csv, describe_report
+
 def ensure_directories():
     """Ensure all required directories exist"""
     os.makedirs(current_app.config['DATA_DIR'], exist_ok=True)
     os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 def save_trusted_network(network_list):
-    """Save the user's trusted network to a JSON file"""
-    filepath = os.path.join(current_app.config['DATA_DIR'], 'trusted_network.json')
-    with open(filepath, 'w') as f:
-        json.dump(network_list, f)
+    """Save the user's trusted network"""
+    storage.replace_tnl_contacts(network_list)
+    storage.increment_meta('csill_version')
 
-def load_trusted_network():
-    """Load the user's trusted network from a JSON file"""
-    filepath = os.path.join(current_app.config['DATA_DIR'], 'trusted_network.json')
+def load_trusted_network(offset=0, limit=None):
+    """Load the user's trusted network"""
     try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    except:
+        return storage.load_tnl_contacts(offset=offset, limit=limit)
+    except Exception as e:
+        print(f"Error loading trusted network: {e}")
         return []
 
 def save_icp_and_personas(icp_data):
@@ -60,103 +61,116 @@ def load_icp_and_personas():
         }
 
 def save_profile_data(profiles, filename='profiles.json'):
-    """Save profiles to a JSON file"""
-    filepath = os.path.join(current_app.config['DATA_DIR'], filename)
-    with open(filepath, 'w') as f:
-        json.dump(profiles, f)
+    """Save a profile list (profiles.json names the latest search results)"""
+    list_name = storage.PROFILE_LISTS.get(filename, filename)
+    storage.replace_profiles(list_name, profiles)
+    if list_name == 'profiles':
+        # New results have to be ranked again (see results_engine)
+        storage.increment_meta('csill_version')
 
-def load_profile_data(filename='profiles.json'):
-    """Load profiles from a JSON file"""
-    filepath = os.path.join(current_app.config['DATA_DIR'], filename)
+def load_profile_data(filename='profiles.json', offset=0, limit=None):
+    """Load a profile list, optionally one page of it"""
     try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    except:
+        return storage.load_profiles(storage.PROFILE_LISTS.get(filename, filename), offset=offset, limit=limit)
+    except Exception as e:
+        print(f"Error loading profiles: {e}")
         return []
 
-def save_csill(csill_data):
-    """Save the Connection-Sorted Intelligent Lead List"""
-    filepath = os.path.join(current_app.config['DATA_DIR'], 'csill.json')
-    with open(filepath, 'w') as f:
-        json.dump(csill_data, f)
+def save_csill(csill_data, ranked_version=None):
+    """Save the Connection-Sorted Intelligent Lead List, with the csill_version it was ranked from"""
+    meta = {'csill_ranked_version': ranked_version} if ranked_version is not None else None
+    storage.replace_profiles('csill', csill_data, meta=meta)
 
-def load_csill():
+def load_csill(offset=0, limit=None):
     """Load the Connection-Sorted Intelligent Lead List"""
-    filepath = os.path.join(current_app.config['DATA_DIR'], 'csill.json')
     try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    except:
+        return storage.load_profiles('csill', offset=offset, limit=limit)
+    except Exception as e:
+        print(f"Error loading CSILL: {e}")
         return []
 
-def save_message(profile_id, message, status='approve'):
-    """Save an approved/edited message"""
-    filepath = os.path.join(current_app.config['DATA_DIR'], 'messages.json')
-    
-    try:
-        with open(filepath, 'r') as f:
-            messages = json.load(f)
-    except:
-        messages = []
-    
-    # Create new message entry
-    message_entry = {
+def load_csill_profile(profile_id):
+    """Load one CSILL profile by its position, or None"""
+    return storage.get_profile('csill', profile_id)
+
+def _message_entry(profile_id, message, status):
+    return {
         'profile_id': profile_id,
         'message': message,
         'status': status,
         'timestamp': datetime.now().isoformat()
     }
-    
-    messages.append(message_entry)
-    
-    # Write back to file
-    with open(filepath, 'w') as f:
-        json.dump(messages, f)
-    
-    return message_entry
 
-def load_messages():
-    """Load all saved messages"""
-    filepath = os.path.join(current_app.config['DATA_DIR'], 'messages.json')
+def _attach_profiles(messages):
+    """Add CSILL profile info to messages, one indexed lookup each"""
+    for message in messages:
+        profile_id = message.get('profile_id')
+        profile = load_csill_profile(profile_id) if isinstance(profile_id, int) else None
+        message['profile'] = profile or {'name': 'Unknown', 'headline': '', 'location': ''}
+    return messages
+
+def save_message(profile_id, message, status='approve', **details):
+    """Save an approved/edited message (or a generated draft, with its type and recipient)"""
+    entry = _message_entry(profile_id, message, status)
+    entry.update(details)
+    return get_message_journal().append('messages', entry)
+
+def load_messages(offset=0, limit=None, profile_id=None, status=None):
+    """Load saved messages, optionally for one profile or status"""
     try:
-        with open(filepath, 'r') as f:
-            messages = json.load(f)
-        
-        # Try to add profile info to messages
-        csill = load_csill()
-        for message in messages:
-            profile_id = message.get('profile_id')
-            if isinstance(profile_id, int) and profile_id < len(csill):
-                message['profile'] = csill[profile_id]
-            else:
-                message['profile'] = {'name': 'Unknown', 'headline': '', 'location': ''}
-        
-        return messages
-    except:
+        get_message_journal().compact()
+        return _attach_profiles(storage.load_message_entries('messages', offset=offset, limit=limit,
+                                                             profile_id=profile_id, status=status))
+    except Exception as e:
+        print(f"Error loading messages: {e}")
+        return []
+
+def count_messages(profile_id=None, status=None):
+    """Number of saved messages, optionally for one profile or status"""
+    get_message_journal().compact()
+    return storage.count_messages('messages', profile_id=profile_id, status=status)
+
+def save_approved_message(profile_id, message, status):
+    """Save a message from the review page (approve, edit or reject)"""
+    return get_message_journal().append('approved', _message_entry(profile_id, message, status))
+
+def load_approved_messages(offset=0, limit=None, profile_id=None, status=None):
+    """Load reviewed messages for the dashboard, newest first"""
+    try:
+        get_message_journal().compact()
+        return _attach_profiles(storage.load_message_entries('approved', offset=offset, limit=limit,
+                                                             profile_id=profile_id, status=status,
+                                                             newest_first=True))
+    except Exception as e:
+        print(f"Error loading approved messages: {e}")
+        return []
+
+def count_approved_messages(profile_id=None, status=None):
+    """Number of reviewed messages, optionally for one profile or status"""
+    get_message_journal().compact()
+    return storage.count_messages('approved', profile_id=profile_id, status=status)
+
+def save_search(search_query, selected_state=None, company_size=None, max_results=None, profile_count=0):
+    """Record a completed search"""
+    return storage.add_search(search_query, selected_state, company_size, max_results, profile_count)
+
+def load_searches(offset=0, limit=50):
+    """Load recorded searches, newest first"""
+    try:
+        return storage.load_searches(offset=offset, limit=limit)
+    except Exception as e:
+        print(f"Error loading searches: {e}")
         return []
 
 def import_trusted_network_from_csv(csv_path):
     """Import Trusted Network List from a CSV file"""
     try:
-        df = pd.read_csv(csv_path)
-        
-        # Check for required columns
-        if 'name' not in df.columns:
-            raise ValueError("CSV must contain a 'name' column")
-        
-        # Convert to list of dicts
-        tnl = []
-        for _, row in df.iterrows():
-            entry = {
-                'name': row['name'],
-                'trust_score': int(row['trust_score']) if 'trust_score' in row and not pd.isna(row['trust_score']) else 5,
-                'notes': row['notes'] if 'notes' in row and not pd.isna(row['notes']) else ''
-            }
-            tnl.append(entry)
+        tnl, report = read_trusted_network_csv(csv_path, current_app.config.get('TNL_IMPORT_CHUNK_ROWS', 20000))
+        print(describe_report(report))
         
         # Save the imported TNL
         save_trusted_network(tnl)
         
         return tnl, None  # Return TNL and no error
     except Exception as e:
-        return [], str(e)  # Return empty TNL and error message
\ No newline at end of file
+        return [], str(e)  # Return empty TNL and error message
@@ -0,0 +1,248 @@
+# debug_artifacts.py
+import collections
+import gzip
+import itertools
+import json
+import os
+import queue
+import random
+import shutil
+import threading
+import time
+import uuid
+from flask import current_app, has_app_context
+
+# Debug artifacts (screenshots, page text dumps, Playwright traces) of
+# scraper searches. DEBUG_ARTIFACTS sets how much a search keeps:
+#
+#   off        nothing
+#   on_error   (default) nothing is captured up front: page text and the
+#              steps a search passed through are held in a ring buffer of
+#              the last DEBUG_ARTIFACTS_RING entries, and written out, with
+#              a screenshot of the failure, only if the search fails
+#   sampled    DEBUG_ARTIFACTS_SAMPLE_RATE of searches are captured in full,
+#              the rest as on_error
+#   full       a screenshot at every step and every result page's text
+#
+# Screenshots have to be taken on the browser thread, but compressing and
+# writing happen on one background writer thread. Its queue is bounded, so
+# if it falls behind, artifacts are dropped rather than slowing a search.
+# Each search writes to DATA_DIR/debug/<stamp>-<id>/ (numbered files plus
+# index.json) and only the newest DEBUG_ARTIFACTS_KEEP of them are kept.
+# With DEBUG_TRACE_ON_FAILURE a Playwright trace is recorded during the
+# search and saved as trace.zip if it failed (open with `playwright show-trace`).
+
+LEVELS = ('off', 'on_error', 'sampled', 'full')
+
+# JPEG screenshots are a fraction of the size of PNGs and quicker to encode
+SCREENSHOT_QUALITY = 60
+
+INDEX_FILE = 'index.json'
+TRACE_FILE = 'trace.zip'
+
+
+class ArtifactWriter:
+    """Background thread that compresses and writes artifacts in the order they were queued."""
+
+    def __init__(self, max_queue=64, keep=20):
+        self.keep = keep
+        self.stats = {'written': 0, 'dropped': 0, 'bytes': 0}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._prune_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._worker, name='debug-artifacts', daemon=True)
+        self._thread.start()
+
+    def submit(self, directory, filename, data, compress=False):
+        """Queue bytes or text for writing; returns False, dropping it, if the queue is full."""
+        try:
+            self._queue.put_nowait((directory, filename, data, compress))
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def flush(self):
+        """Block until everything queued so far has been written."""
+        self._queue.join()
+
+    def ensure_directory(self, directory):
+        """Create a search's directory, pruning old searches if it is new. Thread-safe."""
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+            with self._prune_lock:
+                self._prune(os.path.dirname(directory))
+
+    def _write(self, directory, filename, data, compress):
+        self.ensure_directory(directory)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if compress:
+            data = gzip.compress(data, compresslevel=5)
+            filename += '.gz'
+        with open(os.path.join(directory, filename), 'wb') as f:
+            f.write(data)
+        self.stats['written'] += 1
+        self.stats['bytes'] += len(data)
+
+    def _prune(self, root):
+        """Remove all but the newest `keep` search directories (0 keeps everything)."""
+        if not self.keep:
+            return
+        searches = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+        for name in searches[:-self.keep]:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+    def _worker(self):
+        while True:
+            directory, filename, data, compress = self._queue.get()
+            try:
+                self._write(directory, filename, data, compress)
+            except Exception as e:
+                print(f"Could not write debug artifact {filename}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_artifact_writer():
+    """The process-wide artifact writer, started on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            config = current_app.config if has_app_context() else {}
+            _writer = ArtifactWriter(max_queue=config.get('DEBUG_ARTIFACTS_QUEUE', 64),
+                                     keep=config.get('DEBUG_ARTIFACTS_KEEP', 20))
+        return _writer
+
+
+def flush_artifacts():
+    """Wait for queued artifacts to be written (a no-op if nothing was ever queued)."""
+    if _writer is not None:
+        _writer.flush()
+
+
+class DebugArtifacts:
+    """The debug artifacts of one search; see the module comment for the levels."""
+
+    def __init__(self, level, directory, ring_size=20, trace=False, writer=None):
+        self.level = level
+        self.directory = directory
+        self.trace = trace and level != 'off'
+        self.writer = writer
+        self.ring = collections.deque(maxlen=ring_size)
+        self.errors = []
+        self.files = []
+        self._seq = itertools.count(1)
+        self._traced_context = None
+
+    @classmethod
+    def from_config(cls, stamp):
+        """Artifacts for a search started at `stamp`, at the level DEBUG_ARTIFACTS asks for."""
+        config = current_app.config
+        level = (config.get('DEBUG_ARTIFACTS') or 'on_error').lower().replace('-', '_')
+        if level not in LEVELS:
+            print(f"Unknown DEBUG_ARTIFACTS level {level!r}, using on_error")
+            level = 'on_error'
+        if level == 'sampled':
+            level = 'full' if random.random() < config.get('DEBUG_ARTIFACTS_SAMPLE_RATE', 0.05) else 'on_error'
+        directory = os.path.join(config['DATA_DIR'], 'debug', f"{stamp}-{uuid.uuid4().hex[:6]}")
+        return cls(level, directory, ring_size=config.get('DEBUG_ARTIFACTS_RING', 20),
+                   trace=config.get('DEBUG_TRACE_ON_FAILURE', False),
+                   writer=get_artifact_writer() if level != 'off' else None)
+
+    @property
+    def failed(self):
+        return bool(self.errors)
+
+    def _write(self, filename, data, compress=False):
+        if self.writer.submit(self.directory, filename, data, compress):
+            self.files.append(filename + '.gz' if compress else filename)
+
+    def _screenshot(self, page, name):
+        try:
+            data = page.screenshot(type='jpeg', quality=SCREENSHOT_QUALITY)
+        except Exception as e:
+            print(f"Debug screenshot {name} failed: {e}")
+            return
+        self._write(f"{next(self._seq):03d}_{name}.jpg", data)
+
+    def screenshot(self, page, name):
+        """A checkpoint: a screenshot in full mode, a breadcrumb in the ring buffer otherwise."""
+        if self.level == 'full':
+            self._screenshot(page, name)
+        elif self.level == 'on_error':
+            self.ring.append((next(self._seq), 'step', name, {'url': page.url, 'at': time.time()}))
+
+    def text(self, name, text):
+        """A page text dump: gzipped to disk in full mode, held in the ring buffer otherwise. Thread-safe."""
+        if text is None or self.level == 'off':
+            return
+        seq = next(self._seq)
+        if self.level == 'full':
+            self._write(f"{seq:03d}_{name}.txt", text, compress=True)
+        else:
+            self.ring.append((seq, 'text', name, text))
+
+    def error(self, page, name, exc=None):
+        """A failed step: screenshot the page now (unless off) and mark the search failed."""
+        if self.level == 'off':
+            return
+        try:
+            url = page.url
+        except Exception:
+            url = None
+        self.errors.append({'step': name, 'error': str(exc) if exc else '', 'url': url})
+        self._screenshot(page, name)
+
+    def start_trace(self, context):
+        """Record a Playwright trace of `context` until finish() (with DEBUG_TRACE_ON_FAILURE)."""
+        if not self.trace:
+            return
+        try:
+            # DOM snapshots only; trace screenshots would cost as much as the captures this replaces
+            context.tracing.start(snapshots=True, screenshots=False)
+            self._traced_context = context
+        except Exception as e:
+            print(f"Could not start trace: {e}")
+
+    def finish(self, failed=False):
+        """
+        End of the search. If it failed (an error() was recorded, or
+        `failed`), write out the ring buffer and the trace; write an index
+        of whatever was kept. Returns the directory, or None if nothing was.
+        """
+        if self.level == 'off':
+            return None
+        failed = failed or self.failed
+        if self._traced_context:
+            try:
+                if failed:
+                    # Usually the first file of the search, so this is where old searches get pruned
+                    self.writer.ensure_directory(self.directory)
+                    self._traced_context.tracing.stop(path=os.path.join(self.directory, TRACE_FILE))
+                    self.files.append(TRACE_FILE)
+                else:
+                    self._traced_context.tracing.stop()
+            except Exception as e:
+                print(f"Could not stop trace: {e}")
+            self._traced_context = None
+
+        steps = []
+        if failed:
+            for seq, kind, name, payload in list(self.ring):
+                if kind == 'text':
+                    self._write(f"{seq:03d}_{name}.txt", payload, compress=True)
+                else:
+                    steps.append(dict(payload, seq=seq, step=name))
+        self.ring.clear()
+        if not self.files:
+            return None
+
+        index = {'level': self.level, 'failed': failed, 'errors': self.errors, 'steps': steps,
+                 'files': list(self.files), 'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        self._write(INDEX_FILE, json.dumps(index, indent=2))
+        print(f"Debug artifacts: {len(self.files)} files in {self.directory}")
+        return self.directory
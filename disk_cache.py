@@ -0,0 +1,145 @@
+# disk_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(*parts):
+    """Stable SHA-256 key for any JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """
+    Small JSON-on-disk cache with a TTL and size-bounded LRU eviction.
+
+    Each entry is one file, <key>.json, holding the value and the time it was
+    stored. Several processes (gunicorn workers) can share a directory: the
+    files are the source of truth, an entry another process wrote is picked
+    up on lookup, and recency is the file mtime, which every hit touches.
+    Before evicting, the index is re-read from disk, so entries are evicted
+    oldest-used first across all processes once there are more than
+    `max_entries` of them or they take more than `max_bytes` on disk.
+    """
+
+    def __init__(self, directory, ttl=3600, max_entries=200, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> size in bytes, least recently used first
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self):
+        """Rebuild the index from the files on disk, least recently used first."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # removed by another process meanwhile
+                entries.append((stat.st_mtime, entry.name[:-len('.json')], stat.st_size))
+        self._index = OrderedDict((key, size) for _, key, size in sorted(entries))
+
+    @property
+    def size_bytes(self):
+        return sum(self._index.values())
+
+    def _remove(self, key):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key, default=None):
+        """Return the cached value, or `default` if missing or expired."""
+        with self._lock:
+            # Not in the index may still be on disk, written by another process
+            path = self._path(key)
+            try:
+                with open(path, 'r') as f:
+                    entry = json.load(f)
+            except FileNotFoundError:
+                self._index.pop(key, None)
+                self.stats['misses'] += 1
+                return default
+            except (OSError, ValueError):
+                self._remove(key)
+                self.stats['misses'] += 1
+                return default
+
+            if self.ttl and time.time() - entry.get('stored_at', 0) > self.ttl:
+                self._remove(key)
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return default
+
+            # Touch the file so recency survives a restart and is shared
+            self._index[key] = self._index.get(key) or os.path.getsize(path)
+            self._index.move_to_end(key)
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.stats['hits'] += 1
+            return entry['value']
+
+    def set(self, key, value):
+        """Store `value` (JSON-serializable) and evict down to the size bounds."""
+        data = json.dumps({'stored_at': time.time(), 'value': value})
+        with self._lock:
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            self.stats['stores'] += 1
+            self._evict()
+
+    def _evict(self):
+        # Count what every process has stored, not just this one
+        self._load_index()
+        total = self.size_bytes
+        while self._index and (len(self._index) > self.max_entries or total > self.max_bytes):
+            key, size = next(iter(self._index.items()))
+            self._remove(key)
+            total -= size
+            self.stats['evictions'] += 1
+
+    def delete(self, key):
+        with self._lock:
+            existed = key in self._index or os.path.exists(self._path(key))
+            self._remove(key)
+            return existed
+
+    def clear(self):
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._remove(key)
+
+    def summary(self):
+        """Counters plus the current size and hit rate."""
+        with self._lock:
+            self._load_index()
+            lookups = self.stats['hits'] + self.stats['misses']
+            summary = dict(self.stats)
+            summary['entries'] = len(self._index)
+            summary['size_bytes'] = self.size_bytes
+            summary['hit_rate'] = round(self.stats['hits'] / lookups, 3) if lookups else 0.0
+            return summary
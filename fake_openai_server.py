@@ -0,0 +1,193 @@
+# fake_openai_server.py
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A stand-in for the OpenAI chat completions endpoint, for exercising bulk
+# generation offline. It answers POST /v1/chat/completions after a simulated
+# latency, enforces a requests-per-minute budget the way the real API does
+# (x-ratelimit-* headers, 429 + retry-after once exhausted) and can inject
+# random 429s and 500s. With "stream": true the reply arrives word by word
+# as server-sent events, `token_latency` apart.
+
+
+class FakeOpenAIState:
+    def __init__(self, latency=0.2, jitter=0.1, requests_per_minute=0, error_rate=0.0, rate_limit_rate=0.0,
+                 seed=None, token_latency=0.02):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.jitter = jitter
+        self.requests_per_minute = requests_per_minute
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.stats = {'requests': 0, 'completed': 0, 'rate_limited': 0, 'errors': 0, 'max_in_flight': 0}
+        self.in_flight = 0
+
+    def admit(self):
+        """(status, headers) for the next request, updating the rate window."""
+        with self.lock:
+            self.stats['requests'] += 1
+            now = time.monotonic()
+            if now - self.window_start >= 60:
+                self.window_start, self.window_count = now, 0
+            reset = max(60 - (now - self.window_start), 0)
+            headers = {}
+            if self.requests_per_minute:
+                remaining = self.requests_per_minute - self.window_count
+                headers = {'x-ratelimit-limit-requests': str(self.requests_per_minute),
+                           'x-ratelimit-remaining-requests': str(max(remaining - 1, 0)),
+                           'x-ratelimit-reset-requests': f"{reset:.3f}s"}
+                if remaining <= 0:
+                    self.stats['rate_limited'] += 1
+                    headers['retry-after'] = f"{reset:.3f}"
+                    return 429, headers
+            roll = self.random.random()
+            if roll < self.rate_limit_rate:
+                self.stats['rate_limited'] += 1
+                headers['retry-after'] = '0.5'
+                return 429, headers
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats['errors'] += 1
+                return 500, headers
+            self.window_count += 1
+            self.in_flight += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.in_flight)
+            return 200, headers
+
+    def delay(self):
+        with self.lock:
+            return max(self.latency + self.random.uniform(-self.jitter, self.jitter), 0)
+
+    def done(self):
+        with self.lock:
+            self.in_flight -= 1
+            self.stats['completed'] += 1
+
+
+def _completion(model, prompt):
+    """A short canned message that names whoever the prompt is about."""
+    name = 'there'
+    if 'message for ' in prompt:
+        name = prompt.split('message for ', 1)[1].split(',', 1)[0].split(' ')[0]
+    content = (f"Hi {name}, I came across your work and would love to connect and swap notes on how "
+               f"your team approaches growth this year.")
+    prompt_tokens = len(prompt.split())
+    completion_tokens = len(content.split())
+    return {
+        'id': f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+        'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                  'total_tokens': prompt_tokens + completion_tokens}
+    }
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this, Nagle's
+    # algorithm holds the body back for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            payload = {}
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send(404, {'error': {'message': f"Unknown path {self.path}", 'type': 'invalid_request_error'}}, {})
+            return
+
+        state = self.server.state
+        status, headers = state.admit()
+        if status == 429:
+            self._send(429, {'error': {'message': 'Rate limit reached for requests', 'type': 'requests',
+                                       'code': 'rate_limit_exceeded'}}, headers)
+            return
+        if status != 200:
+            self._send(status, {'error': {'message': 'The server had an error', 'type': 'server_error'}}, headers)
+            return
+
+        try:
+            time.sleep(state.delay())
+            prompt = ' '.join(m.get('content') or '' for m in payload.get('messages') or [])
+            completion = _completion(payload.get('model', 'gpt-4'), prompt)
+            if payload.get('stream'):
+                self._stream(completion, headers, state.token_latency)
+            else:
+                self._send(200, completion, headers)
+        finally:
+            state.done()
+
+    def _stream(self, completion, headers, token_latency):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None):
+            chunk = {'id': completion['id'], 'object': 'chat.completion.chunk', 'created': completion['created'],
+                     'model': completion['model'],
+                     'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        event({'role': 'assistant', 'content': ''})
+        words = completion['choices'][0]['message']['content'].split(' ')
+        for i, word in enumerate(words):
+            time.sleep(token_latency)
+            event({'content': word if i == 0 else ' ' + word})
+        event({}, 'stop')
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_fake_server(host='127.0.0.1', port=0, **options):
+    """Serve the fake API on a background thread. Returns (server, base_url); stop with server.shutdown()."""
+    server = ThreadingHTTPServer((host, port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.state = FakeOpenAIState(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == '__main__':
+    #   python fake_openai_server.py [port] [latency] [requests_per_minute]
+    #   OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 python app.py
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8089
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    rpm = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    server, base_url = start_fake_server(port=port, latency=latency, requests_per_minute=rpm)
+    print(f"Fake OpenAI API at {base_url} (latency {latency}s, {rpm or 'unlimited'} requests/minute)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,115 @@
+# har_recording.py
+import glob
+import json
+import os
+import time
+from flask import current_app
+
+# Record-and-replay of scraper sessions. With SCRAPER_HAR_MODE=record a
+# search runs in a fresh browser context that records a HAR of every
+# request, and each result page's HTML and text are saved next to it:
+#
+#   DATA_DIR/recordings/<stamp>/
+#       session.har.zip       requests and responses (bodies attached)
+#       storage_state.json    cookies the session started with
+#       page_<n>.html/.txt    page.content() / inner_text('body') per page
+#       manifest.json         query, filters, base URL, profiles per page
+#
+# With SCRAPER_HAR_MODE=replay the context starts from the recorded cookies
+# and is served entirely from the HAR through Playwright routing (anything
+# not in it is aborted), so extraction and pagination can be re-run offline
+# with no account. A replay only matches if it repeats the recorded search.
+# Recordings hold a live session's cookies: keep them as private as
+# cookies.json.
+
+HAR_FILE = 'session.har.zip'
+STORAGE_STATE_FILE = 'storage_state.json'
+MANIFEST_FILE = 'manifest.json'
+
+
+def recordings_dir():
+    config = current_app.config
+    return config.get('SCRAPER_HAR_DIR') or os.path.join(config['DATA_DIR'], 'recordings')
+
+
+def latest_recording(directory=None):
+    """Newest recording directory with a manifest, or None."""
+    manifests = sorted(glob.glob(os.path.join(directory or recordings_dir(), '*', MANIFEST_FILE)))
+    return os.path.dirname(manifests[-1]) if manifests else None
+
+
+def load_manifest(recording):
+    with open(os.path.join(recording, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class HARSession:
+    """A search being recorded to, or replayed from, one recording directory."""
+
+    def __init__(self, mode, directory):
+        self.mode = mode
+        self.directory = directory
+        self.har_path = os.path.join(directory, HAR_FILE)
+        self.pages = []
+        self.logged_in = False
+
+    @classmethod
+    def from_config(cls, stamp):
+        """The session SCRAPER_HAR_MODE asks for ('record' / 'replay'), or None."""
+        config = current_app.config
+        mode = (config.get('SCRAPER_HAR_MODE') or 'off').lower()
+        if mode == 'record':
+            directory = os.path.join(recordings_dir(), stamp)
+            os.makedirs(directory, exist_ok=True)
+            return cls('record', directory)
+        if mode == 'replay':
+            directory = config.get('SCRAPER_HAR_REPLAY') or latest_recording()
+            if not directory or not os.path.exists(os.path.join(directory, HAR_FILE)):
+                raise FileNotFoundError(f"No HAR recording to replay in {directory or recordings_dir()}")
+            return cls('replay', directory)
+        return None
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def context_options(self):
+        """Extra browser.new_context() options for this session."""
+        if self.recording:
+            return {'record_har_path': self.har_path, 'record_har_mode': 'full'}
+        state = os.path.join(self.directory, STORAGE_STATE_FILE)
+        return {'storage_state': state} if os.path.exists(state) else {}
+
+    def prepare(self, context):
+        """Call once the context exists (and cookies are loaded), before the first navigation."""
+        if self.recording:
+            context.storage_state(path=os.path.join(self.directory, STORAGE_STATE_FILE))
+            print(f"Recording session to {self.directory}")
+        else:
+            context.route_from_har(self.har_path, not_found='abort')
+            print(f"Replaying session from {self.directory}")
+
+    def save_page(self, page_num, html_content, page_text=None, profiles=None):
+        """Keep a recorded result page's HTML and text (no-op when replaying)."""
+        if not self.recording:
+            return
+        with open(os.path.join(self.directory, f"page_{page_num}.html"), 'w', encoding='utf-8') as f:
+            f.write(html_content)
+        if page_text is not None:
+            with open(os.path.join(self.directory, f"page_{page_num}.txt"), 'w', encoding='utf-8') as f:
+                f.write(page_text)
+        self.pages.append({'page': page_num, 'profiles': profiles})
+
+    def finish(self, **details):
+        """Write the manifest of a recording; the HAR itself is written when its context closes."""
+        if not self.recording:
+            return
+        manifest = dict(details, pages=self.pages, logged_in_during_recording=self.logged_in,
+                        base_url=current_app.config.get('LINKEDIN_BASE_URL') or 'https://www.linkedin.com',
+                        recorded_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+        with open(os.path.join(self.directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
@@ -0,0 +1,296 @@
+# job_queue.py
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import storage
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = {COMPLETED, FAILED, CANCELLED}
+
+# Progress reports are written to the shared store at most this often (seconds)
+PROGRESS_SAVE_INTERVAL = 0.5
+
+
+class JobCancelled(BaseException):
+    """Raised inside a job function when the job has been cancelled.
+
+    Derives from BaseException so the scraper's broad `except Exception`
+    fallbacks don't swallow it; `finally` blocks still close the browser.
+    """
+
+
+class Job:
+    """A unit of background work with progress, result and cancellation."""
+
+    def __init__(self, kind, params=None, queue=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = PENDING
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._queue = queue
+        self._saved_at = 0.0
+        # A job running in another worker process, loaded from the store
+        self.remote = False
+
+    @classmethod
+    def from_record(cls, record, queue=None):
+        """Read-only view of a job another process owns (see storage.load_job)."""
+        job = cls(record['kind'], queue=queue)
+        job.remote = True
+        for field in ('id', 'status', 'progress', 'result', 'error', 'created_at', 'started_at', 'finished_at'):
+            setattr(job, field, record[field])
+        if record['cancel_requested']:
+            job.cancel_event.set()
+        return job
+
+    def update_progress(self, **progress):
+        """Merge progress fields (e.g. page, max_pages, profiles) into the job.
+
+        Raises JobCancelled if the job was cancelled, here or from another
+        worker process, so long-running work stops at its next progress report.
+        """
+        with self._lock:
+            self.progress.update(progress)
+        if self._queue:
+            self._queue._save(self, force=False)
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        """Request cancellation. Pending jobs are cancelled immediately."""
+        self.cancel_event.set()
+        if self.remote:
+            # The owning process notices at the job's next progress report
+            self._queue._request_cancel(self)
+            return
+        with self._lock:
+            if self.status == PENDING:
+                self.status = CANCELLED
+                self.finished_at = time.time()
+        if self._queue:
+            self._queue._request_cancel(self)
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def to_dict(self):
+        """Return a JSON-serializable status snapshot (without the result)."""
+        with self._lock:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'elapsed': round((self.finished_at or time.time()) - (self.started_at or self.created_at), 2)
+            }
+
+    def to_record(self):
+        """Everything storage.save_job keeps, including the result."""
+        with self._lock:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+
+
+class JobQueue:
+    """Bounded worker pool that runs jobs inside a Flask app context.
+
+    Job state and progress are written through to the app database
+    (storage.save_job), so status polls and cancel requests work from any
+    gunicorn worker, not just the one running the job. Finished jobs are
+    kept for `retention` seconds so their status and results can still be
+    polled.
+
+    Every `heartbeat_interval` seconds the queue marks its unfinished jobs
+    as alive. A pending or running job not marked for `stale_after`
+    seconds belonged to a worker that exited or restarted; it is failed
+    when a queue starts and when another process reads it, so pollers stop
+    waiting for it.
+    """
+
+    def __init__(self, app=None, max_workers=2, retention=3600, heartbeat_interval=15, stale_after=90):
+        self.max_workers = max_workers
+        self.retention = retention
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stop = threading.Event()
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config.get('JOB_WORKERS', self.max_workers)
+        self.retention = app.config.get('JOB_RETENTION', self.retention)
+        self.heartbeat_interval = app.config.get('JOB_HEARTBEAT_INTERVAL', self.heartbeat_interval)
+        self.stale_after = app.config.get('JOB_STALE_AFTER', self.stale_after)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job-worker')
+        app.extensions['job_queue'] = self
+        self._fail_stale_jobs()
+        threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True).start()
+
+    def submit(self, kind, func, params=None):
+        """Queue `func(job, **params)` and return the new Job."""
+        self._prune()
+        job = Job(kind, params, queue=self)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._save(job)
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id):
+        """A job of this process, or a read-only view of one running in another."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and job_id:
+            try:
+                with self.app.app_context():
+                    record = storage.load_job(job_id)
+                    if record and record['status'] not in FINISHED_STATES and self._is_stale(record):
+                        self._fail_stale_jobs()
+                        record = storage.load_job(job_id)
+            except Exception as e:
+                print(f"Could not load job {job_id}: {e}")
+                record = None
+            job = Job.from_record(record, queue=self) if record else None
+        return job
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job:
+            job.cancel()
+        return job
+
+    def list_jobs(self, kind=None):
+        """Jobs of this process."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if kind:
+            jobs = [j for j in jobs if j.kind == kind]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def _save(self, job, force=True):
+        """Write the job's state to the store; picks up cancel requests from other processes."""
+        now = time.monotonic()
+        if not force and now - job._saved_at < PROGRESS_SAVE_INTERVAL:
+            return
+        job._saved_at = now
+        try:
+            with self.app.app_context():
+                if storage.save_job(job.to_record()):
+                    job.cancel_event.set()
+        except Exception as e:
+            print(f"Could not save job {job.id}: {e}")
+
+    def _is_stale(self, record):
+        return (record['updated_at'] or record['created_at']) < time.time() - self.stale_after
+
+    def _fail_stale_jobs(self):
+        try:
+            with self.app.app_context():
+                failed = storage.fail_stale_jobs(time.time() - self.stale_after)
+            if failed:
+                print(f"Marked {failed} jobs of exited workers as failed")
+        except Exception as e:
+            print(f"Could not check for stale jobs: {e}")
+
+    def _heartbeat(self):
+        """Keep this process's unfinished jobs fresh in the store; also picks up cancel requests."""
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                jobs = {job.id: job for job in self._jobs.values() if job.status not in FINISHED_STATES}
+            try:
+                with self.app.app_context():
+                    for job_id in storage.touch_jobs(list(jobs)):
+                        jobs[job_id].cancel_event.set()
+            except Exception as e:
+                print(f"Job heartbeat failed: {e}")
+
+    def _request_cancel(self, job):
+        try:
+            with self.app.app_context():
+                storage.request_job_cancel(job.id)
+        except Exception as e:
+            print(f"Could not cancel job {job.id}: {e}")
+        if not job.remote:
+            self._save(job)
+
+    def _run(self, job, func):
+        # Picks up a cancel request made from another worker while pending
+        self._save(job)
+        if job.cancelled:
+            with job._lock:
+                job.status = CANCELLED
+                job.finished_at = job.finished_at or time.time()
+            self._save(job)
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._save(job)
+        try:
+            with self.app.app_context():
+                job.result = func(job, **job.params)
+            job.status = CANCELLED if job.cancelled else COMPLETED
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+
+    def _prune(self):
+        """Drop finished jobs older than the retention window."""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.status in FINISHED_STATES and (job.finished_at or 0) < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        try:
+            with self.app.app_context():
+                storage.delete_finished_jobs(cutoff)
+        except Exception as e:
+            print(f"Could not prune jobs: {e}")
+
+    def shutdown(self, wait=False):
+        self._stop.set()
+        for job in self.list_jobs():
+            job.cancel()
+        if self._executor:
+            self._executor.shutdown(wait=wait)
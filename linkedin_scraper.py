@@ -6,8 +6,18 @@ import os
 import re
 import urllib.parse
 import random
-from playwright.sync_api import sync_playwright
 from flask import current_app
+from browser_pool import get_browser_pool
+from data_manager import save_profile_data
+from page_waits import PageWaiter, StageTimings, LEAD_CARD_SELECTOR
+from card_extraction import CARD_SELECTORS, CARD_FIELD_SELECTORS, extract_profiles_in_page
+from results_parser import parse_results_html, parse_anonymized_fields
+from tnl_matcher import parse_shared_connections
+from search_pipeline import PageParsePipeline
+from har_recording import HARSession
+from debug_artifacts import DebugArtifacts
+from request_policy import RequestPolicy
+from sales_nav_urls import GeoIdTable, build_search_url, headcount_bucket
 
 def save_cookies(context, filename="cookies.json"):
     """Save browser cookies for future sessions."""
@@ -30,11 +40,16 @@ def load_cookies(context, filename="cookies.json"):
         print(f"Error loading cookies: {e}")
         return False
 
-def perform_login(page, email, password):
-    """Explicitly login to LinkedIn Sales Navigator."""
+def linkedin_url(path):
+    """URL of a LinkedIn page under LINKEDIN_BASE_URL (pointed at mock_sales_nav_server for offline runs)."""
+    base = current_app.config.get('LINKEDIN_BASE_URL') or 'https://www.linkedin.com'
+    return base.rstrip('/') + path
+
+def perform_login(page, email, password, artifacts=None):
+    """Explicitly login to LinkedIn Sales Navigator. `artifacts` is the search's DebugArtifacts, if any."""
     try:
         # Go directly to Sales Navigator login
-        page.goto("https://www.linkedin.com/sales/login", timeout=30000)
+        page.goto(linkedin_url("/sales/login"), timeout=30000)
         
         # Wait for page to be fully loaded
         page.wait_for_load_state('networkidle', timeout=30000)
@@ -104,15 +119,15 @@ def perform_login(page, email, password):
         # Wait for page to stabilize after login
         page.wait_for_load_state('networkidle', timeout=30000)
         
-        # Take screenshot for debugging
-        screenshots_dir = os.path.join(current_app.config['DATA_DIR'], 'screenshots')
-        os.makedirs(screenshots_dir, exist_ok=True)
-        page.screenshot(path=os.path.join(screenshots_dir, 'post_login.png'))
+        if artifacts:
+            artifacts.screenshot(page, 'post_login')
         
         # Check if still on login/checkpoint page
         current_url = page.url.lower()
         if any(x in current_url for x in ['checkpoint', 'login', 'signup']):
             print("Still on login/checkpoint page - possible credentials/CAPTCHA issue.")
+            if artifacts:
+                artifacts.error(page, 'login_checkpoint')
             try:
                 error_selectors = [
                     '.error-message',
@@ -135,13 +150,8 @@ def perform_login(page, email, password):
     
     except Exception as e:
         print(f"Login error: {e}")
-        # Take error screenshot
-        try:
-            screenshots_dir = os.path.join(current_app.config['DATA_DIR'], 'screenshots')
-            os.makedirs(screenshots_dir, exist_ok=True)
-            page.screenshot(path=os.path.join(screenshots_dir, 'login_error.png'))
-        except:
-            pass
+        if artifacts:
+            artifacts.error(page, 'login_error', e)
         return False
 
 def create_sample_profiles(search_query):
@@ -202,298 +212,321 @@ def create_sample_profiles(search_query):
     
     return profiles
 
-def scroll_and_load_more(page, max_scrolls=3, wait_sec=2):
+def scroll_and_load_more(page, max_scrolls=3, wait_sec=2, waiter=None):
     """
     Scroll down multiple times to trigger auto-loading of additional results.
-    Adjust max_scrolls and wait_sec as needed.
+    Each scroll waits (at most wait_sec) for the DOM to settle, and scrolling
+    stops early once a scroll no longer loads anything new.
     """
+    waiter = waiter or PageWaiter(page)
+    last_state = None
     for i in range(max_scrolls):
         # Evaluate JS to scroll to bottom
         page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        time.sleep(wait_sec)
-        print(f"Scroll #{i+1} done, waited {wait_sec} sec")
+        waiter.for_dom_settled(budget=wait_sec)
+        state = page.evaluate("() => [document.body.scrollHeight, document.querySelectorAll('li, div[data-x-search-result]').length]")
+        print(f"Scroll #{i+1} done")
+        if state == last_state:
+            print("Nothing new loaded, stopping scroll")
+            break
+        last_state = state
 
-def extract_sales_nav_profiles(page, max_results=50):
-    """Extract profiles after scrolling to load more leads."""
-    # Attempt to load more leads
-    scroll_and_load_more(page, max_scrolls=5, wait_sec=2)
+def find_result_cards(page):
+    """Return (cards, selector) for the first card selector that matches."""
+    for selector in CARD_SELECTORS:
+        cards = page.query_selector_all(selector)
+        if len(cards) > 0:
+            return cards, selector
+    return [], None
+
+def extract_profile_from_card(card, i):
+    """
+    Extract one profile from a result card element handle.
     
-    # Save page content for debugging
-    page_text = page.inner_text('body')
-    html_content = page.content()
+    This is the original per-field path: every query_selector, inner_text
+    and get_attribute call is a separate round trip to the browser. It is
+    kept for the "handles" extraction engine and for benchmarking against
+    card_extraction.extract_profiles_in_page.
+    """
+    # Try different selectors for name
+    name_elem = None
+    name_selectors = [
+        'a[data-anonymize="person-name"]',
+        '.artdeco-entity-lockup__title a',
+        '.artdeco-entity-lockup__title span',
+        'a[data-control-name="view_lead_panel_via_search_lead_name"]',
+        'span[data-anonymize="person-name"]'
+    ]
     
-    data_dir = current_app.config['DATA_DIR']
-    with open(os.path.join(data_dir, "sales_nav_debug.txt"), "w", encoding="utf-8") as f:
-        f.write(page_text)
+    for selector in name_selectors:
+        name_elem = card.query_selector(selector)
+        if name_elem:
+            break
     
-    profiles = []
+    name = name_elem.inner_text().strip() if name_elem else f"Profile #{i+1}"
     
-    # Try multiple card selectors
-    card_selectors = [
-        'div[data-x-search-result="LEAD"]',
-        'ol.search-results__result-list > li',
-        'li.search-results__result-item',
-        'div.search-results__result-container',
-        'div.ember-view.artdeco-list__item'  # More generic selector
+    # Try different selectors for headline/title
+    title_elem = None
+    title_selectors = [
+        'span[data-anonymize="title"]',
+        '.artdeco-entity-lockup__subtitle',
+        '.artdeco-entity-lockup__content .artdeco-entity-lockup__subtitle',
+        '.search-result__info-container .result-lockup__highlight-keyword'
     ]
     
-    cards = []
-    used_selector = None
+    for selector in title_selectors:
+        title_elem = card.query_selector(selector)
+        if title_elem:
+            break
+    
+    headline = title_elem.inner_text().strip() if title_elem else "Sales Professional"
+    
+    # Try different selectors for location
+    location_elem = None
+    location_selectors = [
+        'span[data-anonymize="location"]',
+        '.artdeco-entity-lockup__caption',
+        '.artdeco-entity-lockup__content .artdeco-entity-lockup__caption',
+        '.search-result__info-container .result-lockup__position-location'
+    ]
     
-    for selector in card_selectors:
-        temp_cards = page.query_selector_all(selector)
-        if len(temp_cards) > 0:
-            cards = temp_cards
-            used_selector = selector
+    for selector in location_selectors:
+        location_elem = card.query_selector(selector)
+        if location_elem:
             break
     
-    # Take a screenshot of the results
-    screenshots_dir = os.path.join(current_app.config['DATA_DIR'], 'screenshots')
-    page.screenshot(path=os.path.join(screenshots_dir, "sales_nav_results.png"))
+    location = location_elem.inner_text().strip() if location_elem else "United States"
     
-    print(f"Found {len(cards)} potential lead cards after scrolling using selector: {used_selector}")
+    # Extract connection level
+    connection_level = "2nd"  # Default to 2nd connection
     
-    # If no cards found, try a direct string search in the HTML
-    if not cards:
-        # Extract profile data using regex
-        # Most commonly used HTML patterns in Sales Navigator
-        name_pattern = r'<a [^>]*data-anonymize="person-name"[^>]*>([^<]+)<\/a>'
-        headline_pattern = r'<span [^>]*data-anonymize="title"[^>]*>([^<]+)<\/span>'
-        location_pattern = r'<span [^>]*data-anonymize="location"[^>]*>([^<]+)<\/span>'
-        # New: Try to extract image URLs using regex
-        image_pattern = r'<img [^>]*src="([^"]+)"[^>]*data-anonymize="person-photo"[^>]*>'
-        
-        names = re.findall(name_pattern, html_content)
-        headlines = re.findall(headline_pattern, html_content)
-        locations = re.findall(location_pattern, html_content)
-        images = re.findall(image_pattern, html_content)
+    connection_elem = None
+    connection_selectors = [
+        '.artdeco-entity-lockup__degree',
+        '.artdeco-entity-lockup__badge',
+        '.search-result__social-proof-status',
+        '.search-result__connection-level',
+        '.result-lockup__badge-text'
+    ]
+    
+    for selector in connection_selectors:
+        connection_elem = card.query_selector(selector)
+        if connection_elem:
+            break
+    
+    if connection_elem:
+        connection_text = connection_elem.inner_text()
+        if "1st" in connection_text:
+            connection_level = "1st"
+        elif "2nd" in connection_text:
+            connection_level = "2nd"
+        elif "3rd" in connection_text or "3rd+" in connection_text:
+            connection_level = "3rd+"
+    
+    # Extract profile URL
+    profile_url = "https://www.linkedin.com/sales/"  # Default fallback URL
+    try:
+        # Try multiple approaches to get the URL
         
-        print(f"Regex found {len(names)} names, {len(headlines)} headlines, {len(locations)} locations, and {len(images)} images")
+        # Approach 1: Direct href extraction
+        for url_selector in [
+            'a[data-anonymize="person-name"]',
+            'a[data-lead-search-result^="profile-link"]',
+            '.artdeco-entity-lockup__title a',
+            'a[data-control-name="view_lead_panel_via_search_lead_name"]'
+        ]:
+            url_elem = card.query_selector(url_selector)
+            if url_elem:
+                href = url_elem.get_attribute('href')
+                if href and ('linkedin.com' in href):
+                    profile_url = href
+                    print(f"Found URL using selector {url_selector}: {profile_url}")
+                    break
         
-        # Create profiles from matched data
-        count = min(len(names), max_results)
-        for i in range(count):
-            # Generate random profile image if none found
-            profile_image = ""
-            if i < len(images) and images[i]:
-                profile_image = images[i]
-            else:
-                # Use placeholder image as fallback
-                gender = "women" if i % 2 else "men"
-                profile_image = f"https://randomuser.me/api/portraits/{gender}/{(i % 10) + 20}.jpg"
+        # Approach 2: If no URL found, try to extract a lead ID and construct a URL
+        if profile_url == "https://www.linkedin.com/sales/":
+            # Look for data attributes that might contain IDs
+            lead_id = None
+            lead_elem = card.query_selector('[data-lead-id]')
+            if lead_elem:
+                lead_id = lead_elem.get_attribute('data-lead-id')
             
-            profile = {
-                "name": names[i] if i < len(names) else f"Profile #{i+1}",
-                "headline": headlines[i] if i < len(headlines) else "Sales Professional",
-                "location": locations[i] if i < len(locations) else "United States",
-                "connection_level": "2nd",  # Default to 2nd connection
-                "profile_url": "https://www.linkedin.com/sales/",
-                "profile_image": profile_image,  # Add profile image
-                "mutual_connections": [],
-                "tnl_connection": False
-            }
+            if not lead_id:
+                # Try another approach - look in the href for an ID pattern
+                for link in card.query_selector_all('a'):
+                    href = link.get_attribute('href')
+                    if href and 'lead/' in href:
+                        # Extract ID from URL like /sales/lead/ACwAAAXHNY8BnLN80jtYvUtcELLYYY3YYbHpqrk,NAME_SEARCH
+                        id_match = re.search(r'lead/([^,]+)', href)
+                        if id_match:
+                            lead_id = id_match.group(1)
+                            break
             
-            profiles.append(profile)
-            print(f"Created profile from regex: {profile['name']}")
-    else:
-        # Process cards found using selectors
+            # Construct URL if we found an ID
+            if lead_id:
+                profile_url = f"https://www.linkedin.com/sales/lead/{lead_id}"
+                print(f"Constructed URL from lead ID: {profile_url}")
+        
+        # Approach 3: Look for any LinkedIn URL in the card
+        if profile_url == "https://www.linkedin.com/sales/":
+            for link in card.query_selector_all('a'):
+                href = link.get_attribute('href')
+                if href and ('linkedin.com/in/' in href or 'linkedin.com/sales/lead/' in href):
+                    profile_url = href
+                    print(f"Found LinkedIn profile URL: {profile_url}")
+                    break
+        
+        # Sanitize URL - ensure it's properly formatted
+        if '?' in profile_url and not profile_url.startswith('http'):
+            profile_url = f"https://www.linkedin.com{profile_url}"
+        
+        print(f"Final URL for {name}: {profile_url}")
+
+    except Exception as e:
+        print(f"Error extracting URL: {e}")
+    
+    # Extract profile image URL - NEW CODE
+    profile_image = ""
+    try:
+        # Try different image selectors
+        img_selectors = [
+            'img.artdeco-entity-lockup__image',
+            '.artdeco-entity-lockup__image img',
+            'img.presence-entity__image',
+            '.search-result__image-wrapper img',
+            '.result-lockup__icon-link img',
+            '.profile-photo-edit__preview',
+            'img[data-anonymize="person-photo"]',
+            '.artdeco-entity-lockup__image img[src]'
+        ]
+        
+        for selector in img_selectors:
+            img_elem = card.query_selector(selector)
+            if img_elem:
+                src = img_elem.get_attribute('src')
+                if src and src.strip() and not src.endswith('ghost_person.png'):
+                    profile_image = src
+                    print(f"Found profile image: {profile_image}")
+                    break
+        
+        # If no image found, use a placeholder
+        if not profile_image:
+            gender = "women" if i % 2 else "men"
+            profile_image = f"https://randomuser.me/api/portraits/{gender}/{(i % 10) + 20}.jpg"
+            print(f"Using placeholder image: {profile_image}")
+    
+    except Exception as e:
+        print(f"Error extracting profile image: {e}")
+        # Use a placeholder image if we encounter an error
+        gender = "women" if i % 2 else "men"
+        profile_image = f"https://randomuser.me/api/portraits/{gender}/{(i % 10) + 20}.jpg"
+    
+    # Extract the shared-connections line, same selectors as the in_page engine
+    shared_text = None
+    for selector in CARD_FIELD_SELECTORS['shared']:
+        shared_elem = card.query_selector(selector)
+        if shared_elem:
+            shared_text = shared_elem.inner_text().strip()
+            break
+    shared_connections, shared_count = parse_shared_connections(shared_text)
+    
+    # Create profile object
+    profile = {
+        "name": name,
+        "headline": headline,
+        "location": location,
+        "connection_level": connection_level,
+        "profile_url": profile_url,
+        "profile_image": profile_image,  # Add profile image URL
+        "shared_connections": shared_connections,
+        "shared_connection_count": shared_count,
+        "mutual_connections": [],
+        "tnl_connection": False
+    }
+    
+    print(f"Extracted profile: {name} ({connection_level})")
+    return profile
+
+def save_page_snapshot(html_content, name):
+    """Archive a result page's HTML so it can be re-parsed offline."""
+    snapshot_dir = os.path.join(current_app.config['DATA_DIR'], 'snapshots')
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = os.path.join(snapshot_dir, f"{name}.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html_content)
+    return path
+
+def page_text_wanted(artifacts=None, har=None):
+    """Whether anything keeps result page text: debug artifacts (unless off) or a HAR recording."""
+    return bool((artifacts and artifacts.level != 'off') or (har and har.recording))
+
+def capture_result_page(page, waiter=None, with_text=True):
+    """Scroll to load all leads, then capture the page's text (None unless `with_text`) and HTML."""
+    # Attempt to load more leads
+    scroll_and_load_more(page, max_scrolls=5, wait_sec=2, waiter=waiter)
+    # inner_text lays out the whole page, so skip it when nobody keeps the text
+    page_text = page.inner_text('body') if with_text else None
+    return page_text, page.content()
+
+def extract_page_profiles(page, html_content, max_results=50, engine=None):
+    """
+    Profiles of a captured result page with EXTRACTION_ENGINE: all cards in
+    one in-page evaluation, the captured HTML parsed offline with lxml, or
+    the per-field element handle path. Must run on the browser thread
+    (except for 'html').
+    """
+    engine = engine or current_app.config.get('EXTRACTION_ENGINE', 'in_page')
+    if engine == 'handles':
+        profiles = []
+        cards, used_selector = find_result_cards(page)
+        card_count = len(cards)
         for i, card in enumerate(cards[:max_results]):
             try:
-                # Try different selectors for name
-                name_elem = None
-                name_selectors = [
-                    'a[data-anonymize="person-name"]',
-                    '.artdeco-entity-lockup__title a',
-                    '.artdeco-entity-lockup__title span',
-                    'a[data-control-name="view_lead_panel_via_search_lead_name"]',
-                    'span[data-anonymize="person-name"]'
-                ]
-                
-                for selector in name_selectors:
-                    name_elem = card.query_selector(selector)
-                    if name_elem:
-                        break
-                
-                name = name_elem.inner_text().strip() if name_elem else f"Profile #{i+1}"
-                
-                # Try different selectors for headline/title
-                title_elem = None
-                title_selectors = [
-                    'span[data-anonymize="title"]',
-                    '.artdeco-entity-lockup__subtitle',
-                    '.artdeco-entity-lockup__content .artdeco-entity-lockup__subtitle',
-                    '.search-result__info-container .result-lockup__highlight-keyword'
-                ]
-                
-                for selector in title_selectors:
-                    title_elem = card.query_selector(selector)
-                    if title_elem:
-                        break
-                
-                headline = title_elem.inner_text().strip() if title_elem else "Sales Professional"
-                
-                # Try different selectors for location
-                location_elem = None
-                location_selectors = [
-                    'span[data-anonymize="location"]',
-                    '.artdeco-entity-lockup__caption',
-                    '.artdeco-entity-lockup__content .artdeco-entity-lockup__caption',
-                    '.search-result__info-container .result-lockup__position-location'
-                ]
-                
-                for selector in location_selectors:
-                    location_elem = card.query_selector(selector)
-                    if location_elem:
-                        break
-                
-                location = location_elem.inner_text().strip() if location_elem else "United States"
-                
-                # Extract connection level
-                connection_level = "2nd"  # Default to 2nd connection
-                
-                connection_elem = None
-                connection_selectors = [
-                    '.artdeco-entity-lockup__degree',
-                    '.artdeco-entity-lockup__badge',
-                    '.search-result__social-proof-status',
-                    '.search-result__connection-level',
-                    '.result-lockup__badge-text'
-                ]
-                
-                for selector in connection_selectors:
-                    connection_elem = card.query_selector(selector)
-                    if connection_elem:
-                        break
-                
-                if connection_elem:
-                    connection_text = connection_elem.inner_text()
-                    if "1st" in connection_text:
-                        connection_level = "1st"
-                    elif "2nd" in connection_text:
-                        connection_level = "2nd"
-                    elif "3rd" in connection_text or "3rd+" in connection_text:
-                        connection_level = "3rd+"
-                
-                # Extract profile URL
-                profile_url = "https://www.linkedin.com/sales/"  # Default fallback URL
-                try:
-                    # Try multiple approaches to get the URL
-                    
-                    # Approach 1: Direct href extraction
-                    for url_selector in [
-                        'a[data-anonymize="person-name"]',
-                        'a[data-lead-search-result^="profile-link"]',
-                        '.artdeco-entity-lockup__title a',
-                        'a[data-control-name="view_lead_panel_via_search_lead_name"]'
-                    ]:
-                        url_elem = card.query_selector(url_selector)
-                        if url_elem:
-                            href = url_elem.get_attribute('href')
-                            if href and ('linkedin.com' in href):
-                                profile_url = href
-                                print(f"Found URL using selector {url_selector}: {profile_url}")
-                                break
-                    
-                    # Approach 2: If no URL found, try to extract a lead ID and construct a URL
-                    if profile_url == "https://www.linkedin.com/sales/":
-                        # Look for data attributes that might contain IDs
-                        lead_id = None
-                        lead_elem = card.query_selector('[data-lead-id]')
-                        if lead_elem:
-                            lead_id = lead_elem.get_attribute('data-lead-id')
-                        
-                        if not lead_id:
-                            # Try another approach - look in the href for an ID pattern
-                            for link in card.query_selector_all('a'):
-                                href = link.get_attribute('href')
-                                if href and 'lead/' in href:
-                                    # Extract ID from URL like /sales/lead/ACwAAAXHNY8BnLN80jtYvUtcELLYYY3YYbHpqrk,NAME_SEARCH
-                                    id_match = re.search(r'lead/([^,]+)', href)
-                                    if id_match:
-                                        lead_id = id_match.group(1)
-                                        break
-                        
-                        # Construct URL if we found an ID
-                        if lead_id:
-                            profile_url = f"https://www.linkedin.com/sales/lead/{lead_id}"
-                            print(f"Constructed URL from lead ID: {profile_url}")
-                    
-                    # Approach 3: Look for any LinkedIn URL in the card
-                    if profile_url == "https://www.linkedin.com/sales/":
-                        for link in card.query_selector_all('a'):
-                            href = link.get_attribute('href')
-                            if href and ('linkedin.com/in/' in href or 'linkedin.com/sales/lead/' in href):
-                                profile_url = href
-                                print(f"Found LinkedIn profile URL: {profile_url}")
-                                break
-                    
-                    # Sanitize URL - ensure it's properly formatted
-                    if '?' in profile_url and not profile_url.startswith('http'):
-                        profile_url = f"https://www.linkedin.com{profile_url}"
-                    
-                    print(f"Final URL for {name}: {profile_url}")
-
-                except Exception as e:
-                    print(f"Error extracting URL: {e}")
-                
-                # Extract profile image URL - NEW CODE
-                profile_image = ""
-                try:
-                    # Try different image selectors
-                    img_selectors = [
-                        'img.artdeco-entity-lockup__image',
-                        '.artdeco-entity-lockup__image img',
-                        'img.presence-entity__image',
-                        '.search-result__image-wrapper img',
-                        '.result-lockup__icon-link img',
-                        '.profile-photo-edit__preview',
-                        'img[data-anonymize="person-photo"]',
-                        '.artdeco-entity-lockup__image img[src]'
-                    ]
-                    
-                    for selector in img_selectors:
-                        img_elem = card.query_selector(selector)
-                        if img_elem:
-                            src = img_elem.get_attribute('src')
-                            if src and src.strip() and not src.endswith('ghost_person.png'):
-                                profile_image = src
-                                print(f"Found profile image: {profile_image}")
-                                break
-                    
-                    # If no image found, use a placeholder
-                    if not profile_image:
-                        gender = "women" if i % 2 else "men"
-                        profile_image = f"https://randomuser.me/api/portraits/{gender}/{(i % 10) + 20}.jpg"
-                        print(f"Using placeholder image: {profile_image}")
-                
-                except Exception as e:
-                    print(f"Error extracting profile image: {e}")
-                    # Use a placeholder image if we encounter an error
-                    gender = "women" if i % 2 else "men"
-                    profile_image = f"https://randomuser.me/api/portraits/{gender}/{(i % 10) + 20}.jpg"
-                
-                # Create profile object
-                profile = {
-                    "name": name,
-                    "headline": headline,
-                    "location": location,
-                    "connection_level": connection_level,
-                    "profile_url": profile_url,
-                    "profile_image": profile_image,  # Add profile image URL
-                    "mutual_connections": [],
-                    "tnl_connection": False
-                }
-                
-                profiles.append(profile)
-                print(f"Extracted profile: {name} ({connection_level})")
-                
+                profiles.append(extract_profile_from_card(card, i))
             except Exception as e:
                 print(f"Error extracting profile {i+1}: {e}")
+    elif engine == 'html':
+        profiles, used_selector, card_count = parse_results_html(html_content, max_results=max_results)
+    else:
+        profiles, used_selector, card_count = extract_profiles_in_page(page, max_results=max_results)
     
+    print(f"Found {card_count} potential lead cards after scrolling using selector: {used_selector}")
+    
+    # If no cards found, pair up the data-anonymize fields in the HTML
+    if not card_count:
+        profiles = parse_anonymized_fields(html_content, max_results=max_results)
+        for profile in profiles:
+            print(f"Created profile from page HTML: {profile['name']}")
     return profiles
 
-def navigate_to_next_page(page):
+def extract_sales_nav_profiles(page, max_results=50, waiter=None, snapshot_name=None, har=None, page_num=None,
+                               artifacts=None):
+    """
+    Extract profiles after scrolling to load more leads. `har` is the
+    HARSession recording this search and `artifacts` its DebugArtifacts, if any.
+    """
+    page_text, html_content = capture_result_page(page, waiter=waiter,
+                                                  with_text=page_text_wanted(artifacts, har))
+    
+    if artifacts:
+        artifacts.text(f"sales_nav_page_{page_num or 1}", page_text)
+    
+    if snapshot_name and current_app.config.get('SAVE_PAGE_SNAPSHOTS', False):
+        save_page_snapshot(html_content, snapshot_name)
+    
+    profiles = extract_page_profiles(page, html_content, max_results=max_results)
+    
+    if artifacts:
+        artifacts.screenshot(page, "sales_nav_results")
+    
+    if har:
+        har.save_page(page_num, html_content, page_text, profiles=len(profiles))
+    
+    return profiles
+
+def navigate_to_next_page(page, waiter=None):
     """Navigate to the next page of search results. Returns True if successful."""
+    waiter = waiter or PageWaiter(page)
     try:
         # Try different next page button selectors
         next_button_selectors = [
@@ -514,9 +547,9 @@ def navigate_to_next_page(page):
                     print("Next page button is disabled, reached last page")
                     return False
                 
-                # Click the button
-                next_button.click()
-                time.sleep(3)  # Wait for page to load
+                # Click the button and wait for the search API to answer
+                with waiter.for_search_response(budget=3):
+                    next_button.click()
                 print("Navigated to next page")
                 return True
         
@@ -535,8 +568,8 @@ def navigate_to_next_page(page):
             # Look for the next page link
             for link in pagination_links:
                 if link.inner_text().strip() == str(next_page):
-                    link.click()
-                    time.sleep(3)
+                    with waiter.for_search_response(budget=3):
+                        link.click()
                     print(f"Navigated to page {next_page} via pagination link")
                     return True
         
@@ -550,7 +583,7 @@ def navigate_to_next_page(page):
                 next_page = current_page + 1
                 next_url = current_url.replace(f'page={current_page}', f'page={next_page}')
                 page.goto(next_url)
-                time.sleep(3)
+                waiter.for_selector(LEAD_CARD_SELECTOR, budget=3)
                 print(f"Navigated to page {next_page} via URL modification")
                 return True
             
@@ -558,13 +591,13 @@ def navigate_to_next_page(page):
         elif '?' in page.url:
             next_url = page.url + '&page=2'
             page.goto(next_url)
-            time.sleep(3)
+            waiter.for_selector(LEAD_CARD_SELECTOR, budget=3)
             print("Navigated to page 2 via URL addition")
             return True
         else:
             next_url = page.url + '?page=2'
             page.goto(next_url)
-            time.sleep(3)
+            waiter.for_selector(LEAD_CARD_SELECTOR, budget=3)
             print("Navigated to page 2 via URL addition")
             return True
         
@@ -616,7 +649,10 @@ def close_saved_searches_popup(page):
                 if close_button and close_button.is_visible(timeout=1000):
                     close_button.click()
                     print("Closed 'Saved searches' popup")
-                    page.wait_for_timeout(1000)  # Wait for popup to close
+                    try:
+                        close_button.wait_for(state='hidden', timeout=1000)  # Wait for popup to close
+                    except Exception:
+                        pass
                     return True
             except Exception:
                 continue
@@ -626,97 +662,181 @@ def close_saved_searches_popup(page):
         print(f"Error handling saved searches popup: {e}")
         return False
 
-def linkedin_search(search_query, max_results=20, selected_state=None, company_size=None):
+SEARCH_INPUT_SELECTORS = [
+    'input[aria-label="Search by keywords"]',
+    'input.search-global-typeahead__input',
+    'input.global-typeahead__input',
+    'input[placeholder*="Search"]'
+]
+
+def report_progress(progress_callback, **progress):
+    """Forward progress fields to the caller's callback, if any."""
+    if progress_callback:
+        progress_callback(**progress)
+
+def linkedin_search(search_query, max_results=20, selected_state=None, company_size=None, progress_callback=None,
+                    profiles_callback=None, save_results=True, allow_sample=True):
     """
     Search LinkedIn for profiles with pagination:
     1) Start with Sales Navigator
-    2) Apply geography and company size filters if selected
+    2) Apply geography and company size filters if selected, in the search
+       URL where possible (SEARCH_URL_DIRECT, see sales_nav_urls.py)
     3) Navigate through multiple pages (up to 5)
     4) Fall back to regular LinkedIn if needed
     5) Return sample data only as a last resort
+    
+    progress_callback, if given, is called with keyword fields such as
+    stage, page, max_pages and profiles as the search advances, and once
+    at the end with stage_timings (seconds per scraper stage).
+    
+    profiles_callback, if given, is called as (page_num, profiles) each time
+    a Sales Navigator result page has been extracted, so callers can stream
+    results before the search finishes. With SEARCH_PIPELINE enabled it runs
+    on the parser thread.
+    
+    save_results=False skips writing profiles.json and allow_sample=False
+    returns an empty list instead of sample data (used by batch searches,
+    which merge and save the results of several queries themselves).
+    
+    SCRAPER_HAR_MODE=record / replay records this search to, or replays it
+    from, a HAR recording (see har_recording.py). Screenshots and page
+    dumps are kept as DEBUG_ARTIFACTS says (see debug_artifacts.py).
     """
     data_dir = current_app.config['DATA_DIR']
-    screenshots_dir = os.path.join(data_dir, 'screenshots')
-    os.makedirs(screenshots_dir, exist_ok=True)
     
     all_profiles = []
+    search_stamp = time.strftime('%Y%m%d-%H%M%S')
+    
+    report_progress(progress_callback, stage='launching', profiles=0)
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=False,
-            slow_mo=100,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--no-sandbox',
-                '--disable-setuid-sandbox'
-            ]
-        )
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800}
-        )
-        page = context.new_page()
+    email = current_app.config['LINKEDIN_EMAIL']
+    password = current_app.config['LINKEDIN_PASSWORD']
+    timings = StageTimings()
+    har = HARSession.from_config(search_stamp)
+    artifacts = DebugArtifacts.from_config(search_stamp)
+    search_path = None
+    replaying = bool(har and har.replaying)
+    
+    # Lease a warm browser context for this account; Chromium is only
+    # launched (and cookies loaded) the first time or after a recycle.
+    # Recording or replaying gets a fresh context of its own
+    launch_start = time.perf_counter()
+    with get_browser_pool().lease(email, context_options=har.context_options() if har else None) as lease:
+        context = lease.context
+        page = lease.page
+        waiter = PageWaiter(page)
         
-        cookie_loaded = load_cookies(context)
-        print(f"Cookie loaded: {cookie_loaded}")
+        # A replay starts from the cookies it was recorded with
+        if lease.uses == 1 and not replaying:
+            cookie_loaded = load_cookies(context)
+            print(f"Cookie loaded: {cookie_loaded}")
+        if har:
+            har.prepare(context)
+        artifacts.start_trace(context)
+        # Images, fonts and trackers are blocked per stage (see request_policy.py)
+        policy = RequestPolicy.for_lease(lease)
+        policy.reset_stats()
+        timings.record('launch', time.perf_counter() - launch_start, warm=lease.uses > 1)
         
         try:
-            # Go to Sales Nav
-            page.goto("https://www.linkedin.com/sales/home", timeout=30000)
-            page.screenshot(path=os.path.join(screenshots_dir, "initial_page.png"))
-            
-            # Check login
-            if 'login' in page.url.lower():
-                print("Login page detected, attempting to login")
-                email = current_app.config['LINKEDIN_EMAIL']
-                password = current_app.config['LINKEDIN_PASSWORD']
+            # A warm context that already passed the login check can go
+            # straight to People Search
+            if not lease.logged_in:
+                policy.stage = 'login'
+                with timings.stage('login'):
+                    # Go to Sales Nav
+                    page.goto(linkedin_url("/sales/home"), timeout=30000)
+                    artifacts.screenshot(page, "initial_page")
+                    
+                    # Check login
+                    if 'login' in page.url.lower():
+                        print("Login page detected, attempting to login")
+                        report_progress(progress_callback, stage='logging_in')
+                        
+                        if perform_login(page, email, password, artifacts=artifacts):
+                            if har:
+                                har.logged_in = True
+                            if not replaying:
+                                save_cookies(context)
+                            page.goto(linkedin_url("/sales/home"), timeout=30000)
+                            waiter.for_dom_settled(budget=2)
+                        else:
+                            lease.discard()
+                            # Fallback sample
+                            return create_sample_profiles(search_query) if allow_sample else []
                 
-                if perform_login(page, email, password):
-                    save_cookies(context)
-                    page.goto("https://www.linkedin.com/sales/home", timeout=30000)
-                    time.sleep(2)
-                else:
-                    browser.close()
-                    # Fallback sample
-                    sample = create_sample_profiles(search_query)
-                    return sample
+                lease.logged_in = True
             
             # APPROACH 1: Try Sales Navigator
+            # With SEARCH_URL_DIRECT the keywords and every filter that can be
+            # encoded go straight into the search URL (see sales_nav_urls.py);
+            # only a geography whose ID has not been learned yet is clicked
+            geo_ids = GeoIdTable.from_config()
+            direct = current_app.config.get('SEARCH_URL_DIRECT', True)
+            geo_id = geo_ids.get(selected_state) if direct and selected_state else None
+            search_path = "/sales/search/people"
+            if direct:
+                search_path = build_search_url(search_query, geo_id=geo_id, geo_text=selected_state,
+                                               company_size=company_size)
+            geography_ui = bool(selected_state) and not geo_id
+            company_size_ui = bool(company_size) and not (direct and headcount_bucket(company_size))
+            
             # Navigate to People Search
-            page.goto("https://www.linkedin.com/sales/search/people", timeout=30000)
-            time.sleep(3)
+            report_progress(progress_callback, stage='searching')
+            policy.stage = 'search'
+            search_start = time.perf_counter()
+            page.goto(linkedin_url(search_path), timeout=30000)
+            waiter.for_selector(', '.join(SEARCH_INPUT_SELECTORS), budget=3)
+            
+            # The session of a warm context may have expired since its last use
+            if 'login' in page.url.lower():
+                print("Session expired, logging in again")
+                report_progress(progress_callback, stage='logging_in')
+                if perform_login(page, email, password, artifacts=artifacts):
+                    if har:
+                        har.logged_in = True
+                    if not replaying:
+                        save_cookies(context)
+                    page.goto(linkedin_url(search_path), timeout=30000)
+                    waiter.for_selector(', '.join(SEARCH_INPUT_SELECTORS), budget=3)
+                else:
+                    lease.discard()
+                    return create_sample_profiles(search_query) if allow_sample else []
             
-            # Find search input
+            # Find search input (a direct URL has already run the search)
             search_input = None
-            for sel in [
-                'input[aria-label="Search by keywords"]',
-                'input.search-global-typeahead__input',
-                'input.global-typeahead__input',
-                'input[placeholder*="Search"]'
-            ]:
-                node = page.query_selector(sel)
-                if node:
-                    search_input = node
-                    break
+            if not direct:
+                for sel in SEARCH_INPUT_SELECTORS:
+                    node = page.query_selector(sel)
+                    if node:
+                        search_input = node
+                        break
+            else:
+                print(f"Searching by URL: {search_path}")
             
             sales_nav_successful = False
             
-            if search_input:
-                search_input.click()
-                search_input.fill("")
-                time.sleep(0.5)
-                search_input.fill(search_query)
-                search_input.press('Enter')
+            if direct or search_input:
+                if search_input:
+                    search_input.click()
+                    search_input.fill("")
+                    search_input.fill(search_query)
+                    search_input.press('Enter')
                 
                 # Wait for results to load
                 try:
-                    page.wait_for_selector('div[data-x-search-result="LEAD"]', timeout=30000)
-                    time.sleep(3)  # Give page a moment to fully load
+                    page.wait_for_selector(LEAD_CARD_SELECTOR, timeout=30000)
+                    waiter.for_dom_settled(budget=3)  # Let the first results finish rendering
+                    timings.record('search', time.perf_counter() - search_start)
                     
-                    # Apply filters if selected
-                    if selected_state or company_size:
+                    # Apply filters that are not in the URL
+                    if geography_ui or company_size_ui:
+                        report_progress(progress_callback, stage='filtering')
+                        policy.stage = 'filter'
+                        filter_start = time.perf_counter()
+                        
                         # Apply geography filter if selected
-                        if selected_state:
+                        if geography_ui:
                             print(f"Applying geography filter for {selected_state}")
                             
                             # Click geography filter button to expand it
@@ -745,10 +865,11 @@ def linkedin_search(search_query, max_results=20, selected_state=None, company_s
                                 try:
                                     geography_button.click()
                                     print("Clicked geography filter button")
-                                    page.wait_for_timeout(2000)  # Wait for dropdown to appear
+                                    # Wait for dropdown to appear
+                                    waiter.for_selector('input[placeholder="Add locations"], input.search-filter-typeahead__input, .search-filter-typeahead input', budget=2)
                                     
                                     # Take a screenshot after clicking the geography button
-                                    page.screenshot(path=os.path.join(screenshots_dir, "geography_dropdown_open.png"))
+                                    artifacts.screenshot(page, "geography_dropdown_open")
                                     
                                     # Find and focus the locations input
                                     locations_input = None
@@ -779,7 +900,6 @@ def linkedin_search(search_query, max_results=20, selected_state=None, company_s
                                             locations_input.click()
                                             locations_input.press("Control+a")  # Select all text
                                             locations_input.press("Backspace")  # Delete selected text
-                                            page.wait_for_timeout(500)
                                             
                                             print(f"Typing location: {selected_state}")
                                             # Type location with deliberate typing
@@ -787,10 +907,10 @@ def linkedin_search(search_query, max_results=20, selected_state=None, company_s
                                                 locations_input.type(char, delay=100)  # 100ms delay between keystrokes
                                             
                                             # Wait for suggestions to appear
-                                            page.wait_for_timeout(2000)
+                                            waiter.for_selector('li[role="option"]', budget=2)
                                             
                                             # Take a screenshot to verify typing 
-                                            page.screenshot(path=os.path.join(screenshots_dir, "geography_typing_complete.png"))
+                                            artifacts.screenshot(page, "geography_typing_complete")
                                             
                                             # Now try to find and click the appropriate suggestion
                                             dropdown_item = page.locator(f'li[role="option"]:has-text("{selected_state}")').first
@@ -813,9 +933,10 @@ def linkedin_search(search_query, max_results=20, selected_state=None, company_s
                                                     except Exception:
                                                         continue
                                             
-                                            page.wait_for_timeout(1000)
+                                            waiter.for_dom_settled(budget=1)
                                             
                                             # Look for and click "Include" button after selecting the location
+                                            results_before = waiter.results_signature()
                                             include_button = None
                                             for button_text in ["Include", "Apply", "Done"]:
                                                 try:
@@ -828,31 +949,34 @@ def linkedin_search(search_query, max_results=20, selected_state=None, company_s
                                                     continue
                                             
                                             # Wait for results to update
-                                            page.wait_for_timeout(3000)
+                                            waiter.for_results_change(results_before, budget=3)
                                             
                                             # Check for and close the saved searches popup
                                             close_saved_searches_popup(page)
                                             
                                             # Take screenshot after applying filter
-                                            page.screenshot(path=os.path.join(screenshots_dir, "geography_filter_applied.png"))
+                                            artifacts.screenshot(page, "geography_filter_applied")
                                         except Exception as e:
                                             print(f"Error applying geography filter: {e}")
+                                            artifacts.error(page, "geography_filter_error", e)
                                             # Try to press Enter to apply the filter as a last resort
                                             try:
+                                                results_before = waiter.results_signature()
                                                 locations_input.press("Enter")
                                                 print("Pressed Enter to apply geography filter")
-                                                page.wait_for_timeout(2000)
+                                                waiter.for_results_change(results_before, budget=2)
                                                 # Check for and close the saved searches popup
                                                 close_saved_searches_popup(page)
                                             except Exception:
                                                 print("Failed to press Enter")
                                 except Exception as e:
                                     print(f"Error with geography button interaction: {e}")
+                                    artifacts.error(page, "geography_button_error", e)
                             else:
                                 print("Geography button not found or not visible")
                         
                         # Apply company size filter if selected
-                        if company_size:
+                        if company_size_ui:
                             print(f"Applying company size filter: {company_size}")
                             try:
                                 # Click company size filter button
@@ -872,10 +996,10 @@ def linkedin_search(search_query, max_results=20, selected_state=None, company_s
                                 if company_size_button:
                                     company_size_button.click()
                                     print("Clicked company size filter button")
-                                    page.wait_for_timeout(2000)
+                                    waiter.for_dom_settled(budget=2)
                                     
                                     # Take screenshot of company size dropdown
-                                    page.screenshot(path=os.path.join(screenshots_dir, "company_size_dropdown.png"))
+                                    artifacts.screenshot(page, "company_size_dropdown")
                                     
                                     # Map the company size value to the corresponding selector
                                     size_selectors = {
@@ -894,7 +1018,8 @@ def linkedin_search(search_query, max_results=20, selected_state=None, company_s
                                         if size_option and size_option.is_visible(timeout=1000):
                                             size_option.click()
                                             print(f"Selected company size: {company_size}")
-                                            page.wait_for_timeout(1000)
+                                            waiter.for_dom_settled(budget=1)
+                                            results_before = waiter.results_signature()
                                             
                                             # Look for and click Apply/Done button
                                             for button_text in ["Apply", "Done"]:
@@ -908,13 +1033,13 @@ def linkedin_search(search_query, max_results=20, selected_state=None, company_s
                                                     continue
                                             
                                             # Wait for results to update
-                                            page.wait_for_timeout(3000)
+                                            waiter.for_results_change(results_before, budget=3)
                                             
                                             # Check for and close the saved searches popup
                                             close_saved_searches_popup(page)
                                             
                                             # Take screenshot after applying filter
-                                            page.screenshot(path=os.path.join(screenshots_dir, "company_size_filter_applied.png"))
+                                            artifacts.screenshot(page, "company_size_filter_applied")
                                         else:
                                             print(f"Company size option not found: {company_size}")
                                     else:
@@ -923,42 +1048,115 @@ def linkedin_search(search_query, max_results=20, selected_state=None, company_s
                                     print("Company size filter button not found")
                             except Exception as e:
                                 print(f"Error applying company size filter: {e}")
-                                page.screenshot(path=os.path.join(screenshots_dir, "company_size_filter_error.png"))
+                                artifacts.error(page, "company_size_filter_error", e)
+                        
+                        timings.record('filter', time.perf_counter() - filter_start)
+                        
+                        # Remember the geography's ID so the next search can skip the clicks
+                        if geography_ui:
+                            learned = geo_ids.learn_from_url(page.url, geo_text=selected_state)
+                            if learned:
+                                print(f"Learned Sales Navigator geo IDs: {learned}")
                     
-                    page.screenshot(path=os.path.join(screenshots_dir, "sales_nav_found.png"))
+                    artifacts.screenshot(page, "sales_nav_found")
                     sales_nav_successful = True
                 except Exception as e:
                     print(f"Sales Navigator search or filter failed: {e}")
-                    page.screenshot(path=os.path.join(screenshots_dir, "sales_nav_error.png"))
+                    artifacts.error(page, "sales_nav_error", e)
             
             # Process multiple pages of Sales Navigator results
             if sales_nav_successful:
                 max_pages = 5  # Try up to 5 pages
                 
-                for page_num in range(1, max_pages + 1):
-                    print(f"Processing Sales Navigator page {page_num}")
-                    page.screenshot(path=os.path.join(screenshots_dir, f"sales_nav_page_{page_num}.png"))
-                    
-                    # Extract profiles from current page
-                    profiles_from_page = extract_sales_nav_profiles(page, max_results=max_results)
-                    
-                    # If we found profiles, add them to our list
-                    if profiles_from_page:
-                        print(f"Found {len(profiles_from_page)} profiles on page {page_num}")
-                        all_profiles.extend(profiles_from_page)
+                # Hand each captured page to a parser thread while the browser
+                # moves on to the next one. With the 'html' engine the thread
+                # parses the page; the in-page and handle engines need the
+                # browser, so they extract here and the thread only handles
+                # artifacts and the profiles callback. The first page is
+                # parsed here to check lxml recognises the cards; if it
+                # doesn't, the search falls back to 'in_page'
+                engine = current_app.config.get('PIPELINE_EXTRACTION_ENGINE', 'html')
+                pipeline = None
+                if current_app.config.get('SEARCH_PIPELINE', True):
+                    save_snapshots = current_app.config.get('SAVE_PAGE_SNAPSHOTS', False)
+                    pipeline = PageParsePipeline(
+                        max_results=max_results,
+                        on_profiles=profiles_callback,
+                        artifacts=artifacts,
+                        snapshot_dir=os.path.join(data_dir, 'snapshots') if save_snapshots else None
+                    )
+                
+                try:
+                    for page_num in range(1, max_pages + 1):
+                        print(f"Processing Sales Navigator page {page_num}")
+                        report_progress(progress_callback, stage='extracting', page=page_num, max_pages=max_pages,
+                                        profiles=pipeline.profile_count if pipeline else len(all_profiles))
+                        policy.stage = 'extract'
+                        artifacts.screenshot(page, f"sales_nav_page_{page_num}")
                         
-                        # Check if we have enough profiles
-                        if len(all_profiles) >= max_results:
-                            print(f"Found {len(all_profiles)} profiles, which is enough (target: {max_results})")
-                            break
-                    
-                    # Try to navigate to the next page
-                    if page_num < max_pages:
-                        success = navigate_to_next_page(page)
-                        if not success:
-                            print(f"Could not navigate to page {page_num + 1}, stopping pagination")
-                            break
-                        time.sleep(3)  # Wait for the next page to load
+                        snapshot_name = f"{search_stamp}_page_{page_num}"
+                        if pipeline:
+                            with timings.stage('extract', page=page_num):
+                                page_text, html_content = capture_result_page(
+                                    page, waiter=waiter, with_text=page_text_wanted(artifacts, har))
+                                page_profiles = None
+                                if engine == 'html' and page_num == 1:
+                                    page_profiles, _, card_count = parse_results_html(html_content,
+                                                                                      max_results=max_results)
+                                    if not card_count:
+                                        print("No result cards found in the page HTML, extracting in the page")
+                                        engine = 'in_page'
+                                if engine != 'html':
+                                    page_profiles = extract_page_profiles(page, html_content, max_results=max_results,
+                                                                          engine=engine)
+                            if har:
+                                har.save_page(page_num, html_content, page_text)
+                            pipeline.submit(page_num, html_content, page_text=page_text, snapshot_name=snapshot_name,
+                                            profiles=page_profiles)
+                            
+                            # The pipeline holds at most one page besides the one
+                            # being parsed (submit blocks otherwise), so the count
+                            # lags the browser by at most two pages
+                            if pipeline.profile_count >= max_results:
+                                print(f"Found {pipeline.profile_count} profiles, which is enough (target: {max_results})")
+                                break
+                        else:
+                            # Extract profiles from current page
+                            with timings.stage('extract', page=page_num):
+                                profiles_from_page = extract_sales_nav_profiles(page, max_results=max_results,
+                                                                                waiter=waiter, snapshot_name=snapshot_name,
+                                                                                har=har, page_num=page_num,
+                                                                                artifacts=artifacts)
+                            if profiles_callback:
+                                profiles_callback(page_num, profiles_from_page)
+                            
+                            # If we found profiles, add them to our list
+                            if profiles_from_page:
+                                print(f"Found {len(profiles_from_page)} profiles on page {page_num}")
+                                all_profiles.extend(profiles_from_page)
+                                
+                                # Check if we have enough profiles
+                                if len(all_profiles) >= max_results:
+                                    print(f"Found {len(all_profiles)} profiles, which is enough (target: {max_results})")
+                                    break
+                        
+                        # Try to navigate to the next page
+                        if page_num < max_pages:
+                            policy.stage = 'paginate'
+                            with timings.stage('paginate', page=page_num + 1):
+                                success = navigate_to_next_page(page, waiter=waiter)
+                                if success:
+                                    waiter.for_dom_settled(budget=3)  # Let the next page finish rendering
+                            if not success:
+                                print(f"Could not navigate to page {page_num + 1}, stopping pagination")
+                                break
+                finally:
+                    if pipeline:
+                        with timings.stage('parse_drain'):
+                            all_profiles.extend(pipeline.finish())
+                        # Overlaps the browser stages; parse_drain is the part the search waited for
+                        timings.record('parse', pipeline.parse_seconds, background=True)
+                        print(f"Parser thread: {pipeline.pages_parsed} pages in {pipeline.parse_seconds:.3f}s")
             
             # APPROACH 2: If Sales Navigator fails or returns no results, try regular LinkedIn
             if not all_profiles:
@@ -967,19 +1165,22 @@ def linkedin_search(search_query, max_results=20, selected_state=None, company_s
                 
                 # Try multiple pages of regular LinkedIn results
                 max_pages = 5
+                policy.stage = 'fallback'
+                fallback_start = time.perf_counter()
                 
                 for page_num in range(1, max_pages + 1):
-                    regular_url = f"https://www.linkedin.com/search/results/people/?keywords={encoded}&page={page_num}"
+                    regular_url = linkedin_url(f"/search/results/people/?keywords={encoded}&page={page_num}")
+                    report_progress(progress_callback, stage='fallback_search', page=page_num,
+                                    max_pages=max_pages, profiles=len(all_profiles))
                     
                     try:
                         page.goto(regular_url, timeout=30000)
-                        time.sleep(5)  # Wait for page to load
+                        waiter.for_selector('li.reusable-search__result-container, div.entity-result__item', budget=5)
                         
-                        # Take a screenshot
-                        page.screenshot(path=os.path.join(screenshots_dir, f"regular_linkedin_page_{page_num}.png"))
+                        artifacts.screenshot(page, f"regular_linkedin_page_{page_num}")
                         
                         # Try to scroll and load more
-                        scroll_and_load_more(page, max_scrolls=3, wait_sec=2)
+                        scroll_and_load_more(page, max_scrolls=3, wait_sec=2, waiter=waiter)
                         
                         # Extract profiles
                         print(f"Extracting profiles from regular LinkedIn page {page_num}...")
@@ -1084,24 +1285,45 @@ def linkedin_search(search_query, max_results=20, selected_state=None, company_s
                     
                     except Exception as e:
                         print(f"Error processing regular LinkedIn page {page_num}: {e}")
+                        artifacts.error(page, f"regular_linkedin_page_{page_num}_error", e)
+                
+                timings.record('fallback', time.perf_counter() - fallback_start)
                 
         except Exception as e:
             print(f"Comprehensive search error: {e}")
+            artifacts.error(page, "search_error", e)
         finally:
-            browser.close()
+            # A search that found nothing counts as failed too
+            artifacts.finish(failed=not all_profiles)
+        
+        wait_summary = waiter.metrics.summary()
+        print(f"Wait metrics: {wait_summary['waits']} waits, {wait_summary['actual_s']}s spent "
+              f"vs {wait_summary['budget_s']}s of fixed sleeps ({wait_summary['saved_s']}s saved, "
+              f"{wait_summary['timeouts']} timed out)")
+        report_progress(progress_callback, wait_saved_s=wait_summary['saved_s'])
+        print(f"Stage timings: {timings.describe()}")
+        report_progress(progress_callback, stage_timings=timings.summary())
+        if policy.installed:
+            print(f"Requests: {policy.describe()}")
+            report_progress(progress_callback, request_stats=policy.stats)
     
     # Merge duplicates by best connection
     final_profiles = merge_profiles_by_best_connection(all_profiles)
+    report_progress(progress_callback, stage='saving', profiles=len(final_profiles))
+    
+    if har:
+        har.finish(query=search_query, selected_state=selected_state, company_size=company_size,
+                   search_path=search_path, max_results=max_results, profiles=len(final_profiles),
+                   profile_names=[p['name'] for p in final_profiles], stage_timings=timings.summary())
     
     # If no results, use sample data
-    if not final_profiles:
+    if not final_profiles and allow_sample:
         print("No profiles found, returning sample data")
         final_profiles = create_sample_profiles(search_query)
     
     # Save to profiles.json
-    outpath = os.path.join(data_dir, "profiles.json")
-    with open(outpath, "w") as f:
-        json.dump(final_profiles, f)
+    if save_results:
+        save_profile_data(final_profiles)
     
     print(f"Final result: {len(final_profiles)} unique profiles")
     return final_profiles
\ No newline at end of file
@@ -0,0 +1,125 @@
+# llm_cache.py
+import os
+import threading
+from flask import current_app
+
+from disk_cache import DiskCache, make_cache_key
+
+# Completions are cached on disk under a hash of (model, temperature,
+# max_tokens, prompt), so regenerating the ICP for an unchanged product
+# description, or a message for the same profile, product and path, costs
+# no tokens. `regenerate=True` skips the lookup and replaces the entry.
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class LLMCache(DiskCache):
+    """DiskCache that also counts the tokens its hits saved."""
+
+    def __init__(self, directory, **options):
+        super().__init__(directory, **options)
+        self.stats['tokens_saved'] = 0
+        self.stats['bypassed'] = 0
+
+    def get_completion(self, key):
+        entry = self.get(key)
+        if entry is not None:
+            with self._lock:
+                self.stats['tokens_saved'] += entry.get('tokens') or 0
+        return entry
+
+    def bypass(self):
+        with self._lock:
+            self.stats['bypassed'] += 1
+
+
+def get_llm_cache():
+    """The LLM response cache for the current app, or None if disabled."""
+    config = current_app.config
+    if not config.get('LLM_CACHE_ENABLED', True):
+        return None
+    directory = os.path.join(config['DATA_DIR'], 'cache', 'llm')
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = LLMCache(directory,
+                                          ttl=config.get('LLM_CACHE_TTL', 30 * 24 * 3600),
+                                          max_entries=config.get('LLM_CACHE_MAX_ENTRIES', 5000),
+                                          max_bytes=config.get('LLM_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+        return _caches[directory]
+
+
+def llm_cache_key(model, temperature, prompt, max_tokens=None):
+    return make_cache_key('llm', model, temperature, max_tokens, prompt)
+
+
+def completion_entry(response, model):
+    usage = getattr(response, 'usage', None)
+    return {
+        'content': response.choices[0].message.content,
+        'model': model,
+        'tokens': usage.total_tokens if usage else 0
+    }
+
+
+def cached_chat_completion(client, model, prompt, temperature, max_tokens=None, regenerate=False, cache=None):
+    """
+    Text of a single-prompt chat completion, from the cache when possible.
+    Returns (content, cached). API errors propagate and nothing is stored.
+    """
+    cache = cache if cache is not None else get_llm_cache()
+    key = llm_cache_key(model, temperature, prompt, max_tokens)
+    if cache is not None:
+        if regenerate:
+            cache.bypass()
+        else:
+            entry = cache.get_completion(key)
+            if entry is not None:
+                return entry['content'], True
+
+    options = {'max_tokens': max_tokens} if max_tokens else {}
+    response = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        **options
+    )
+    if cache is not None:
+        cache.set(key, completion_entry(response, model))
+    return response.choices[0].message.content, False
+
+
+def stream_chat_completion(client, model, prompt, temperature, max_tokens=None, regenerate=False, cache=None):
+    """
+    Like cached_chat_completion, but yields the text as it arrives. A cache
+    hit yields the whole text at once; a streamed response is cached once
+    it has finished.
+    """
+    cache = cache if cache is not None else get_llm_cache()
+    key = llm_cache_key(model, temperature, prompt, max_tokens)
+    if cache is not None:
+        if regenerate:
+            cache.bypass()
+        else:
+            entry = cache.get_completion(key)
+            if entry is not None:
+                yield entry['content']
+                return
+
+    options = {'max_tokens': max_tokens} if max_tokens else {}
+    stream = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        stream=True,
+        **options
+    )
+    parts = []
+    for chunk in stream:
+        text = chunk.choices[0].delta.content if chunk.choices else None
+        if text:
+            parts.append(text)
+            yield text
+    # Streamed responses carry no usage, so the entry saves no counted tokens
+    if cache is not None:
+        cache.set(key, {'content': ''.join(parts), 'model': model, 'tokens': 0})
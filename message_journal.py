@@ -0,0 +1,114 @@
+# message_journal.py
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from flask import current_app
+
+import storage
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+class MessageJournal:
+    """
+    Append-only JSON Lines journal of saved messages.
+
+    Saving a message appends one line under an exclusive file lock, so
+    concurrent requests (and gunicorn workers) never overwrite each other and
+    a save costs the same however long the history is. Compaction folds the
+    journal into the indexed messages table via `apply(records)` and then
+    truncates it; it runs once the journal passes `compact_bytes` and before
+    every read, so readers only ever query the index.
+    """
+
+    def __init__(self, path, apply, compact_bytes=256 * 1024):
+        self.path = path
+        self.apply = apply
+        self.compact_bytes = compact_bytes
+        self.lock_path = f"{path}.lock"
+        self._thread_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            with open(self.lock_path, 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, kind, entry):
+        """Append one entry; gives it an `id` if it has none. Returns the entry."""
+        entry.setdefault('id', uuid.uuid4().hex)
+        line = json.dumps({'kind': kind, 'entry': entry}) + '\n'
+        with self._locked():
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            if size >= self.compact_bytes:
+                self._compact_locked()
+        return entry
+
+    def _read_locked(self):
+        records = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # A torn final line from a crash mid-write
+                        print(f"Skipping unreadable journal line in {self.path}")
+        except FileNotFoundError:
+            pass
+        return records
+
+    def pending(self):
+        """Records appended since the last compaction."""
+        with self._locked():
+            return self._read_locked()
+
+    def _compact_locked(self):
+        records = self._read_locked()
+        if records:
+            # apply() must be idempotent per entry id: if we crash before the
+            # truncate, the same records are applied again on the next run
+            self.apply(records)
+        with open(self.path, 'w', encoding='utf-8'):
+            pass
+        return len(records)
+
+    def compact(self):
+        """Fold the journal into the index. Returns the number of records moved."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return 0
+        with self._locked():
+            return self._compact_locked()
+
+
+def get_message_journal():
+    """The app's message journal (DATA_DIR/messages.jsonl), compacting into SQLite."""
+    config = current_app.config
+    path = config.get('MESSAGE_JOURNAL_PATH') or os.path.join(config['DATA_DIR'], 'messages.jsonl')
+    with _journals_lock:
+        if path not in _journals:
+            _journals[path] = MessageJournal(path, storage.add_message_records,
+                                             compact_bytes=config.get('MESSAGE_JOURNAL_COMPACT_BYTES', 256 * 1024))
+        return _journals[path]
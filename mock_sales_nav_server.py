@@ -0,0 +1,470 @@
+# mock_sales_nav_server.py
+import glob
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sales_nav_fixtures import render_lead_card, sample_lead
+from sales_nav_urls import HEADCOUNT_BUCKETS
+from us_states import US_STATES
+
+# A local stand-in for the Sales Navigator pages linkedin_search drives, for
+# measuring the scraper offline (set LINKEDIN_BASE_URL to the URL returned
+# by start_mock_server). It serves:
+#   /sales/login            login page with the authentication iframe
+#   /sales/home             requires the li_at cookie set by logging in
+#   /sales/search/people    search app: keyword box, Geography and Company
+#                           headcount filter pills, results and a Next button.
+#                           The search is kept in a Sales Navigator style
+#                           ?query=(filters:List(...),keywords:...) URL (with
+#                           MOCK_GEO_IDS), and such a URL runs its search on load
+#   /sales-api/salesApiLeadSearch
+#                           JSON batches of lead cards; the page renders
+#                           `batch_size` cards and loads the rest of each
+#                           page as it is scrolled (infinite scroll)
+#   /media/...              profile photos (`image_bytes` of filler) and
+#                           the search page's web font (`font_bytes`)
+#   /static/app.js, .css    a cacheable script and stylesheet (`static_bytes`
+#                           of filler each) that every app page loads
+#   /li/track               tracking beacon the search page posts to
+# Cards are the synthetic ones from sales_nav_fixtures, or with
+# `snapshot_dir` the result pages archived by SAVE_PAGE_SNAPSHOTS.
+
+HEADCOUNT_OPTIONS = [label for _, label in HEADCOUNT_BUCKETS.values()]
+HEADCOUNT_IDS = {label: bucket_id for bucket_id, label in HEADCOUNT_BUCKETS.values()}
+
+# Made-up geography IDs; the scraper learns real ones from LinkedIn's URLs
+MOCK_GEO_IDS = {state: str(90000001 + i) for i, state in enumerate(US_STATES)}
+
+
+class MockSalesNavState:
+    def __init__(self, total_pages=5, per_page=25, batch_size=10, api_latency=0.1, page_latency=0.0,
+                 image_bytes=20000, font_bytes=60000, static_bytes=150000, snapshot_dir=None, require_login=True):
+        self.total_pages = total_pages
+        self.per_page = per_page
+        self.batch_size = batch_size
+        self.api_latency = api_latency
+        self.page_latency = page_latency
+        self.image_bytes = image_bytes
+        self.font_bytes = font_bytes
+        self.static_bytes = static_bytes
+        self.require_login = require_login
+        self.snapshots = _load_snapshots(snapshot_dir) if snapshot_dir else []
+        if self.snapshots:
+            self.total_pages = len(self.snapshots)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'logins': 0, 'api_calls': 0, 'images': 0, 'fonts': 0, 'static': 0,
+                      'tracking': 0, 'bytes_sent': 0}
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+
+def _load_snapshots(snapshot_dir):
+    """Bodies of archived result pages (<stamp>_page_<n>.html) of the newest search, scripts removed."""
+    paths = sorted(glob.glob(os.path.join(snapshot_dir, '*_page_*.html')))
+    if not paths:
+        return []
+    newest = os.path.basename(paths[-1]).rsplit('_page_', 1)[0]
+    paths = sorted((p for p in paths if os.path.basename(p).startswith(newest + '_page_')),
+                   key=lambda p: int(re.search(r'_page_(\d+)\.html$', p).group(1)))
+    bodies = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        match = re.search(r'<body[^>]*>(.*)</body>', content, re.S | re.I)
+        body = match.group(1) if match else content
+        # Recorded pages reference LinkedIn's scripts; offline they only fail
+        bodies.append(re.sub(r'<script\b.*?</script>', '', body, flags=re.S | re.I))
+    return bodies
+
+
+def _lead_for(index, geo):
+    lead = sample_lead(index)
+    if geo:
+        lead['location'] = geo
+    lead['image'] = f"/media/photo/{index}.jpg"
+    return lead
+
+
+def lead_batch(state, page_num, start, count, geo='', headcount=''):
+    """Rendered cards start..start+count of a result page, plus whether the page has more."""
+    if state.snapshots:
+        body = state.snapshots[min(max(page_num, 1), len(state.snapshots)) - 1]
+        return body, False
+    # Filters pick a different (but stable) slice of the synthetic leads
+    offset = (sum(map(ord, geo + headcount)) * 37) % 1000 if geo or headcount else 0
+    first = offset + (page_num - 1) * state.per_page + start
+    end = min(start + count, state.per_page)
+    cards = ''.join(render_lead_card(_lead_for(i, geo)) for i in range(first, first + end - start))
+    return cards, end < state.per_page
+
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Sales Navigator Login</title></head>
+<body>
+  <h1>Sign in to Sales Navigator</h1>
+  <iframe class="authentication-iframe vertical-align-middle" src="/sales/login/frame" width="400" height="400"></iframe>
+</body></html>"""
+
+LOGIN_FRAME = """<!DOCTYPE html>
+<html><body>
+  <form method="post" action="/sales/login/submit" target="_top">
+    __ERROR__
+    <input id="username" name="session_key" type="text">
+    <input id="password" name="session_password" type="password">
+    <button type="submit">Sign in</button>
+  </form>
+</body></html>"""
+
+# Scripts and stylesheets are the bulk of a real page load and are served cacheable
+STATIC_ASSETS = """<link rel="stylesheet" href="/static/app.css"><script src="/static/app.js" defer></script>"""
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><head><title>Sales Navigator</title>""" + STATIC_ASSETS + """</head>
+<body><h1>Sales Navigator</h1><a href="/sales/search/people">Lead search</a></body></html>"""
+
+SEARCH_PAGE = """<!DOCTYPE html>
+<html><head><title>Sales Navigator - Lead search</title>""" + STATIC_ASSETS + """
+<style>
+  @font-face { font-family: 'Mock Sans'; src: url('/media/fonts/mock-sans.woff2') format('woff2'); }
+  body { font-family: 'Mock Sans', sans-serif; }
+  .filter-panel { display: none; border: 1px solid #ccc; padding: 8px; }
+  .filter-panel.open { display: block; }
+  .artdeco-list__item { min-height: 120px; }
+</style></head>
+<body>
+  <input aria-label="Search by keywords" placeholder="Search keywords">
+  <div class="search-filters">
+    <button class="artdeco-pill artdeco-pill--slate artdeco-pill--choice artdeco-pill--2 search-filter-trigger"
+            data-control-name="geographic_facet_toggle" data-panel="geo-panel">Geography</button>
+    <div class="filter-panel" id="geo-panel">
+      <div class="search-filter-typeahead artdeco-typeahead">
+        <input role="combobox" placeholder="Add locations" class="search-filter-typeahead__input">
+        <ul role="listbox" class="search-filter-typeahead__suggestion-list"></ul>
+      </div>
+      <button class="include-button" style="display:none">Include</button>
+    </div>
+    <button class="artdeco-pill search-filter-trigger" data-control-name="company_size_facet_toggle"
+            data-panel="size-panel">Company headcount</button>
+    <div class="filter-panel" id="size-panel">
+      <ul class="size-options">__SIZE_OPTIONS__</ul>
+      <button class="apply-button">Apply</button>
+    </div>
+  </div>
+  <div id="search-results-container"></div>
+<script>
+const STATES = __STATES__;
+const GEO_IDS = __GEO_IDS__;
+const HEADCOUNT_IDS = __HEADCOUNT_IDS__;
+const BATCH = __BATCH__;
+const params = new URLSearchParams(location.search);
+const state = Object.assign({page: +(params.get('page') || 1), loaded: 0, more: false, loading: false,
+                             pendingGeo: '', pendingSize: ''}, parseQuery(params.get('query') || ''));
+const container = document.getElementById('search-results-container');
+
+function findKey(map, id) {
+  return Object.keys(map).find(key => map[key] === id) || '';
+}
+
+// (filters:List((type:REGION,values:List((id:..,text:..,selectionType:INCLUDED))),...),keywords:..)
+function parseQuery(query) {
+  const value = re => (query.match(re) || [])[1];
+  const geoId = value(/type:REGION,values:List\(\(id:([^,)]+)/);
+  const sizeId = value(/type:COMPANY_HEADCOUNT,values:List\(\(id:([^,)]+)/);
+  return {query: decodeURIComponent(value(/keywords:([^,()]*)/) || ''),
+          geo: geoId ? findKey(GEO_IDS, geoId) : '', headcount: sizeId ? findKey(HEADCOUNT_IDS, sizeId) : ''};
+}
+
+function syncUrl() {
+  const enc = encodeURIComponent;
+  const filter = (type, id, text) =>
+    '(type:' + type + ',values:List((id:' + id + ',text:' + enc(text) + ',selectionType:INCLUDED)))';
+  const filters = [];
+  if (state.geo) filters.push(filter('REGION', GEO_IDS[state.geo], state.geo));
+  if (state.headcount) filters.push(filter('COMPANY_HEADCOUNT', HEADCOUNT_IDS[state.headcount], state.headcount));
+  const query = '(' + (filters.length ? 'filters:List(' + filters.join(',') + '),' : '') +
+                'keywords:' + enc(state.query) + ')';
+  history.pushState(null, '', '?query=' + enc(query) + (state.page > 1 ? '&page=' + state.page : ''));
+}
+
+async function fetchBatch(start) {
+  state.loading = true;
+  const p = new URLSearchParams({keywords: state.query, page: state.page, start: start, count: BATCH,
+                                 geo: state.geo, headcount: state.headcount});
+  const response = await fetch('/sales-api/salesApiLeadSearch?' + p.toString());
+  const data = await response.json();
+  state.loading = false;
+  fetch('/li/track', {method: 'POST', body: JSON.stringify({event: 'search_batch', start: start})}).catch(() => {});
+  return data;
+}
+
+function renderPagination(total) {
+  let nav = document.querySelector('.artdeco-pagination');
+  if (!nav) {
+    nav = document.createElement('div');
+    nav.className = 'artdeco-pagination';
+    container.after(nav);
+  }
+  const disabled = state.page >= total ? ' disabled' : '';
+  nav.innerHTML = '<button class="artdeco-pagination__button--next" aria-label="Next"' + disabled + '>Next</button>';
+}
+
+async function loadPage() {
+  const data = await fetchBatch(0);
+  if (data.snapshot) {
+    // Archived page: its body replaces the whole page
+    document.body.innerHTML = data.html;
+    renderPaginationFor(document.body, data.total_pages);
+    return;
+  }
+  container.innerHTML = '<ol class="search-results__result-list">' + data.html + '</ol>';
+  state.loaded = data.count;
+  state.more = data.more;
+  renderPagination(data.total_pages);
+}
+
+function renderPaginationFor(root, total) {
+  let next = root.querySelector('.artdeco-pagination__button--next, button[aria-label="Next"]');
+  if (!next) {
+    next = document.createElement('button');
+    next.className = 'artdeco-pagination__button--next';
+    next.textContent = 'Next';
+    root.appendChild(next);
+  }
+  next.removeAttribute('disabled');
+  if (state.page >= total) next.setAttribute('disabled', '');
+}
+
+async function loadMore() {
+  if (state.loading || !state.more) return;
+  const data = await fetchBatch(state.loaded);
+  container.querySelector('ol').insertAdjacentHTML('beforeend', data.html);
+  state.loaded += data.count;
+  state.more = data.more;
+}
+
+function search() {
+  state.page = 1;
+  syncUrl();
+  loadPage();
+}
+
+document.addEventListener('keydown', e => {
+  if (e.key === 'Enter' && e.target.matches('input[aria-label="Search by keywords"]')) {
+    state.query = e.target.value;
+    search();
+  }
+});
+
+document.addEventListener('click', e => {
+  const next = e.target.closest('.artdeco-pagination__button--next, button[aria-label="Next"]');
+  if (next) {
+    if (next.hasAttribute('disabled')) return;
+    state.page += 1;
+    syncUrl();
+    loadPage();
+    return;
+  }
+  const pill = e.target.closest('.search-filter-trigger');
+  if (pill) {
+    document.getElementById(pill.dataset.panel).classList.toggle('open');
+    return;
+  }
+  const option = e.target.closest('li[role="option"]');
+  if (option) {
+    state.pendingGeo = option.textContent.trim();
+    option.classList.add('selected');
+    document.querySelector('.include-button').style.display = '';
+    return;
+  }
+  if (e.target.closest('.include-button') && state.pendingGeo) {
+    state.geo = state.pendingGeo;
+    document.getElementById('geo-panel').classList.remove('open');
+    search();
+    return;
+  }
+  const size = e.target.closest('.size-options li');
+  if (size) {
+    state.pendingSize = size.textContent.trim();
+    size.classList.add('selected');
+    return;
+  }
+  if (e.target.closest('.apply-button') && state.pendingSize) {
+    state.headcount = state.pendingSize;
+    document.getElementById('size-panel').classList.remove('open');
+    search();
+  }
+});
+
+let typeaheadTimer = null;
+document.querySelector('input[placeholder="Add locations"]').addEventListener('input', e => {
+  clearTimeout(typeaheadTimer);
+  typeaheadTimer = setTimeout(() => {
+    const text = e.target.value.trim().toLowerCase();
+    const matches = text ? STATES.filter(s => s.toLowerCase().includes(text)).slice(0, 8) : [];
+    document.querySelector('ul[role="listbox"]').innerHTML =
+      matches.map(s => '<li role="option">' + s + '</li>').join('');
+  }, 150);
+});
+
+window.addEventListener('scroll', () => {
+  if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 200) loadMore();
+});
+
+if (state.query) loadPage();
+</script>
+</body></html>"""
+
+EMPTY_RESULTS_PAGE = """<!DOCTYPE html>
+<html><head><title>Search | LinkedIn</title></head>
+<body><div class="search-results-container"><h2>No results found</h2></div></body></html>"""
+
+
+def render_search_page(state):
+    options = ''.join(f'<li>{option}</li>' for option in HEADCOUNT_OPTIONS)
+    return (SEARCH_PAGE.replace('__SIZE_OPTIONS__', options)
+            .replace('__STATES__', json.dumps(US_STATES))
+            .replace('__GEO_IDS__', json.dumps(MOCK_GEO_IDS))
+            .replace('__HEADCOUNT_IDS__', json.dumps(HEADCOUNT_IDS))
+            .replace('__BATCH__', str(state.batch_size if not state.snapshots else 0)))
+
+
+class MockSalesNavHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # See fake_openai_server: headers and body are separate writes
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.state.count('bytes_sent', len(data))
+
+    def _redirect(self, location, headers=None):
+        self._send(303, '', headers=dict(headers or {}, Location=location))
+
+    def _logged_in(self):
+        return not self.server.state.require_login or 'li_at=' in (self.headers.get('Cookie') or '')
+
+    def do_GET(self):
+        state = self.server.state
+        state.count('requests')
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        path = url.path.rstrip('/') or '/'
+
+        if path.startswith('/media/fonts/'):
+            state.count('fonts')
+            self._send(200, b'wOF2' + b'\0' * max(state.font_bytes - 4, 0), 'font/woff2',
+                       {'Cache-Control': 'max-age=3600'})
+            return
+        if path.startswith('/media/'):
+            state.count('images')
+            self._send(200, b'\xff\xd8\xff' + b'\0' * max(state.image_bytes - 3, 0), 'image/jpeg',
+                       {'Cache-Control': 'max-age=3600'})
+            return
+        if path in ('/static/app.js', '/static/app.css'):
+            state.count('static')
+            content_type = 'text/javascript' if path.endswith('.js') else 'text/css'
+            self._send(200, '/*' + ' ' * max(state.static_bytes - 4, 0) + '*/', content_type,
+                       {'Cache-Control': 'max-age=3600'})
+            return
+        if path == '/sales/login':
+            self._send(200, LOGIN_PAGE)
+            return
+        if path == '/sales/login/frame':
+            error = '<div class="error-message">Wrong email or password.</div>' if 'error' in query else ''
+            self._send(200, LOGIN_FRAME.replace('__ERROR__', error))
+            return
+        if path == '/favicon.ico':
+            self._send(404, '')
+            return
+        if not self._logged_in():
+            self._redirect('/sales/login')
+            return
+
+        if state.page_latency:
+            time.sleep(state.page_latency)
+        if path == '/sales/home':
+            self._send(200, HOME_PAGE)
+        elif path == '/sales/search/people':
+            self._send(200, render_search_page(state))
+        elif path == '/sales-api/salesApiLeadSearch':
+            self._api(query)
+        elif path == '/search/results/people':
+            self._send(200, EMPTY_RESULTS_PAGE)
+        else:
+            self._send(404, '<h1>Not found</h1>')
+
+    def _api(self, query):
+        state = self.server.state
+        state.count('api_calls')
+        if state.api_latency:
+            time.sleep(state.api_latency)
+        arg = lambda name, default='': (query.get(name) or [default])[0]
+        page_num = max(int(arg('page', '1') or 1), 1)
+        start = int(arg('start', '0') or 0)
+        count = int(arg('count', '0') or 0) or state.per_page
+        html, more = lead_batch(state, page_num, start, count, arg('geo'), arg('headcount'))
+        body = {'html': html, 'count': min(count, state.per_page - start), 'more': more,
+                'page': page_num, 'total_pages': state.total_pages, 'snapshot': bool(state.snapshots)}
+        self._send(200, json.dumps(body), 'application/json')
+
+    def do_POST(self):
+        state = self.server.state
+        state.count('requests')
+        length = int(self.headers.get('Content-Length') or 0)
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode('utf-8'))
+        if urllib.parse.urlsplit(self.path).path == '/li/track':
+            state.count('tracking')
+            self._send(204, '')
+            return
+        if urllib.parse.urlsplit(self.path).path != '/sales/login/submit':
+            self._send(404, '<h1>Not found</h1>')
+            return
+        if (form.get('session_key') or [''])[0] and (form.get('session_password') or [''])[0]:
+            state.count('logins')
+            self._redirect('/sales/home', {'Set-Cookie': 'li_at=mock-session; Path=/; HttpOnly'})
+        else:
+            self._redirect('/sales/login?error=1')
+
+
+def start_mock_server(host='127.0.0.1', port=0, **options):
+    """Serve the mock on a background thread. Returns (server, base_url); stop with server.shutdown()."""
+    server = ThreadingHTTPServer((host, port), MockSalesNavHandler)
+    server.daemon_threads = True
+    server.state = MockSalesNavState(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    #   python mock_sales_nav_server.py [port] [api_latency] [snapshot_dir]
+    #   LINKEDIN_BASE_URL=http://127.0.0.1:<port> python app.py
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8090
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    snapshot_dir = sys.argv[3] if len(sys.argv) > 3 else None
+    server, base_url = start_mock_server(port=port, api_latency=latency, snapshot_dir=snapshot_dir)
+    source = f"{server.state.total_pages} archived pages" if server.state.snapshots else 'synthetic leads'
+    print(f"Mock Sales Navigator at {base_url} ({source}, API latency {latency}s)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,224 @@
+# openai_client.py
+import atexit
+import threading
+import time
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+# One OpenAI client per process instead of one per call: the underlying
+# httpx pool keeps connections alive between requests, so only the first
+# request to the API pays for TCP and TLS setup. Every request is traced to
+# count how many opened a new connection and how many reused one.
+
+
+class ConnectionMetrics:
+    """Request and connection counters, fed by httpx trace events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+        self.connect_s = 0.0
+        self.errors = 0
+
+    def _event(self, name, started):
+        with self._lock:
+            if name == 'connection.connect_tcp.started':
+                self.new_connections += 1
+            elif name == 'connection.start_tls.started':
+                self.tls_handshakes += 1
+            elif name in ('connection.connect_tcp.complete', 'connection.start_tls.complete'):
+                self.connect_s += time.perf_counter() - started.pop(name[:-len('.complete')], time.perf_counter())
+
+    def tracer(self):
+        """A per-request trace callback (sync)."""
+        with self._lock:
+            self.requests += 1
+        started = {}
+
+        def trace(name, info):
+            if name.endswith('.started'):
+                started[name[:-len('.started')]] = time.perf_counter()
+            self._event(name, started)
+        return trace
+
+    def async_tracer(self):
+        trace = self.tracer()
+
+        async def async_trace(name, info):
+            trace(name, info)
+        return async_trace
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def summary(self):
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused_connections': reused,
+                'reuse_rate': round(reused / self.requests, 3) if self.requests else 0.0,
+                'tls_handshakes': self.tls_handshakes,
+                'connect_s': round(self.connect_s, 3),
+                'errors': self.errors
+            }
+
+
+class OpenAIClientManager:
+    """
+    Lazily built, shared OpenAI clients over a keep-alive connection pool.
+
+    The sync client is created on first use and rebuilt only if the API key
+    or base URL changes. Async clients are bound to an event loop, so
+    `async_http_client()` hands out a fresh pool with the same limits,
+    timeouts and metrics for each run; the caller closes it.
+    """
+
+    def __init__(self, max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0, timeout=60.0,
+                 connect_timeout=10.0, max_retries=2):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.metrics = ConnectionMetrics()
+        self._lock = threading.Lock()
+        self._client = None
+        self._http_client = None
+        self._client_key = None
+        self.clients_created = 0
+
+    def _on_request(self, request):
+        request.extensions['trace'] = self.metrics.tracer()
+
+    async def _on_async_request(self, request):
+        request.extensions['trace'] = self.metrics.async_tracer()
+
+    def _on_response(self, response):
+        if response.status_code >= 400:
+            self.metrics.record_error()
+
+    async def _on_async_response(self, response):
+        self._on_response(response)
+
+    def get_client(self, api_key, base_url=None):
+        """The shared sync client for this key and base URL."""
+        key = (api_key, base_url)
+        with self._lock:
+            if self._client is None or self._client_key != key:
+                if self._http_client is not None:
+                    self._http_client.close()
+                self._http_client = httpx.Client(limits=self.limits, timeout=self.timeout,
+                                                 event_hooks={'request': [self._on_request],
+                                                              'response': [self._on_response]})
+                self._client = OpenAI(api_key=api_key, base_url=base_url, http_client=self._http_client,
+                                      max_retries=self.max_retries, timeout=self.timeout)
+                self._client_key = key
+                self.clients_created += 1
+            return self._client
+
+    def async_http_client(self, max_connections=None):
+        """A new async pool (for one event loop) with the shared limits, timeouts and metrics."""
+        limits = self.limits
+        if max_connections:
+            limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                                  keepalive_expiry=self.limits.keepalive_expiry)
+        return httpx.AsyncClient(limits=limits, timeout=self.timeout,
+                                 event_hooks={'request': [self._on_async_request],
+                                              'response': [self._on_async_response]})
+
+    def get_async_client(self, api_key, base_url=None, http_client=None, max_retries=None):
+        return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client or self.async_http_client(),
+                           max_retries=self.max_retries if max_retries is None else max_retries,
+                           timeout=self.timeout)
+
+    def summary(self):
+        stats = self.metrics.summary()
+        stats['clients_created'] = self.clients_created
+        stats['max_connections'] = self.limits.max_connections
+        stats['max_keepalive_connections'] = self.limits.max_keepalive_connections
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._client = None
+            self._http_client = None
+            self._client_key = None
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_client_manager(config=None):
+    """The process-wide client manager, built from the app config on first use."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                config = config or {}
+                _manager = OpenAIClientManager(
+                    max_connections=config.get('OPENAI_MAX_CONNECTIONS', 20),
+                    max_keepalive_connections=config.get('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 10),
+                    keepalive_expiry=config.get('OPENAI_KEEPALIVE_EXPIRY', 30.0),
+                    timeout=config.get('OPENAI_TIMEOUT', 60.0),
+                    connect_timeout=config.get('OPENAI_CONNECT_TIMEOUT', 10.0),
+                    max_retries=config.get('OPENAI_MAX_RETRIES', 2))
+    return _manager
+
+
+def shutdown_client_manager():
+    """Close pooled connections (registered with atexit)."""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close()
+            _manager = None
+
+
+atexit.register(shutdown_client_manager)
+
+
+def benchmark_client_reuse(n_requests=50, latency=0.0):
+    """Sequential requests through a fresh client per call vs the pooled client, against the fake API."""
+    from fake_openai_server import start_fake_server
+
+    server, base_url = start_fake_server(latency=latency, jitter=0)
+    messages = [{"role": "user", "content": "Create a hyper-personalized LinkedIn message for Jane Doe, VP"}]
+    try:
+        start = time.perf_counter()
+        for _ in range(n_requests):
+            with httpx.Client() as http_client:
+                OpenAI(api_key='test-key', base_url=base_url, http_client=http_client).chat.completions.create(
+                    model='gpt-4', messages=messages)
+        per_call_s = time.perf_counter() - start
+
+        manager = OpenAIClientManager()
+        start = time.perf_counter()
+        for _ in range(n_requests):
+            manager.get_client('test-key', base_url).chat.completions.create(model='gpt-4', messages=messages)
+        pooled_s = time.perf_counter() - start
+        stats = manager.summary()
+        manager.close()
+        stats.update(per_call_client_s=round(per_call_s, 3), pooled_client_s=round(pooled_s, 3))
+        return stats
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    #   python openai_client.py [n_requests]
+    import sys
+
+    results = benchmark_client_reuse(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
+    print(f"{results['requests']} requests: new client per call {results['per_call_client_s']}s, "
+          f"pooled client {results['pooled_client_s']}s")
+    print(f"Pooled: {results['new_connections']} new connections, {results['reused_connections']} reused "
+          f"(reuse rate {results['reuse_rate']})")
@@ -0,0 +1,190 @@
+# page_waits.py
+import time
+from contextlib import contextmanager
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from flask import current_app, has_app_context
+
+# Sales Navigator fetches lead results from this API endpoint
+SEARCH_API_PATTERN = '/sales-api/salesApiLeadSearch'
+
+LEAD_CARD_SELECTOR = 'div[data-x-search-result="LEAD"]'
+
+# Resolves once the DOM has seen no mutations for quietMs (true), or after
+# timeoutMs regardless (false)
+DOM_SETTLED_JS = """
+([quietMs, timeoutMs]) => new Promise(resolve => {
+    let quietTimer = null;
+    let hardTimer = null;
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => done(true), quietMs);
+    });
+    function done(settled) {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(hardTimer);
+        resolve(settled);
+    }
+    observer.observe(document.body || document.documentElement,
+                     {childList: true, subtree: true, attributes: true, characterData: true});
+    quietTimer = setTimeout(() => done(true), quietMs);
+    hardTimer = setTimeout(() => done(false), timeoutMs);
+})
+"""
+
+# Cheap fingerprint of the visible result list, used to detect that a
+# filter or page change has actually re-rendered the results
+RESULTS_SIGNATURE_JS = """
+(selector) => {
+    const cards = document.querySelectorAll(selector);
+    const first = cards.length ? cards[0].innerText.slice(0, 120) : '';
+    return cards.length + '|' + first + '|' + location.href;
+}
+"""
+
+RESULTS_CHANGED_JS = f"([sig, selector]) => ({RESULTS_SIGNATURE_JS.strip()})(selector) !== sig"
+
+
+class WaitMetrics:
+    """Compare time actually spent waiting with the fixed sleeps it replaces."""
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, label, budget, actual, satisfied):
+        self.records.append({
+            'label': label,
+            'budget': budget,
+            'actual': round(actual, 3),
+            'satisfied': satisfied
+        })
+
+    def summary(self):
+        budget = sum(r['budget'] for r in self.records)
+        actual = sum(r['actual'] for r in self.records)
+        return {
+            'waits': len(self.records),
+            'timeouts': sum(1 for r in self.records if not r['satisfied']),
+            'budget_s': round(budget, 2),
+            'actual_s': round(actual, 2),
+            'saved_s': round(budget - actual, 2)
+        }
+
+
+class StageTimings:
+    """Wall time per scraper stage (launch, login, search, filter, extract, paginate, ...)."""
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, stage, seconds, **details):
+        self.records.append(dict(details, stage=stage, seconds=round(seconds, 3)))
+
+    @contextmanager
+    def stage(self, stage, **details):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, **details)
+
+    def summary(self):
+        """{stage: {count, total_s, max_s}} in the order stages first ran."""
+        stages = {}
+        for r in self.records:
+            s = stages.setdefault(r['stage'], {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+            s['count'] += 1
+            s['total_s'] = round(s['total_s'] + r['seconds'], 3)
+            s['max_s'] = max(s['max_s'], r['seconds'])
+        return stages
+
+    def describe(self):
+        return ', '.join(f"{stage} {s['total_s']}s" + (f" ({s['count']}x)" if s['count'] > 1 else '')
+                         for stage, s in self.summary().items())
+
+
+class PageWaiter:
+    """Condition-based waits for a Playwright page.
+
+    Every wait takes a `budget` - the fixed sleep (in seconds) it replaces.
+    The wait returns as soon as its condition holds, and gives up after
+    budget * WAIT_BOUND_FACTOR so a missing condition never costs more than
+    the old sleep did (with the default factor of 1.0). Waits never raise on
+    timeout; they return False instead.
+    """
+
+    def __init__(self, page, metrics=None, bound_factor=None, settle_ms=None):
+        config = current_app.config if has_app_context() else {}
+        self.page = page
+        self.metrics = metrics or WaitMetrics()
+        self.bound_factor = bound_factor if bound_factor is not None else config.get('WAIT_BOUND_FACTOR', 1.0)
+        self.settle_ms = settle_ms if settle_ms is not None else config.get('WAIT_SETTLE_MS', 300)
+
+    def _timeout_ms(self, budget):
+        return max(int(budget * 1000 * self.bound_factor), self.settle_ms)
+
+    def _record(self, label, budget, start, satisfied):
+        self.metrics.record(label, budget, time.time() - start, satisfied)
+        return satisfied
+
+    def for_selector(self, selector, budget, state='visible'):
+        """Wait until `selector` reaches `state`."""
+        start = time.time()
+        try:
+            self.page.wait_for_selector(selector, state=state, timeout=self._timeout_ms(budget))
+            satisfied = True
+        except PlaywrightTimeoutError:
+            satisfied = False
+        return self._record(f'selector {selector}', budget, start, satisfied)
+
+    def for_dom_settled(self, budget, quiet_ms=None):
+        """Wait until the DOM stops mutating for `quiet_ms`."""
+        start = time.time()
+        quiet_ms = quiet_ms or self.settle_ms
+        try:
+            satisfied = bool(self.page.evaluate(DOM_SETTLED_JS, [quiet_ms, self._timeout_ms(budget)]))
+        except Exception as e:
+            # Navigation can destroy the execution context mid-wait
+            print(f"DOM settle wait interrupted: {e}")
+            satisfied = False
+        return self._record('dom settled', budget, start, satisfied)
+
+    def results_signature(self, selector=LEAD_CARD_SELECTOR):
+        try:
+            return self.page.evaluate(RESULTS_SIGNATURE_JS, selector)
+        except Exception:
+            return None
+
+    def for_results_change(self, previous_signature, budget, selector=LEAD_CARD_SELECTOR):
+        """Wait until the result list differs from `previous_signature`."""
+        start = time.time()
+        try:
+            self.page.wait_for_function(
+                RESULTS_CHANGED_JS,
+                arg=[previous_signature, selector],
+                timeout=self._timeout_ms(budget)
+            )
+            satisfied = True
+        except PlaywrightTimeoutError:
+            satisfied = False
+        except Exception as e:
+            print(f"Results change wait interrupted: {e}")
+            satisfied = False
+        return self._record('results change', budget, start, satisfied)
+
+    @contextmanager
+    def for_search_response(self, budget, url_pattern=SEARCH_API_PATTERN):
+        """Wrap an action that triggers a search API call and wait for its response."""
+        start = time.time()
+        action_done = False
+        satisfied = True
+        try:
+            with self.page.expect_response(lambda r: url_pattern in r.url, timeout=self._timeout_ms(budget)):
+                yield
+                action_done = True
+        except PlaywrightTimeoutError:
+            # Only swallow the timeout of the response wait, not of the action
+            if not action_done:
+                raise
+            satisfied = False
+        self._record('search response', budget, start, satisfied)
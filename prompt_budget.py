@@ -0,0 +1,256 @@
+# prompt_budget.py
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter
+from flask import current_app, has_app_context
+
+from disk_cache import DiskCache, make_cache_key
+
+try:
+    import tiktoken
+except ImportError:  # estimate from characters instead
+    tiktoken = None
+
+# Prompt preparation for the product description. An uploaded PDF can run to
+# tens of thousands of tokens, but the prompts only need its gist, so the
+# description is compacted once per upload into an extractive summary (the
+# highest-scoring sentences of each chunk, in document order) that fits a
+# per-call token budget. Summaries are cached by content hash and budget.
+
+CHARS_PER_TOKEN = 4
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'for', 'from', 'has', 'have', 'in', 'is', 'it',
+    'its', 'of', 'on', 'or', 'our', 'that', 'the', 'their', 'this', 'to', 'we', 'will', 'with', 'you', 'your'
+}
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n\s*\n|\n(?=\s*[-*•])')
+_WORD = re.compile(r"[a-z0-9][a-z0-9'-]*")
+
+_encoders = {}
+_summaries = {}
+_summaries_lock = threading.Lock()
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class PromptStats:
+    """Tokens the product context would have cost in full vs what was sent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.original_tokens = 0
+        self.sent_tokens = 0
+        self.compacted = 0
+        self.last = None
+
+    def record(self, purpose, original, sent):
+        with self._lock:
+            self.requests += 1
+            self.original_tokens += original
+            self.sent_tokens += sent
+            if sent < original:
+                self.compacted += 1
+            self.last = {'purpose': purpose, 'original_tokens': original, 'sent_tokens': sent,
+                         'tokens_saved': original - sent}
+
+    def summary(self):
+        with self._lock:
+            saved = self.original_tokens - self.sent_tokens
+            return {
+                'requests': self.requests,
+                'compacted': self.compacted,
+                'original_tokens': self.original_tokens,
+                'sent_tokens': self.sent_tokens,
+                'tokens_saved': saved,
+                'avg_saved_per_request': round(saved / self.requests, 1) if self.requests else 0.0,
+                'last': self.last
+            }
+
+
+prompt_stats = PromptStats()
+
+
+def count_tokens(text, model='gpt-4'):
+    """Token count with tiktoken when installed, otherwise ~4 characters per token."""
+    if not text:
+        return 0
+    if tiktoken is not None:
+        encoder = _encoders.get(model)
+        if encoder is None:
+            try:
+                encoder = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoder = tiktoken.get_encoding('cl100k_base')
+            _encoders[model] = encoder
+        return len(encoder.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE_END.split(text or '') if s and s.strip()]
+
+
+def chunk_text(text, max_tokens=1000, model='gpt-4'):
+    """Split text into chunks of at most `max_tokens`, breaking between sentences."""
+    chunks, current, current_tokens = [], [], 0
+    for sentence in split_sentences(text):
+        tokens = count_tokens(sentence, model)
+        if tokens > max_tokens:
+            # A single huge "sentence" (e.g. a table dump) is cut by characters
+            sentence = truncate_to_tokens(sentence, max_tokens, model)
+            tokens = count_tokens(sentence, model)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(' '.join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def truncate_to_tokens(text, max_tokens, model='gpt-4'):
+    """Cut text to at most `max_tokens`, at a word boundary."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    cut = text[:max_tokens * CHARS_PER_TOKEN]
+    while cut and count_tokens(cut, model) > max_tokens:
+        cut = cut[:int(len(cut) * 0.9)]
+    return cut.rsplit(' ', 1)[0] if ' ' in cut else cut
+
+
+def _extract(sentences, frequencies, budget, model):
+    """Highest-scoring sentences within `budget` tokens, in their original order."""
+    scored = []
+    for i, sentence in enumerate(sentences):
+        words = [w for w in _WORD.findall(sentence.lower()) if w not in STOPWORDS]
+        if not words:
+            continue
+        score = sum(frequencies[w] for w in words) / math.sqrt(len(words))
+        # Openings usually state what the product is
+        if i < 3:
+            score *= 1.5
+        scored.append((score, i, sentence))
+    scored.sort(key=lambda s: (-s[0], s[1]))
+
+    chosen, seen, used = [], set(), 0
+    for _, i, sentence in scored:
+        tokens = count_tokens(sentence, model)
+        # Boilerplate repeats across a document; one copy is enough
+        if sentence not in seen and used + tokens <= budget:
+            chosen.append((i, sentence))
+            seen.add(sentence)
+            used += tokens
+    return [sentence for _, sentence in sorted(chosen)]
+
+
+def summarize_text(text, max_tokens, model='gpt-4', chunk_tokens=1000):
+    """
+    Extractive summary of at most `max_tokens`. Text already within budget
+    is returned as-is; longer text keeps its opening sentence, then is
+    chunked and each chunk contributes its best sentences in proportion to
+    its size.
+    """
+    text = (text or '').strip()
+    total = count_tokens(text, model)
+    if total <= max_tokens:
+        return text
+
+    sentences = split_sentences(text)
+    lead = truncate_to_tokens(sentences[0], max_tokens // 4, model) if sentences else ''
+    budget = max_tokens - count_tokens(lead, model)
+    rest = text[text.index(sentences[0]) + len(sentences[0]):] if sentences else text
+
+    frequencies = Counter(w for w in _WORD.findall(text.lower()) if w not in STOPWORDS)
+    parts = [lead] if lead else []
+    chunks = chunk_text(rest, chunk_tokens, model)
+    rest_sentences = split_sentences(rest)
+    sentence_tokens = count_tokens(rest, model) / max(len(rest_sentences), 1)
+    if chunks and budget / len(chunks) >= 2 * sentence_tokens:
+        for chunk in chunks:
+            share = int(budget * count_tokens(chunk, model) / total)
+            parts.extend(_extract(split_sentences(chunk), frequencies, share, model))
+    else:
+        # Too small a budget to take something from every chunk: best overall
+        parts.extend(_extract(rest_sentences, frequencies, budget, model))
+    return truncate_to_tokens(' '.join(dict.fromkeys(parts)), max_tokens, model)
+
+
+def get_summary_cache():
+    """The on-disk summary cache under DATA_DIR, or None outside the app (memory only then)."""
+    if not has_app_context():
+        return None
+    directory = os.path.join(current_app.config['DATA_DIR'], 'cache', 'summaries')
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = DiskCache(directory, ttl=0, max_entries=100)
+        return _caches[directory]
+
+
+def product_summary(product_description, max_tokens, model='gpt-4'):
+    """Cached compact product description for a token budget (memory, then disk)."""
+    digest = hashlib.sha256((product_description or '').encode('utf-8')).hexdigest()
+    key = make_cache_key('product_summary', digest, max_tokens, model)
+    with _summaries_lock:
+        entry = _summaries.get(key)
+    if entry is not None:
+        return entry
+
+    cache = get_summary_cache()
+    entry = cache.get(key) if cache is not None else None
+    if entry is None:
+        summary = summarize_text(product_description, max_tokens, model)
+        entry = {'summary': summary, 'original_tokens': count_tokens(product_description, model),
+                 'summary_tokens': count_tokens(summary, model)}
+        if cache is not None:
+            cache.set(key, entry)
+        print(f"Compacted product description: {entry['original_tokens']} -> {entry['summary_tokens']} tokens")
+    with _summaries_lock:
+        # Only the current description's summaries matter; don't grow forever
+        if len(_summaries) >= 32:
+            _summaries.clear()
+        _summaries[key] = entry
+    return entry
+
+
+def prepare_product_context(product_description, max_tokens, purpose='prompt', model='gpt-4'):
+    """The product description to embed in a prompt, within `max_tokens`; records tokens saved."""
+    if not product_description:
+        return ''
+    entry = product_summary(product_description, max_tokens, model)
+    prompt_stats.record(purpose, entry['original_tokens'], entry['summary_tokens'])
+    return entry['summary']
+
+
+def product_budgets():
+    """(ICP budget, outreach budget) in tokens for the product description, from the app config if there is one."""
+    config = current_app.config if has_app_context() else {}
+    return config.get('ICP_PRODUCT_TOKEN_BUDGET', 2000), config.get('OUTREACH_PRODUCT_TOKEN_BUDGET', 150)
+
+
+def precompute_product_summaries(product_description, model='gpt-4'):
+    """Build the summaries for every budget once, when the description is uploaded."""
+    for budget in product_budgets():
+        product_summary(product_description, budget, model)
+
+
+if __name__ == '__main__':
+    #   python prompt_budget.py <text file> [max_tokens]
+    import sys
+    import time
+
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        text = f.read()
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    start = time.perf_counter()
+    summary = summarize_text(text, budget)
+    elapsed = time.perf_counter() - start
+    original, compact = count_tokens(text), count_tokens(summary)
+    print(f"{original} -> {compact} tokens ({original - compact} saved) in {elapsed:.3f}s"
+          f"{'' if tiktoken else ' (estimated, tiktoken not installed)'}")
+    print(summary[:1000])
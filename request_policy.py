@@ -0,0 +1,150 @@
+# request_policy.py
+from flask import current_app
+
+# Request blocking for the scraping browser. Extraction only needs the DOM
+# and a few `src` attributes (a blocked image keeps its src), so images,
+# media, fonts and third-party trackers can be aborted before they are
+# fetched, which makes page loads and scroll-triggered lazy loads finish
+# sooner and use less bandwidth and memory.
+#
+# RESOURCE_BLOCKING holds one rule per scraper stage, e.g.
+#
+#   login=trackers;*=image,media,font,trackers
+#
+# Each rule lists Playwright resource types (image, media, font, stylesheet,
+# ...) and/or 'trackers' (URLs matching TRACKER_PATTERNS plus
+# RESOURCE_BLOCK_PATTERNS). Stages are those of the scraper's stage timings
+# (login, search, filter, extract, paginate, fallback); '*' covers stages
+# without a rule of their own, and 'off' or an empty rule blocks nothing.
+# Login keeps images because checkpoint pages can show CAPTCHAs. URLs
+# matching ALLOW_PATTERNS plus RESOURCE_ALLOW_PATTERNS (the search API,
+# login and checkpoint pages) and documents are never blocked. Stylesheets
+# are left alone by default: visibility checks depend on layout.
+#
+# Routing is not free beyond the round trip: Playwright turns Chromium's
+# HTTP cache off for a context with any route installed, whatever its URL
+# pattern, so a warm context downloads scripts and stylesheets again on every
+# navigation. Narrower route patterns would not bring the cache back, and
+# LinkedIn's photo URLs have no extension to match on anyway. Blocking pays
+# off while the images, fonts and trackers it saves outweigh the re-fetched
+# scripts; `python scraper_benchmark.py cache` measures warm runs both ways
+# against the mock, and RESOURCE_BLOCKING=off installs no route at all.
+
+TRACKER_PATTERNS = [
+    '/li/track',
+    'px.ads.linkedin.com',
+    'snap.licdn.com/li.lms-analytics',
+    '/tscp-serving/',
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'connect.facebook.net',
+    'bat.bing.com'
+]
+
+ALLOW_PATTERNS = [
+    '/sales-api/',
+    '/voyager/api/',
+    '/sales/login',
+    '/checkpoint/',
+    '/uas/'
+]
+
+DEFAULT_RULES = 'login=trackers;*=image,media,font,trackers'
+
+
+def parse_rules(text):
+    """'login=trackers;*=image,font' -> {'login': {'trackers'}, '*': {'image', 'font'}}"""
+    rules = {}
+    for part in (text or '').split(';'):
+        if not part.strip():
+            continue
+        stage, _, items = part.partition('=') if '=' in part else ('*', '', part)
+        items = {item.strip().lower() for item in items.split(',') if item.strip()}
+        rules[stage.strip() or '*'] = items - {'off', 'none'}
+    return rules
+
+
+def _patterns(text):
+    return [p.strip() for p in (text or '').split(',') if p.strip()]
+
+
+class RequestPolicy:
+    """Blocks requests in a browser context according to the rule of the current stage."""
+
+    def __init__(self, rules, block_patterns=None, allow_patterns=None):
+        self.rules = rules
+        self.block_patterns = TRACKER_PATTERNS + list(block_patterns or [])
+        self.allow_patterns = ALLOW_PATTERNS + list(allow_patterns or [])
+        self.stage = '*'
+        self.installed = False
+        self.reset_stats()
+
+    @classmethod
+    def from_config(cls):
+        config = current_app.config
+        return cls(parse_rules(config.get('RESOURCE_BLOCKING', DEFAULT_RULES)),
+                   block_patterns=_patterns(config.get('RESOURCE_BLOCK_PATTERNS')),
+                   allow_patterns=_patterns(config.get('RESOURCE_ALLOW_PATTERNS')))
+
+    @classmethod
+    def for_lease(cls, lease):
+        """The policy of a leased context, installed the first time it is leased."""
+        policy = getattr(lease, 'request_policy', None)
+        if policy is None:
+            policy = cls.from_config()
+            policy.install(lease.context)
+            lease.request_policy = policy
+        return policy
+
+    def install(self, context):
+        """Route the context's requests through this policy (a no-op if no rule blocks anything)."""
+        if not any(self.rules.values()):
+            return
+        # Every routed request makes a round trip to Python, so only route when something can be blocked
+        context.route('**/*', self._handle)
+        context.on('response', self._on_response)
+        self.installed = True
+
+    def reset_stats(self):
+        self.stats = {'requests': 0, 'blocked': 0, 'blocked_by': {}, 'loaded_bytes': 0, 'loaded_bytes_by': {}}
+
+    def block_reason(self, url, resource_type):
+        """Why a request would be blocked in the current stage ('image', 'tracker', ...), or None."""
+        rule = self.rules.get(self.stage, self.rules.get('*', set()))
+        if not rule or resource_type == 'document':
+            return None
+        if any(p in url for p in self.allow_patterns):
+            return None
+        if resource_type in rule:
+            return resource_type
+        if 'trackers' in rule and any(p in url for p in self.block_patterns):
+            return 'tracker'
+        return None
+
+    def _handle(self, route, request):
+        self.stats['requests'] += 1
+        reason = self.block_reason(request.url, request.resource_type)
+        if reason:
+            self.stats['blocked'] += 1
+            self.stats['blocked_by'][reason] = self.stats['blocked_by'].get(reason, 0) + 1
+            route.abort('blockedbyclient')
+        else:
+            # fallback() rather than continue_() so a HAR replay route still answers it
+            route.fallback()
+
+    def _on_response(self, response):
+        # Bytes of blocked requests are never fetched, so they are only known
+        # by comparison (see scraper_benchmark with RESOURCE_BLOCKING=off)
+        try:
+            length = int(response.headers.get('content-length') or 0)
+        except ValueError:
+            return
+        resource_type = response.request.resource_type
+        self.stats['loaded_bytes'] += length
+        self.stats['loaded_bytes_by'][resource_type] = self.stats['loaded_bytes_by'].get(resource_type, 0) + length
+
+    def describe(self):
+        blocked = ', '.join(f"{reason} {n}" for reason, n in sorted(self.stats['blocked_by'].items()))
+        return (f"{self.stats['requests']} requests, {self.stats['blocked']} blocked"
+                + (f" ({blocked})" if blocked else '') + f", {self.stats['loaded_bytes'] / 1024:.0f} KB loaded")
@@ -0,0 +1,84 @@
+# results_engine.py
+import threading
+
+import storage
+from ai_processor import find_mutual_connections
+from data_manager import load_profile_data, load_trusted_network, save_csill
+from warm_paths import WarmPathGraph
+
+# The ranked lead list (CSILL) is built once per search or TNL change and
+# stored with its rank as the row position; views page through it by index.
+# data_manager increments 'csill_version' whenever either input is saved, and
+# the CSILL is saved together with the version it was ranked from, so a save
+# that lands while ranking is in progress leaves it stale rather than fresh.
+
+CONNECTION_LEVELS = ['1st', '2nd', '3rd+']
+
+_build_lock = threading.Lock()
+
+# Kept for the life of the process so re-ranking after a TNL edit or a new
+# search only re-matches the prospects that changed
+_graph = WarmPathGraph()
+
+
+def inputs_version():
+    return storage.get_meta('csill_version', '0')
+
+
+def results_stale():
+    return (storage.get_meta('csill_ranked_version') != inputs_version()
+            or storage.count_profiles('csill') == 0)
+
+
+def ensure_ranked_results():
+    """Rank the latest search results against the TNL if that hasn't happened yet."""
+    if not results_stale():
+        return False
+    with _build_lock:
+        if not results_stale():
+            return False
+        # Read before the inputs, so a save from here on makes the result stale again
+        version = inputs_version()
+        profiles = load_profile_data()
+        if not profiles:
+            return False
+        ranked = find_mutual_connections(profiles, load_trusted_network(), graph=_graph)
+        save_csill(ranked, ranked_version=version)
+        print(f"Ranked {len(ranked)} profiles into the CSILL ({_graph.stats['rematched']} matched so far)")
+        return True
+
+
+def query_results(page=1, per_page=24, connection_level=None, tnl_only=False, location=None):
+    """
+    One page of the ranked lead list. Each profile gets its `profile_id`
+    (its rank position), which the message routes use to look it up.
+    """
+    if connection_level not in CONNECTION_LEVELS:
+        connection_level = None
+    filters = {
+        'connection_level': connection_level,
+        'tnl_connection': True if tnl_only else None,
+        'location': (location or '').strip() or None
+    }
+    total = storage.count_filtered_profiles('csill', **filters)
+    total_pages = max((total + per_page - 1) // per_page, 1)
+    page = min(max(page, 1), total_pages)
+
+    profiles = []
+    for position, profile in storage.query_profiles('csill', offset=(page - 1) * per_page, limit=per_page,
+                                                    **filters):
+        profile['profile_id'] = position
+        profiles.append(profile)
+
+    return {
+        'profiles': profiles,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'total_pages': total_pages,
+        'filters': {
+            'connection_level': connection_level,
+            'tnl_only': bool(tnl_only),
+            'location': filters['location']
+        }
+    }
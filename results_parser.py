@@ -0,0 +1,171 @@
+# results_parser.py
+import glob
+import json
+import os
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+
+from card_extraction import CARD_SELECTORS, CARD_FIELD_SELECTORS, build_profile, placeholder_image
+
+
+def _text(element):
+    """Whitespace-normalized text of an element, close to the browser's innerText."""
+    return ' '.join(element.text_content().split())
+
+
+class ResultPageParser:
+    """
+    Parse Sales Navigator result-page HTML into profile dicts without a browser.
+
+    Uses the same card/field selector data as the in-page extractor, compiled
+    once to XPath so parsing a page is pure CPU work.
+    """
+
+    def __init__(self, card_selectors=None, field_selectors=None):
+        self.card_selectors = [(sel, CSSSelector(sel)) for sel in (card_selectors or CARD_SELECTORS)]
+        self.field_selectors = {
+            field: [CSSSelector(sel) for sel in selectors]
+            for field, selectors in (field_selectors or CARD_FIELD_SELECTORS).items()
+        }
+        self.lead_id_selector = CSSSelector('[data-lead-id]')
+        self.link_selector = CSSSelector('a')
+
+    def _first(self, card, field):
+        for selector in self.field_selectors[field]:
+            found = selector(card)
+            if found:
+                return found[0]
+        return None
+
+    def _candidates(self, card, field, attr):
+        candidates = []
+        for selector in self.field_selectors[field]:
+            found = selector(card)
+            candidates.append(found[0].get(attr) if found else None)
+        return candidates
+
+    def raw_card(self, card):
+        """Raw fields of one card, in the same shape the in-page extractor returns."""
+        raw = {}
+        for field in ('name', 'headline', 'location', 'connection', 'shared'):
+            element = self._first(card, field)
+            raw[field] = _text(element) if element is not None else None
+        lead = self.lead_id_selector(card)
+        raw['url_candidates'] = self._candidates(card, 'url', 'href')
+        raw['lead_id'] = lead[0].get('data-lead-id') if lead else None
+        raw['links'] = [a.get('href') for a in self.link_selector(card) if a.get('href')]
+        raw['image_candidates'] = self._candidates(card, 'image', 'src')
+        return raw
+
+    def parse(self, html_text, max_results=50):
+        """Returns (profiles, used_selector, card_count) like extract_profiles_in_page."""
+        if not html_text or not html_text.strip():
+            return [], None, 0
+        tree = lxml_html.fromstring(html_text)
+
+        cards, used_selector = [], None
+        for selector_text, selector in self.card_selectors:
+            cards = selector(tree)
+            if cards:
+                used_selector = selector_text
+                break
+
+        profiles = [build_profile(self.raw_card(card), i) for i, card in enumerate(cards[:max_results])]
+        return profiles, used_selector, len(cards)
+
+
+# Fields Sales Navigator tags with data-anonymize, for pages whose card
+# containers match none of the card selectors
+_ANONYMIZED = {
+    'name': CSSSelector('[data-anonymize="person-name"]'),
+    'headline': CSSSelector('[data-anonymize="title"]'),
+    'location': CSSSelector('[data-anonymize="location"]'),
+    'image': CSSSelector('img[data-anonymize="person-photo"]')
+}
+
+_default_parser = None
+
+
+def get_parser():
+    global _default_parser
+    if _default_parser is None:
+        _default_parser = ResultPageParser()
+    return _default_parser
+
+
+def parse_results_html(html_text, max_results=50):
+    """Parse one result page with the shared, pre-compiled parser."""
+    return get_parser().parse(html_text, max_results=max_results)
+
+
+def parse_anonymized_fields(html_text, max_results=50):
+    """
+    Fallback when no result cards match: pair up data-anonymize name, title,
+    location and photo elements by position.
+    """
+    if not html_text or not html_text.strip():
+        return []
+    tree = lxml_html.fromstring(html_text)
+    names = [_text(e) for e in _ANONYMIZED['name'](tree)]
+    headlines = [_text(e) for e in _ANONYMIZED['headline'](tree)]
+    locations = [_text(e) for e in _ANONYMIZED['location'](tree)]
+    images = [e.get('src') for e in _ANONYMIZED['image'](tree)]
+
+    print(f"Parser found {len(names)} names, {len(headlines)} headlines, {len(locations)} locations, and {len(images)} images")
+
+    profiles = []
+    for i in range(min(len(names), max_results)):
+        profiles.append({
+            "name": names[i],
+            "headline": headlines[i] if i < len(headlines) else "Sales Professional",
+            "location": locations[i] if i < len(locations) else "United States",
+            "connection_level": "2nd",  # Default to 2nd connection
+            "profile_url": "https://www.linkedin.com/sales/",
+            "profile_image": images[i] if i < len(images) and images[i] else placeholder_image(i),
+            "mutual_connections": [],
+            "tnl_connection": False
+        })
+    return profiles
+
+
+def parse_page_html(html_text, max_results=50):
+    """Parse a result page, falling back to anonymized fields if no cards match."""
+    profiles, _, card_count = parse_results_html(html_text, max_results=max_results)
+    if not card_count:
+        profiles = parse_anonymized_fields(html_text, max_results=max_results)
+    return profiles
+
+
+def parse_snapshot_file(path, max_results=50):
+    """Parse a saved result-page snapshot."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_page_html(f.read(), max_results=max_results)
+
+
+def parse_snapshot_dir(directory, pattern='*.html', max_results=50):
+    """Parse every snapshot in `directory`. Returns {filename: profiles}."""
+    results = {}
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        results[os.path.basename(path)] = parse_snapshot_file(path, max_results=max_results)
+    return results
+
+
+if __name__ == '__main__':
+    # Re-run extraction over archived pages:
+    #   python results_parser.py <snapshot_dir_or_file> [output.json]
+    import sys
+    import time
+
+    target = sys.argv[1]
+    start = time.perf_counter()
+    if os.path.isdir(target):
+        results = parse_snapshot_dir(target)
+    else:
+        results = {os.path.basename(target): parse_snapshot_file(target)}
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(profiles) for profiles in results.values())
+    print(f"Parsed {len(results)} pages, {total} profiles in {elapsed * 1000:.1f} ms")
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,97 @@
+# sales_nav_fixtures.py
+import html
+
+# Synthetic Sales Navigator markup for benchmarks and offline runs. The card
+# structure mirrors the selectors in card_extraction.CARD_FIELD_SELECTORS.
+
+FIRST_NAMES = ["John", "Michael", "Sarah", "David", "Jennifer", "Robert", "Lisa",
+               "William", "Emma", "James", "Jessica", "Chris", "Amanda", "Daniel"]
+
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Miller", "Davis",
+              "Wilson", "Taylor", "Anderson", "Thomas", "Jackson", "White", "Harris"]
+
+TITLES = ["VP of Sales", "Head of Sales", "Sales Director", "Account Executive",
+          "Business Development Representative", "Sales Manager", "Chief Revenue Officer"]
+
+COMPANIES = ["Salesforce", "Microsoft", "Oracle", "HubSpot", "Adobe",
+             "IBM", "SAP", "Zoom", "Slack", "Dell", "Google", "Amazon"]
+
+LOCATIONS = ["San Francisco, California, United States", "New York, New York, United States",
+             "Boston, Massachusetts, United States", "Austin, Texas, United States",
+             "Seattle, Washington, United States", "Denver, Colorado, United States"]
+
+DEGREES = ["1st", "2nd", "2nd", "3rd+"]
+
+
+def sample_lead(index):
+    """Deterministic fake lead number `index`."""
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    return {
+        'lead_id': f"ACwAA{index:08d}",
+        'name': f"{first} {last}",
+        'headline': f"{TITLES[index % len(TITLES)]} at {COMPANIES[index % len(COMPANIES)]}",
+        'location': LOCATIONS[index % len(LOCATIONS)],
+        'degree': DEGREES[index % len(DEGREES)],
+        'image': f"https://media.licdn.com/dms/image/fake/{index}.jpg",
+        'shared': shared_connections_text(index)
+    }
+
+
+def shared_connections_text(index):
+    """Shared-connections line for 2nd-degree leads, naming some fake contacts."""
+    if DEGREES[index % len(DEGREES)] != "2nd":
+        return None
+    names = [f"{FIRST_NAMES[(index + k) % len(FIRST_NAMES)]} {LAST_NAMES[(index * 3 + k) % len(LAST_NAMES)]}"
+             for k in range(2)]
+    return f"{names[0]}, {names[1]} and {index % 7 + 1} other mutual connections"
+
+
+def render_lead_card(lead):
+    esc = html.escape
+    shared = ''
+    if lead.get('shared'):
+        shared = (f'<div class="artdeco-entity-lockup__metadata"><a href="/sales/search/people?'
+                  f'filter=SHARED_CONNECTIONS&lead={esc(lead["lead_id"])}">{esc(lead["shared"])}</a></div>')
+    return f"""
+<li class="artdeco-list__item">
+  <div data-x-search-result="LEAD" class="search-results__result-container">
+    <div class="artdeco-entity-lockup" data-lead-id="{esc(lead['lead_id'])}">
+      <div class="artdeco-entity-lockup__image">
+        <img data-anonymize="person-photo" src="{esc(lead['image'])}" alt="">
+      </div>
+      <div class="artdeco-entity-lockup__content">
+        <div class="artdeco-entity-lockup__title">
+          <a data-anonymize="person-name" href="https://www.linkedin.com/sales/lead/{esc(lead['lead_id'])},NAME_SEARCH">{esc(lead['name'])}</a>
+        </div>
+        <span class="artdeco-entity-lockup__degree">{esc(lead['degree'])}</span>
+        <div class="artdeco-entity-lockup__subtitle"><span data-anonymize="title">{esc(lead['headline'])}</span></div>
+        <div class="artdeco-entity-lockup__caption"><span data-anonymize="location">{esc(lead['location'])}</span></div>
+        {shared}
+      </div>
+    </div>
+  </div>
+</li>"""
+
+
+def render_results_page(page_num=1, per_page=25, total_pages=5, next_href=None):
+    """Render a full result page; the Next button is disabled on the last page."""
+    start = (page_num - 1) * per_page
+    cards = ''.join(render_lead_card(sample_lead(i)) for i in range(start, start + per_page))
+    disabled = ' disabled' if page_num >= total_pages else ''
+    next_href = next_href or f"?page={page_num + 1}"
+    return f"""<!DOCTYPE html>
+<html>
+<head><title>Sales Navigator - Lead search</title></head>
+<body>
+  <input aria-label="Search by keywords" placeholder="Search keywords">
+  <div id="search-results-container">
+    <ol class="search-results__result-list">{cards}
+    </ol>
+    <div class="artdeco-pagination">
+      <button class="artdeco-pagination__button--next" aria-label="Next"{disabled}
+              onclick="window.location.href='{html.escape(next_href)}'">Next</button>
+    </div>
+  </div>
+</body>
+</html>"""
@@ -0,0 +1,155 @@
+# sales_nav_urls.py
+import json
+import os
+import re
+import threading
+import urllib.parse
+from flask import current_app
+
+# Sales Navigator encodes a lead search in the `query` parameter of
+# /sales/search/people as a Rest.li expression, e.g.
+#
+#   (filters:List((type:REGION,values:List((id:<geo id>,text:<name>,selectionType:INCLUDED))),
+#                 (type:COMPANY_HEADCOUNT,values:List((id:C,text:11-50,selectionType:INCLUDED)))),
+#    keywords:VP%20Sales)
+#
+# with values percent-encoded inside the expression and the whole expression
+# encoded again as a URL parameter. Navigating to such a URL runs the search
+# with its filters, instead of typing the keywords and driving the filter
+# pills. Headcount buckets have fixed letter IDs. Geography IDs are
+# LinkedIn's own, so they are never guessed: GeoIdTable learns them from the
+# URL the UI produces after a geography filter has been applied by clicking,
+# and keeps them in DATA_DIR/sales_nav_geo_ids.json for later searches. They
+# are filed under the form's location value as well as LinkedIn's label,
+# both normalised (see geo_key), so a later search with the same form value
+# finds the ID whatever LinkedIn calls the region.
+
+SEARCH_PATH = '/sales/search/people'
+
+# Company headcount bucket IDs, keyed by the search form's company_size values
+HEADCOUNT_BUCKETS = {
+    'self-employed': ('A', 'Self-employed'),
+    '1-10': ('B', '1-10'),
+    '11-50': ('C', '11-50'),
+    '51-200': ('D', '51-200'),
+    '201-500': ('E', '201-500'),
+    '501-1000': ('F', '501-1000'),
+    '1001-5000': ('G', '1001-5000'),
+    '5001-10000': ('H', '5001-10,000'),
+    '10001+': ('I', '10,001+')
+}
+
+GEO_IDS_FILE = 'sales_nav_geo_ids.json'
+
+_FILTER_RE = re.compile(r'\(type:(\w+),values:List\(((?:\([^()]*\),?)*)\)\)')
+_VALUE_RE = re.compile(r'\(([^()]*)\)')
+
+
+def _encode(value):
+    """Percent-encode a value inside a Rest.li expression (commas, colons, parens, spaces)."""
+    return urllib.parse.quote(str(value), safe='')
+
+
+def _filter(filter_type, value_id, text):
+    return (f"(type:{filter_type},values:List((id:{_encode(value_id)},text:{_encode(text)},"
+            f"selectionType:INCLUDED)))")
+
+
+def headcount_bucket(company_size):
+    """(id, label) of a company_size form value, or None if it has no bucket."""
+    key = (company_size or '').strip().lower().replace(',', '').replace(' ', '')
+    return HEADCOUNT_BUCKETS.get(key)
+
+
+def geo_key(geo_text):
+    """'California, United States', 'california' -> 'california'."""
+    key = ' '.join((geo_text or '').lower().split())
+    return key[:-len(', united states')] if key.endswith(', united states') else key
+
+
+def build_search_url(keywords, geo_id=None, geo_text=None, company_size=None, page=None):
+    """Path and query of a lead search with the given filters (relative to LINKEDIN_BASE_URL)."""
+    filters = []
+    if geo_id:
+        filters.append(_filter('REGION', geo_id, geo_text or ''))
+    bucket = headcount_bucket(company_size)
+    if bucket:
+        filters.append(_filter('COMPANY_HEADCOUNT', *bucket))
+    parts = []
+    if filters:
+        parts.append(f"filters:List({','.join(filters)})")
+    parts.append(f"keywords:{_encode(keywords)}")
+    url = f"{SEARCH_PATH}?query={urllib.parse.quote('(' + ','.join(parts) + ')', safe='(),:')}"
+    if page and page > 1:
+        url += f"&page={page}"
+    return url
+
+
+def parse_search_url(url):
+    """
+    Filters of a lead search URL: {'keywords': str or None, 'filters':
+    {type: [{'id', 'text'}, ...]}}. Empty if the URL has no query expression.
+    """
+    params = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+    query = (params.get('query') or [''])[0]
+    result = {'keywords': None, 'filters': {}}
+    if not query:
+        return result
+    for filter_type, values in _FILTER_RE.findall(query):
+        for value in _VALUE_RE.findall(values):
+            fields = dict(field.split(':', 1) for field in value.split(',') if ':' in field)
+            result['filters'].setdefault(filter_type, []).append({
+                'id': urllib.parse.unquote(fields.get('id', '')),
+                'text': urllib.parse.unquote(fields.get('text', ''))
+            })
+    keywords = re.search(r'keywords:([^,()]*)', _FILTER_RE.sub('', query))
+    if keywords:
+        result['keywords'] = urllib.parse.unquote(keywords.group(1))
+    return result
+
+
+class GeoIdTable:
+    """Geography name -> Sales Navigator geo ID, learned from search URLs and saved as JSON."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._ids = {geo_key(name): geo_id for name, geo_id in json.load(f).items()}
+        except (OSError, ValueError):
+            self._ids = {}
+
+    @classmethod
+    def from_config(cls):
+        return cls(os.path.join(current_app.config['DATA_DIR'], GEO_IDS_FILE))
+
+    def get(self, geo_text):
+        return self._ids.get(geo_key(geo_text))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def learn_from_url(self, url, geo_text=None):
+        """
+        Record the REGION filters of a search URL; returns {name: id} of newly
+        learned ones. `geo_text` is the location the search applied: with a
+        single REGION filter, its ID is filed under that name too.
+        """
+        regions = [value for value in parse_search_url(url)['filters'].get('REGION', []) if value['id'].isdigit()]
+        names = [(value['text'], value['id']) for value in regions]
+        if geo_text and len(regions) == 1:
+            names.append((geo_text, regions[0]['id']))
+        learned = {}
+        for name, geo_id in names:
+            key = geo_key(name)
+            if key and self._ids.get(key) != geo_id:
+                learned[key] = geo_id
+        if learned:
+            with self._lock:
+                self._ids.update(learned)
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._ids, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.path)
+        return learned
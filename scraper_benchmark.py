@@ -0,0 +1,207 @@
+# scraper_benchmark.py
+import json
+import os
+import tempfile
+import time
+from flask import Flask
+
+from browser_pool import close_browser_pool, get_browser_pool
+from debug_artifacts import flush_artifacts
+from linkedin_scraper import linkedin_search
+from har_recording import load_manifest
+from mock_sales_nav_server import start_mock_server
+from request_policy import DEFAULT_RULES
+from sales_nav_urls import GEO_IDS_FILE, GeoIdTable
+
+# Runs linkedin_search end to end against mock_sales_nav_server and reports
+# where the time goes, per stage: launch, login, search, filter, extract
+# (per page), paginate and the parser drain. The first run starts Chromium
+# and logs in; later runs reuse the warm context the way search jobs do, so
+# cold and warm numbers are reported separately. Nothing touches LinkedIn.
+# benchmark_replay does the same against a recorded real session instead.
+# benchmark_blocking_cache compares warm runs with RESOURCE_BLOCKING on and
+# off: routing requests turns off Chromium's HTTP cache, so with blocking on
+# every page load downloads its scripts and stylesheets again.
+
+STAGE_ORDER = ['launch', 'login', 'search', 'filter', 'extract', 'paginate', 'parse_drain', 'parse', 'fallback']
+
+
+def benchmark_config(base_url, data_dir, **overrides):
+    """App config for a headless run against `base_url`."""
+    config = {
+        'DATA_DIR': data_dir,
+        'UPLOAD_FOLDER': os.path.join(data_dir, 'uploads'),
+        'LINKEDIN_BASE_URL': base_url,
+        'LINKEDIN_EMAIL': 'benchmark@example.com',
+        'LINKEDIN_PASSWORD': 'benchmark',
+        'BROWSER_HEADLESS': True,
+        'BROWSER_SLOW_MO': 0,
+        'BROWSER_EXECUTABLE_PATH': os.getenv('BROWSER_EXECUTABLE_PATH', ''),
+        # e.g. DEBUG_ARTIFACTS=full to measure what capturing everything costs
+        'DEBUG_ARTIFACTS': os.getenv('DEBUG_ARTIFACTS', 'on_error'),
+        # RESOURCE_BLOCKING=off to compare against loading every image, font and tracker
+        'RESOURCE_BLOCKING': os.getenv('RESOURCE_BLOCKING', DEFAULT_RULES),
+        'SEARCH_PIPELINE': True,
+        'EXTRACTION_ENGINE': 'in_page',
+        'PIPELINE_EXTRACTION_ENGINE': os.getenv('PIPELINE_EXTRACTION_ENGINE', 'html')
+    }
+    config.update(overrides)
+    return config
+
+
+def benchmark_scraper(runs=3, search_query='VP Sales', max_results=100, selected_state=None, company_size=None,
+                      config=None, **server_options):
+    """
+    Search the mock `runs` times in one browser pool. Returns
+    {'runs': [{run, warm, total_s, profiles, stages, wait_saved_s, server}], 'server': request counters},
+    where each run's `server` holds the mock's counters for that run alone.
+    """
+    server, base_url = start_mock_server(**server_options)
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            results = run_searches(benchmark_config(base_url, data_dir, **(config or {})), runs,
+                                   server_stats=server.state.stats,
+                                   search_query=search_query, max_results=max_results,
+                                   selected_state=selected_state, company_size=company_size)
+    finally:
+        server.shutdown()
+    return dict(results, base_url=base_url, server=dict(server.state.stats))
+
+
+def benchmark_replay(recording, runs=3, config=None):
+    """
+    Replay a HAR recording (see har_recording.py) `runs` times and check
+    each run finds the profiles the recording did. Every run gets a fresh
+    context, so none of them is warm.
+    """
+    manifest = load_manifest(recording)
+    with tempfile.TemporaryDirectory() as data_dir:
+        # Replay must request the URLs the recording did: the same search URL,
+        # and geo IDs it had already learned
+        search_path = manifest.get('search_path') or ''
+        direct = 'query=' in search_path
+        if direct:
+            GeoIdTable(os.path.join(data_dir, GEO_IDS_FILE)).learn_from_url(
+                search_path, geo_text=manifest.get('selected_state'))
+        overrides = dict({'SCRAPER_HAR_MODE': 'replay', 'SCRAPER_HAR_REPLAY': recording,
+                          'SEARCH_URL_DIRECT': direct}, **(config or {}))
+        results = run_searches(benchmark_config(manifest['base_url'], data_dir, **overrides), runs,
+                               search_query=manifest['query'], max_results=manifest['max_results'],
+                               selected_state=manifest.get('selected_state'),
+                               company_size=manifest.get('company_size'))
+    for r in results['runs']:
+        r['warm'] = False
+        r['matches_recording'] = r['profile_names'] == manifest['profile_names']
+    return dict(results, recording=recording, recorded_profiles=manifest['profiles'],
+                recorded_stages=manifest.get('stage_timings', {}))
+
+
+def run_searches(config, runs, server_stats=None, **search):
+    """
+    Run linkedin_search `runs` times in one app context and browser pool,
+    collecting stage timings (and how much of `server_stats` each run used).
+    """
+    results, pool_stats = [], {}
+    app = Flask(__name__)
+    app.config.update(config)
+    with app.app_context():
+        try:
+            for run in range(1, runs + 1):
+                progress = {}
+                before = dict(server_stats or {})
+                start = time.perf_counter()
+                profiles = linkedin_search(progress_callback=lambda **p: progress.update(p),
+                                           save_results=False, allow_sample=False, **search)
+                results.append({
+                    'run': run,
+                    'warm': run > 1,
+                    'total_s': round(time.perf_counter() - start, 3),
+                    'profiles': len(profiles),
+                    'profile_names': [p['name'] for p in profiles],
+                    'stages': progress.get('stage_timings', {}),
+                    'wait_saved_s': progress.get('wait_saved_s', 0),
+                    'requests': progress.get('request_stats', {}),
+                    'server': {key: value - before.get(key, 0) for key, value in (server_stats or {}).items()}
+                })
+            pool_stats = dict(get_browser_pool().stats)
+        finally:
+            close_browser_pool()
+            # Artifacts go to the temporary DATA_DIR
+            flush_artifacts()
+    return {'runs': results, 'browser_pool': pool_stats}
+
+
+def benchmark_blocking_cache(runs=3, max_results=100, **search):
+    """
+    The same searches with RESOURCE_BLOCKING at its default and off. Returns
+    {'blocking': results, 'off': results, 'warm': {label: averages over the warm runs}}.
+    """
+    results = {label: benchmark_scraper(runs=runs, max_results=max_results,
+                                        config={'RESOURCE_BLOCKING': rules}, **search)
+               for label, rules in (('blocking', DEFAULT_RULES), ('off', 'off'))}
+    warm = {}
+    for label, result in results.items():
+        warm_runs = [r for r in result['runs'] if r['warm']] or result['runs']
+        n = len(warm_runs)
+        warm[label] = {
+            'total_s': round(sum(r['total_s'] for r in warm_runs) / n, 3),
+            'static_requests': round(sum(r['server'].get('static', 0) for r in warm_runs) / n, 1),
+            'server_kb': round(sum(r['server'].get('bytes_sent', 0) for r in warm_runs) / n / 1024)
+        }
+    return dict(results, warm=warm)
+
+
+def format_results(results):
+    """Per-run stage table, one row per run."""
+    stages = [s for s in STAGE_ORDER if any(s in r['stages'] for r in results['runs'])]
+    header = f"{'run':>4} {'total':>8} {'profiles':>8} " + ' '.join(f"{s:>11}" for s in stages)
+    lines = [header]
+    for r in results['runs']:
+        cells = []
+        for stage in stages:
+            s = r['stages'].get(stage)
+            cells.append(f"{s['total_s']:>11.3f}" if s else f"{'-':>11}")
+        label = f"{r['run']}{'w' if r['warm'] else 'c'}"
+        lines.append(f"{label:>4} {r['total_s']:>8.3f} {r['profiles']:>8} " + ' '.join(cells))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    #   python scraper_benchmark.py [runs] [max_results] [state] [company_size] [results.json]
+    #   e.g. python scraper_benchmark.py 3 100 "California, United States" 11-50 bench.json
+    #   python scraper_benchmark.py replay <recording dir> [runs] [results.json]
+    #   python scraper_benchmark.py cache [runs] [max_results] [results.json]
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'cache':
+        args = sys.argv[2:] + [None] * 3
+        results = benchmark_blocking_cache(runs=int(args[0] or 3), max_results=int(args[1] or 100))
+        for label in ('blocking', 'off'):
+            warm = results['warm'][label]
+            print(f"RESOURCE_BLOCKING {'default' if label == 'blocking' else 'off'}: warm run {warm['total_s']}s, "
+                  f"{warm['static_requests']} script/stylesheet downloads, {warm['server_kb']} KB from the server")
+        output = args[2]
+    elif len(sys.argv) > 2 and sys.argv[1] == 'replay':
+        args = sys.argv[2:] + [None] * 3
+        results = benchmark_replay(args[0], runs=int(args[1] or 3))
+        print(format_results(results))
+        matched = sum(1 for r in results['runs'] if r['matches_recording'])
+        print(f"{matched}/{len(results['runs'])} runs found the {results['recorded_profiles']} recorded profiles")
+        output = args[2]
+    else:
+        args = sys.argv[1:] + [None] * 5
+        results = benchmark_scraper(runs=int(args[0] or 3), max_results=int(args[1] or 100),
+                                    selected_state=args[2] or None, company_size=args[3] or None)
+        print(format_results(results))
+        print("(c = cold: browser launch and login, w = warm context; seconds per stage)")
+        server = results['server']
+        print(f"Mock server: {server['requests']} requests, {server['api_calls']} search API calls, "
+              f"{server['images']} images, {server['fonts']} fonts, {server['tracking']} tracking beacons, "
+              f"{server['bytes_sent'] / 1024:.0f} KB sent")
+        blocked = sum(r['requests'].get('blocked', 0) for r in results['runs'])
+        print(f"Browser: {blocked} requests blocked (RESOURCE_BLOCKING={os.getenv('RESOURCE_BLOCKING', 'default')})")
+        output = args[4]
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {output}")
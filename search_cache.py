@@ -0,0 +1,94 @@
+# search_cache.py
+import os
+import threading
+from flask import current_app
+
+from data_manager import save_profile_data
+from disk_cache import DiskCache, make_cache_key
+from linkedin_scraper import linkedin_search, create_sample_profiles, report_progress
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_search_cache():
+    """The search result cache for the current app, or None if disabled."""
+    config = current_app.config
+    if not config.get('SEARCH_CACHE_ENABLED', True):
+        return None
+    directory = os.path.join(config['DATA_DIR'], 'cache', 'searches')
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = DiskCache(directory,
+                                           ttl=config.get('SEARCH_CACHE_TTL', 6 * 3600),
+                                           max_entries=config.get('SEARCH_CACHE_MAX_ENTRIES', 200),
+                                           max_bytes=config.get('SEARCH_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+        return _caches[directory]
+
+
+def search_cache_key(search_query, selected_state=None, company_size=None):
+    """Hash of the normalized query and filters; case and spacing don't matter."""
+    query = ' '.join((search_query or '').lower().split())
+    return make_cache_key('search', query, selected_state or None, company_size or None)
+
+
+def get_cached_search(search_query, max_results=20, selected_state=None, company_size=None):
+    """
+    Cached profiles for this search, or None. An entry stored for a larger
+    max_results also answers smaller requests.
+    """
+    cache = get_search_cache()
+    if cache is None:
+        return None
+    entry = cache.get(search_cache_key(search_query, selected_state, company_size))
+    if not entry or entry['max_results'] < max_results:
+        return None
+    return entry['profiles'][:max_results]
+
+
+def cache_search_results(search_query, max_results, selected_state, company_size, profiles):
+    cache = get_search_cache()
+    if cache is not None and profiles:
+        cache.set(search_cache_key(search_query, selected_state, company_size), {
+            'search_query': search_query,
+            'selected_state': selected_state or None,
+            'company_size': company_size or None,
+            'max_results': max_results,
+            'profiles': profiles
+        })
+
+
+def invalidate_search(search_query, selected_state=None, company_size=None):
+    cache = get_search_cache()
+    return bool(cache) and cache.delete(search_cache_key(search_query, selected_state, company_size))
+
+
+def cached_linkedin_search(search_query, max_results=20, selected_state=None, company_size=None,
+                           force_refresh=False, progress_callback=None, profiles_callback=None,
+                           save_results=True, allow_sample=True):
+    """
+    linkedin_search with the result cache in front of it.
+
+    force_refresh skips the lookup and replaces the cached entry with a fresh
+    scrape. Only real results are cached, never the sample-data fallback.
+    """
+    if not force_refresh:
+        profiles = get_cached_search(search_query, max_results, selected_state, company_size)
+        if profiles is not None:
+            print(f"Search cache hit: {len(profiles)} profiles for '{search_query}'")
+            report_progress(progress_callback, stage='cached', profiles=len(profiles))
+            if save_results:
+                save_profile_data(profiles)
+            return profiles
+
+    profiles = linkedin_search(search_query, max_results=max_results, selected_state=selected_state,
+                               company_size=company_size, progress_callback=progress_callback,
+                               profiles_callback=profiles_callback, save_results=False, allow_sample=False)
+    cache_search_results(search_query, max_results, selected_state, company_size, profiles)
+
+    if not profiles and allow_sample:
+        print("No profiles found, returning sample data")
+        profiles = create_sample_profiles(search_query)
+    if save_results:
+        save_profile_data(profiles)
+    return profiles
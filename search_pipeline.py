@@ -0,0 +1,96 @@
+# search_pipeline.py
+import os
+import queue
+import threading
+import time
+
+from results_parser import parse_page_html
+
+_DONE = object()
+
+
+class PageParsePipeline:
+    """
+    Producer/consumer pipeline for paginated searches.
+
+    The browser thread captures each result page's HTML and hands it to
+    submit(), then moves on to the next page; submit only blocks if a page
+    is already waiting behind the one being parsed. A parser thread hands
+    the page text to the search's DebugArtifacts, writes snapshots, parses
+    the HTML with lxml and streams each page's profiles to
+    `on_profiles(page_num, profiles)` as soon as they are ready. Pages
+    submitted with their profiles already extracted (the first page, or
+    every page with an engine that needs the browser) are not parsed again.
+    """
+
+    def __init__(self, max_results=50, on_profiles=None, artifacts=None, snapshot_dir=None):
+        self.max_results = max_results
+        self.on_profiles = on_profiles
+        self.artifacts = artifacts
+        self.snapshot_dir = snapshot_dir
+        # Bounded, so parsing can't fall more than a page behind the browser
+        self._queue = queue.Queue(maxsize=1)
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._worker, name='page-parser', daemon=True)
+        self.parse_seconds = 0.0
+        self._thread.start()
+
+    def submit(self, page_num, html_content, page_text=None, snapshot_name=None, profiles=None):
+        """Queue a captured page for parsing (or just its artifacts, with `profiles`)."""
+        self._queue.put((page_num, html_content, page_text, snapshot_name, profiles))
+
+    @property
+    def profile_count(self):
+        with self._lock:
+            return sum(len(profiles) for profiles in self._pages.values())
+
+    @property
+    def pages_parsed(self):
+        with self._lock:
+            return len(self._pages)
+
+    def _write_artifacts(self, page_num, html_content, page_text, snapshot_name):
+        if self.artifacts:
+            self.artifacts.text(f"sales_nav_page_{page_num}", page_text)
+        if self.snapshot_dir and snapshot_name:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            with open(os.path.join(self.snapshot_dir, f"{snapshot_name}.html"), "w", encoding="utf-8") as f:
+                f.write(html_content)
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                break
+            page_num, html_content, page_text, snapshot_name, profiles = item
+            start = time.perf_counter()
+            try:
+                self._write_artifacts(page_num, html_content, page_text, snapshot_name)
+            except Exception as e:
+                print(f"Error writing artifacts for page {page_num}: {e}")
+            try:
+                if profiles is None:
+                    profiles = parse_page_html(html_content, max_results=self.max_results)
+            except Exception as e:
+                print(f"Error parsing page {page_num}: {e}")
+                profiles = []
+            self.parse_seconds += time.perf_counter() - start
+
+            with self._lock:
+                self._pages[page_num] = profiles
+            print(f"Parsed {len(profiles)} profiles from page {page_num}")
+
+            if self.on_profiles:
+                try:
+                    self.on_profiles(page_num, profiles)
+                except BaseException as e:
+                    # Never let a consumer callback kill the parser thread
+                    print(f"Profiles callback failed for page {page_num}: {e!r}")
+
+    def finish(self, timeout=None):
+        """Wait for queued pages to be parsed; return all profiles in page order."""
+        self._queue.put(_DONE)
+        self._thread.join(timeout)
+        with self._lock:
+            return [p for page_num in sorted(self._pages) for p in self._pages[page_num]]
@@ -0,0 +1,461 @@
+# storage.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+
+from tnl_matcher import normalize_name
+
+# Embedded SQLite store behind data_manager's save_*/load_* functions.
+# Each table keeps the full record as JSON in `data` plus the columns we
+# filter, sort or look up by, which are indexed.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    list TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    profile_url TEXT,
+    connection_level TEXT,
+    location TEXT,
+    tnl_connection INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_profiles_list_position ON profiles (list, position);
+CREATE INDEX IF NOT EXISTS idx_profiles_list_connection_position ON profiles (list, connection_level, position);
+CREATE INDEX IF NOT EXISTS idx_profiles_list_tnl_position ON profiles (list, tnl_connection, position);
+CREATE INDEX IF NOT EXISTS idx_profiles_list_location ON profiles (list, location);
+
+CREATE TABLE IF NOT EXISTS tnl_contacts (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT,
+    name_normalized TEXT,
+    trust_score INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tnl_name_normalized ON tnl_contacts (name_normalized);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    entry_id TEXT,
+    kind TEXT NOT NULL,
+    profile_id INTEGER,
+    status TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_kind_profile ON messages (kind, profile_id);
+CREATE INDEX IF NOT EXISTS idx_messages_kind_status ON messages (kind, status);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_entry_id ON messages (entry_id);
+
+CREATE TABLE IF NOT EXISTS searches (
+    id INTEGER PRIMARY KEY,
+    search_query TEXT,
+    selected_state TEXT,
+    company_size TEXT,
+    max_results INTEGER,
+    profile_count INTEGER,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_searches_created_at ON searches (created_at);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL
+);
+"""
+
+# Profile lists, keyed by the JSON file each one used to live in
+PROFILE_LISTS = {'profiles.json': 'profiles', 'csill.json': 'csill'}
+
+# Message journals, keyed the same way
+MESSAGE_KINDS = {'messages.json': 'messages', 'approved_messages.json': 'approved'}
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def get_db_path():
+    return current_app.config.get('DATABASE_PATH') or os.path.join(current_app.config['DATA_DIR'], 'iclout.db')
+
+
+def get_db():
+    """
+    This thread's connection to the app database. Connections are per thread
+    (sqlite3 objects can't be shared); WAL lets readers in other threads and
+    gunicorn workers proceed while one of them writes.
+    """
+    path = get_db_path()
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=10000')
+        connections[path] = conn
+        with _init_lock:
+            if path not in _initialized:
+                conn.executescript(SCHEMA)
+                # The legacy JSON files live in DATA_DIR, wherever DATABASE_PATH puts the database
+                migrate_json_files(conn, current_app.config['DATA_DIR'])
+                _initialized.add(path)
+    return conn
+
+
+def get_meta(key, default=None):
+    row = get_db().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+    return row['value'] if row else default
+
+
+def set_meta(key, value):
+    conn = get_db()
+    with conn:
+        conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+
+def increment_meta(key):
+    """Atomically add one to an integer meta value (missing counts as 0)."""
+    conn = get_db()
+    with conn:
+        conn.execute("INSERT INTO meta (key, value) VALUES (?, '1') "
+                     "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1", (key,))
+
+
+def _loads(rows):
+    return [json.loads(row['data']) for row in rows]
+
+
+def _page(sql, params, offset, limit):
+    if limit is not None:
+        sql += ' LIMIT ? OFFSET ?'
+        params = list(params) + [limit, offset]
+    elif offset:
+        sql += ' LIMIT -1 OFFSET ?'
+        params = list(params) + [offset]
+    return sql, params
+
+
+# Profiles (search results and the sorted CSILL)
+
+def _profile_row(list_name, position, profile):
+    return (list_name, position, profile.get('name'), profile.get('profile_url'),
+            profile.get('connection_level'), profile.get('location'),
+            1 if profile.get('tnl_connection') else 0, json.dumps(profile))
+
+
+def _replace_profiles(conn, list_name, profiles):
+    conn.execute('DELETE FROM profiles WHERE list = ?', (list_name,))
+    conn.executemany(
+        'INSERT INTO profiles (list, position, name, profile_url, connection_level, location, '
+        'tnl_connection, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        [_profile_row(list_name, i, p) for i, p in enumerate(profiles)])
+
+
+def replace_profiles(list_name, profiles, conn=None, meta=None):
+    """Replace a whole profile list in one transaction, setting the `meta` values in the same one."""
+    conn = conn or get_db()
+    with conn:
+        _replace_profiles(conn, list_name, profiles)
+        for key, value in (meta or {}).items():
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+
+def load_profiles(list_name, offset=0, limit=None):
+    sql, params = _page('SELECT data FROM profiles WHERE list = ? ORDER BY position', [list_name], offset, limit)
+    return _loads(get_db().execute(sql, params))
+
+
+def count_profiles(list_name):
+    return get_db().execute('SELECT COUNT(*) FROM profiles WHERE list = ?', (list_name,)).fetchone()[0]
+
+
+def _profile_filters(list_name, connection_level=None, tnl_connection=None, location=None):
+    sql = ' WHERE list = ?'
+    params = [list_name]
+    if connection_level:
+        sql += ' AND connection_level = ?'
+        params.append(connection_level)
+    if tnl_connection is not None:
+        sql += ' AND tnl_connection = ?'
+        params.append(1 if tnl_connection else 0)
+    if location:
+        sql += " AND location LIKE ? ESCAPE '\\'"
+        escaped = location.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        params.append(f'%{escaped}%')
+    return sql, params
+
+
+def query_profiles(list_name, offset=0, limit=None, connection_level=None, tnl_connection=None, location=None):
+    """
+    One page of a profile list in position order, optionally filtered.
+    Returns (position, profile) pairs; the position is the stable profile_id.
+    """
+    where, params = _profile_filters(list_name, connection_level, tnl_connection, location)
+    sql, params = _page('SELECT position, data FROM profiles' + where + ' ORDER BY position', params, offset, limit)
+    return [(row['position'], json.loads(row['data'])) for row in get_db().execute(sql, params)]
+
+
+def count_filtered_profiles(list_name, connection_level=None, tnl_connection=None, location=None):
+    where, params = _profile_filters(list_name, connection_level, tnl_connection, location)
+    return get_db().execute('SELECT COUNT(*) FROM profiles' + where, params).fetchone()[0]
+
+
+def get_profile(list_name, position):
+    """One profile by its position (the profile_id the routes use), or None."""
+    row = get_db().execute('SELECT data FROM profiles WHERE list = ? AND position = ?',
+                           (list_name, position)).fetchone()
+    return json.loads(row['data']) if row else None
+
+
+# Trusted Network List
+
+def _replace_tnl_contacts(conn, contacts):
+    conn.execute('DELETE FROM tnl_contacts')
+    conn.executemany(
+        'INSERT INTO tnl_contacts (position, name, name_normalized, trust_score, data) VALUES (?, ?, ?, ?, ?)',
+        [(i, c.get('name'), normalize_name(c.get('name')), c.get('trust_score'), json.dumps(c))
+         for i, c in enumerate(contacts)])
+
+
+def replace_tnl_contacts(contacts, conn=None):
+    conn = conn or get_db()
+    with conn:
+        _replace_tnl_contacts(conn, contacts)
+
+
+def load_tnl_contacts(offset=0, limit=None):
+    sql, params = _page('SELECT data FROM tnl_contacts ORDER BY position', [], offset, limit)
+    return _loads(get_db().execute(sql, params))
+
+
+def find_tnl_contacts(name):
+    """TNL entries whose normalized name matches exactly (index lookup)."""
+    return _loads(get_db().execute('SELECT data FROM tnl_contacts WHERE name_normalized = ? ORDER BY position',
+                                   (normalize_name(name),)))
+
+
+# Messages
+
+def _message_row(kind, entry):
+    return (entry.get('id'), kind, entry.get('profile_id'), entry.get('status'), entry.get('timestamp'),
+            json.dumps(entry))
+
+
+def add_message(kind, entry, conn=None):
+    """Insert one message entry; O(1) regardless of how many are stored."""
+    conn = conn or get_db()
+    with conn:
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO messages (entry_id, kind, profile_id, status, timestamp, data) '
+            'VALUES (?, ?, ?, ?, ?, ?)', _message_row(kind, entry))
+    return cursor.lastrowid
+
+
+def add_message_records(records, conn=None):
+    """
+    Insert message journal records ({'kind', 'entry'}) in one transaction.
+    Entries already stored (same entry id) are skipped.
+    """
+    conn = conn or get_db()
+    with conn:
+        conn.executemany(
+            'INSERT OR IGNORE INTO messages (entry_id, kind, profile_id, status, timestamp, data) '
+            'VALUES (?, ?, ?, ?, ?, ?)', [_message_row(r['kind'], r['entry']) for r in records])
+
+
+def _message_filters(kind, profile_id=None, status=None):
+    sql = ' WHERE kind = ?'
+    params = [kind]
+    if profile_id is not None:
+        sql += ' AND profile_id = ?'
+        params.append(profile_id)
+    if status is not None:
+        sql += ' AND status = ?'
+        params.append(status)
+    return sql, params
+
+
+def load_message_entries(kind, offset=0, limit=None, profile_id=None, status=None, newest_first=False):
+    where, params = _message_filters(kind, profile_id, status)
+    order = ' ORDER BY id DESC' if newest_first else ' ORDER BY id'
+    sql, params = _page('SELECT data FROM messages' + where + order, params, offset, limit)
+    return _loads(get_db().execute(sql, params))
+
+
+def count_messages(kind, profile_id=None, status=None):
+    where, params = _message_filters(kind, profile_id, status)
+    return get_db().execute('SELECT COUNT(*) FROM messages' + where, params).fetchone()[0]
+
+
+# Searches
+
+def add_search(search_query, selected_state=None, company_size=None, max_results=None, profile_count=0):
+    conn = get_db()
+    with conn:
+        cursor = conn.execute(
+            'INSERT INTO searches (search_query, selected_state, company_size, max_results, profile_count, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (search_query, selected_state or None, company_size or None, max_results, profile_count,
+             datetime.now().isoformat()))
+    return cursor.lastrowid
+
+
+def load_searches(offset=0, limit=50):
+    sql, params = _page('SELECT * FROM searches ORDER BY created_at DESC, id DESC', [], offset, limit)
+    return [dict(row) for row in get_db().execute(sql, params)]
+
+
+# Background jobs (see job_queue.py), shared by every worker process
+
+def save_job(job):
+    """
+    Insert or update a job's state (a Job.to_record() dict). Returns True if
+    any process has asked for the job to be cancelled.
+    """
+    conn = get_db()
+    with conn:
+        conn.execute(
+            'INSERT INTO jobs (id, kind, status, progress, result, error, created_at, started_at, finished_at, '
+            'updated_at) VALUES (:id, :kind, :status, :progress, :result, :error, :created_at, :started_at, '
+            ':finished_at, :updated_at) '
+            'ON CONFLICT (id) DO UPDATE SET status = excluded.status, progress = excluded.progress, '
+            'result = excluded.result, error = excluded.error, started_at = excluded.started_at, '
+            'finished_at = excluded.finished_at, updated_at = excluded.updated_at',
+            dict(job, progress=json.dumps(job['progress']), result=json.dumps(job['result'], default=str),
+                 updated_at=time.time()))
+        row = conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job['id'],)).fetchone()
+    return bool(row and row['cancel_requested'])
+
+
+def load_job(job_id):
+    row = get_db().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job['progress'] = json.loads(job['progress'] or '{}')
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def touch_jobs(job_ids):
+    """Heartbeat: mark these jobs' owner as alive. Returns the ids of those asked to cancel."""
+    if not job_ids:
+        return set()
+    conn = get_db()
+    now = time.time()
+    with conn:
+        conn.executemany('UPDATE jobs SET updated_at = ? WHERE id = ?', [(now, job_id) for job_id in job_ids])
+        placeholders = ', '.join('?' for _ in job_ids)
+        rows = conn.execute(f'SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN ({placeholders})',
+                            list(job_ids)).fetchall()
+    return {row['id'] for row in rows}
+
+
+def fail_stale_jobs(updated_before, error='worker exited'):
+    """Fail unfinished jobs whose owner stopped sending heartbeats; returns how many."""
+    conn = get_db()
+    with conn:
+        cursor = conn.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+            "WHERE status IN ('pending', 'running') AND COALESCE(updated_at, created_at) < ?",
+            (error, time.time(), updated_before))
+    return cursor.rowcount
+
+
+def request_job_cancel(job_id):
+    """Flag a job for cancellation; the process running it stops at its next progress report."""
+    conn = get_db()
+    with conn:
+        conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+
+
+def delete_finished_jobs(finished_before):
+    conn = get_db()
+    with conn:
+        conn.execute('DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?', (finished_before,))
+
+
+# Migration from the old JSON files
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def migrate_json_files(conn, data_dir):
+    """
+    Import profiles.json, csill.json, trusted_network.json, messages.json and
+    approved_messages.json once. Each file is recorded in `meta` so it is
+    never imported twice; the files themselves are left in place.
+
+    The checks, imports and `meta` flags run in one BEGIN IMMEDIATE
+    transaction, which takes the database's write lock up front, so workers
+    starting together import each file exactly once (legacy messages have
+    no id, so the unique index alone would not catch a second import).
+    """
+    def migrated(filename):
+        return conn.execute('SELECT 1 FROM meta WHERE key = ?', (f'migrated:{filename}',)).fetchone()
+
+    def mark(filename, count):
+        conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (f'migrated:{filename}', str(count)))
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for filename, list_name in PROFILE_LISTS.items():
+            if migrated(filename):
+                continue
+            profiles = _read_json(os.path.join(data_dir, filename))
+            if isinstance(profiles, list):
+                _replace_profiles(conn, list_name, profiles)
+                print(f"Migrated {len(profiles)} profiles from {filename}")
+            mark(filename, len(profiles) if isinstance(profiles, list) else 0)
+
+        if not migrated('trusted_network.json'):
+            contacts = _read_json(os.path.join(data_dir, 'trusted_network.json'))
+            if isinstance(contacts, list):
+                _replace_tnl_contacts(conn, contacts)
+                print(f"Migrated {len(contacts)} TNL contacts from trusted_network.json")
+            mark('trusted_network.json', len(contacts) if isinstance(contacts, list) else 0)
+
+        for filename, kind in MESSAGE_KINDS.items():
+            if migrated(filename):
+                continue
+            messages = _read_json(os.path.join(data_dir, filename))
+            if isinstance(messages, list):
+                conn.executemany(
+                    'INSERT OR IGNORE INTO messages (entry_id, kind, profile_id, status, timestamp, data) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', [_message_row(kind, entry) for entry in messages])
+                print(f"Migrated {len(messages)} messages from {filename}")
+            mark(filename, len(messages) if isinstance(messages, list) else 0)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
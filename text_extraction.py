@@ -0,0 +1,254 @@
+# text_extraction.py
+import hashlib
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+from xml.etree import ElementTree
+from flask import current_app
+
+from disk_cache import DiskCache
+
+# Page-incremental text extraction for uploaded product descriptions. PDFs
+# are laid out one page at a time through pdfminer's TextConverter and
+# .docx bodies are read with iterparse, so only the current page or
+# paragraph is held besides the text collected so far, which is capped at
+# `max_chars`. Large files are extracted in a child process with a timeout;
+# it writes each page as soon as it has it, so a timeout still leaves the
+# pages read so far. Results are cached by file hash. Only PDF pages are
+# real pages and get a form feed between them; the blocks of other formats
+# are joined back into the text they came from.
+
+PAGE_BREAK = '\f'
+
+_WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def iter_pdf_pages(filepath, max_pages=0):
+    """Text of each PDF page, exactly as pdfminer's extract_text lays it out, one page at a time."""
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    with open(filepath, 'rb') as f:
+        buffer = io.StringIO()
+        resources = PDFResourceManager(caching=True)
+        device = TextConverter(resources, buffer, laparams=LAParams())
+        interpreter = PDFPageInterpreter(resources, device)
+        for page in PDFPage.get_pages(f, maxpages=max_pages):
+            interpreter.process_page(page)
+            # TextConverter ends each page with its own form feed
+            text = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            yield text[:-1] if text.endswith(PAGE_BREAK) else text
+        device.close()
+
+
+def iter_docx_paragraphs(filepath):
+    """Paragraph texts of a .docx body, streamed from its XML without building the document tree."""
+    with zipfile.ZipFile(filepath) as archive:
+        with archive.open('word/document.xml') as document:
+            for event, element in ElementTree.iterparse(document, events=('end',)):
+                if element.tag == f"{_WORD_NS}p":
+                    yield ''.join(node.text or '' for node in element.iter(f"{_WORD_NS}t"))
+                    element.clear()
+
+
+def iter_docx_pages(filepath, paragraphs_per_page=50):
+    """.docx has no fixed pages, so paragraphs are batched into pseudo-pages."""
+    batch = []
+    for paragraph in iter_docx_paragraphs(filepath):
+        batch.append(paragraph)
+        if len(batch) >= paragraphs_per_page:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch)
+
+
+def iter_txt_pages(filepath, chars_per_page=64 * 1024):
+    with open(filepath, 'r', encoding='utf-8') as f:
+        while True:
+            block = f.read(chars_per_page)
+            if not block:
+                return
+            yield block
+
+
+def iter_pages(filepath, max_pages=0):
+    """Text of the file page by page; raises ValueError for unsupported formats."""
+    file_ext = filepath.split('.')[-1].lower()
+    if file_ext == 'pdf':
+        return iter_pdf_pages(filepath, max_pages)
+    if file_ext == 'docx':
+        return iter_docx_pages(filepath)
+    if file_ext == 'doc':
+        # Legacy binary Word files: python-docx is all there is (and usually fails)
+        import docx
+        return iter(['\n'.join(paragraph.text for paragraph in docx.Document(filepath).paragraphs)])
+    if file_ext == 'txt':
+        return iter_txt_pages(filepath)
+    raise ValueError(f"Unsupported file format: {file_ext}")
+
+
+def page_separator(filepath):
+    """PAGE_BREAK between PDF pages, nothing between the pseudo-pages of other formats."""
+    return PAGE_BREAK if filepath.split('.')[-1].lower() == 'pdf' else ''
+
+
+def extract_pages_capped(filepath, max_chars=2000000, max_pages=0, on_page=None):
+    """
+    Collect page texts until `max_chars` is reached. Returns
+    {'text', 'pages', 'truncated'}; `on_page(text)` sees each page as it is read.
+    """
+    parts, chars, pages, truncated = [], 0, 0, False
+    for page_text in iter_pages(filepath, max_pages):
+        if chars + len(page_text) > max_chars:
+            page_text = page_text[:max_chars - chars]
+            truncated = True
+        parts.append(page_text)
+        chars += len(page_text)
+        pages += 1
+        if on_page:
+            on_page(page_text)
+        if truncated:
+            break
+    return {'text': page_separator(filepath).join(parts), 'pages': pages, 'truncated': truncated}
+
+
+def file_hash(filepath, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_in_subprocess(filepath, timeout=60, max_chars=2000000, max_pages=0):
+    """
+    Extract in a separate Python process, killing it after `timeout`
+    seconds. Returns the same dict as extract_pages_capped, plus
+    'timed_out'; on a timeout it holds the pages written before the kill.
+    """
+    out_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.txt"
+    command = [sys.executable, os.path.abspath(__file__), filepath, out_path, str(max_chars), str(max_pages)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    timed_out = False
+    # The output file is removed however this ends, failed extractions included
+    try:
+        try:
+            _, stderr = process.communicate(timeout=timeout)
+            if process.returncode != 0:
+                raise RuntimeError(stderr.decode('utf-8', 'replace').strip().splitlines()[-1] if stderr else
+                                   f"extraction exited with {process.returncode}")
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            timed_out = True
+        try:
+            with open(out_path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except FileNotFoundError:
+            text = ''
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        if os.path.exists(out_path):
+            os.remove(out_path)
+
+    # The last page may be cut mid-write by the kill; it's still useful text.
+    # Only PDF pages can be counted; other formats were written without separators.
+    separator = page_separator(filepath)
+    pages = (text.count(separator) + 1 if separator else 1) if text else 0
+    return {'text': text, 'pages': pages,
+            'truncated': timed_out or len(text) >= max_chars, 'timed_out': timed_out}
+
+
+def get_extraction_cache():
+    config = current_app.config
+    directory = os.path.join(config['DATA_DIR'], 'cache', 'extracted')
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = DiskCache(directory, ttl=0,
+                                           max_entries=config.get('TEXT_EXTRACT_CACHE_ENTRIES', 50),
+                                           max_bytes=config.get('TEXT_EXTRACT_CACHE_BYTES', 200 * 1024 * 1024))
+        return _caches[directory]
+
+
+def extract_document_text(filepath):
+    """
+    Text of an uploaded document, from the cache when the same file was
+    extracted before. Files above TEXT_EXTRACT_SUBPROCESS_BYTES are
+    extracted in a child process bounded by TEXT_EXTRACT_TIMEOUT.
+    """
+    config = current_app.config
+    max_chars = config.get('TEXT_EXTRACT_MAX_CHARS', 2000000)
+    max_pages = config.get('TEXT_EXTRACT_MAX_PAGES', 0)
+    cache = get_extraction_cache()
+    key = f"{file_hash(filepath)}-{max_chars}-{max_pages}"
+    entry = cache.get(key)
+    if entry is not None:
+        print(f"Using cached text for {os.path.basename(filepath)} ({entry['pages']} pages)")
+        return entry['text']
+
+    start = time.perf_counter()
+    if os.path.getsize(filepath) >= config.get('TEXT_EXTRACT_SUBPROCESS_BYTES', 512 * 1024):
+        result = extract_in_subprocess(filepath, config.get('TEXT_EXTRACT_TIMEOUT', 60), max_chars, max_pages)
+    else:
+        result = extract_pages_capped(filepath, max_chars, max_pages)
+        result['timed_out'] = False
+    print(f"Extracted {result['pages']} pages ({len(result['text'])} chars) from {os.path.basename(filepath)} "
+          f"in {time.perf_counter() - start:.2f}s"
+          f"{' (timed out)' if result['timed_out'] else ' (truncated)' if result['truncated'] else ''}")
+
+    # A timed-out extraction is partial; let the next upload try again
+    if not result['timed_out']:
+        cache.set(key, {'text': result['text'], 'pages': result['pages'], 'truncated': result['truncated'],
+                        'filename': os.path.basename(filepath)})
+    return result['text']
+
+
+def _run_worker(filepath, out_path, max_chars, max_pages):
+    """Child process: append each page to `out_path` as soon as it is extracted."""
+    separator = page_separator(filepath)
+    with open(out_path, 'w', encoding='utf-8') as out:
+        first = [True]
+
+        def write_page(page_text):
+            if not first[0]:
+                out.write(separator)
+            first[0] = False
+            out.write(page_text)
+            out.flush()
+
+        extract_pages_capped(filepath, max_chars, max_pages, on_page=write_page)
+
+
+if __name__ == '__main__':
+    #   python text_extraction.py <file> <out file> [max_chars] [max_pages]
+    #   python text_extraction.py <file>             (time extraction and print stats)
+    if len(sys.argv) >= 3:
+        _run_worker(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 2000000,
+                    int(sys.argv[4]) if len(sys.argv) > 4 else 0)
+    else:
+        import tracemalloc
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        first_page = None
+        pages = 0
+        for _ in iter_pages(sys.argv[1]):
+            pages += 1
+            first_page = first_page or time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        print(f"{pages} pages in {time.perf_counter() - start:.2f}s (first page after {first_page or 0:.2f}s), "
+              f"peak Python memory {peak / 1024 / 1024:.1f} MB")
@@ -0,0 +1,268 @@
+# tnl_matcher.py
+import re
+import time
+import unicodedata
+from functools import lru_cache
+
+# Deterministic matching of scraped profiles against the Trusted Network
+# List. The TNL is indexed once by normalized name, alias and company; each
+# profile's shared connections are then matched with dict lookups.
+
+HONORIFICS = {'mr', 'mrs', 'ms', 'miss', 'dr', 'prof', 'sir'}
+NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv', 'phd', 'mba', 'md', 'cpa', 'pmp', 'esq'}
+COMPANY_SUFFIXES = {'inc', 'incorporated', 'llc', 'ltd', 'limited', 'corp', 'corporation', 'co', 'company',
+                    'gmbh', 'plc', 'group', 'the'}
+
+# Path weights: a named shared connection is the strongest signal; a TNL
+# contact who works (or worked) at the prospect's company is a weaker one
+MATCH_WEIGHTS = {'name': 1.0, 'alias': 1.0, 'company': 0.6}
+
+_SHARED_COUNT = re.compile(r'^(\d+)\s+(?:shared|mutual)\s+connections?', re.I)
+_SHARED_NAMED = re.compile(r'^(.*?)\s+(?:is\s+a|are)\s+(?:shared|mutual)\s+connections?', re.I)
+_SHARED_NAMED_MORE = re.compile(r'^(.*?)\s+and\s+(\d+)\s+other\s+(?:shared|mutual)\s+connections?', re.I)
+
+
+def _ascii_words(text):
+    text = str(text or '')
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = text.lower()
+    text = re.sub(r'\(.*?\)', ' ', text)
+    return re.sub(r"[^a-z0-9' ]+", ' ', text.replace('-', ' ')).replace("'", '').split()
+
+
+# Names repeat across profiles and TNL syncs, so normalizing is memoized
+@lru_cache(maxsize=65536)
+def normalize_name(name):
+    """'Dr. José  Álvarez-Ruiz, MBA' -> 'jose alvarez ruiz'."""
+    name = str(name or '').split(',')[0]
+    words = [w for w in _ascii_words(name) if w not in HONORIFICS and w not in NAME_SUFFIXES]
+    return ' '.join(words)
+
+
+def short_name(normalized):
+    """First and last word only, so middle names and initials still match."""
+    words = normalized.split()
+    return f"{words[0]} {words[-1]}" if len(words) > 2 else normalized
+
+
+@lru_cache(maxsize=16384)
+def normalize_company(company):
+    words = [w for w in _ascii_words(company) if w not in COMPANY_SUFFIXES]
+    return ' '.join(words)
+
+
+def _split_list(value):
+    """TNL list fields may be lists or ';'/'|'-separated strings (from CSV)."""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [part.strip() for part in re.split(r'[;|]', str(value)) if part.strip()]
+
+
+def parse_shared_connections(text):
+    """
+    Parse a card's shared-connections line. Returns (names, count), e.g.
+    'Jane Doe, John Roe and 3 other mutual connections' -> (['Jane Doe', 'John Roe'], 5).
+    """
+    if not text:
+        return [], 0
+    text = ' '.join(text.split())
+    match = _SHARED_NAMED_MORE.match(text)
+    if match:
+        names = [n.strip() for n in re.split(r',|\band\b', match.group(1)) if n.strip()]
+        return names, len(names) + int(match.group(2))
+    match = _SHARED_NAMED.match(text)
+    if match:
+        names = [n.strip() for n in re.split(r',|\band\b', match.group(1)) if n.strip()]
+        return names, len(names)
+    match = _SHARED_COUNT.match(text)
+    if match:
+        return [], int(match.group(1))
+    return [], 0
+
+
+def profile_company(profile):
+    """Current company from the headline ('VP Sales at Acme' -> 'Acme')."""
+    if profile.get('company'):
+        return profile['company']
+    headline = profile.get('headline') or ''
+    return headline.split(' at ', 1)[1].strip() if ' at ' in headline else ''
+
+
+class TNLIndex:
+    """
+    Hash index over the Trusted Network List.
+
+    Each contact is reachable by its normalized full name, its first+last
+    name, every alias, and every company in its history ('company',
+    'companies', 'past_companies'), so matching a profile costs one dict
+    lookup per shared connection plus one for its company.
+    """
+
+    def __init__(self, trusted_network):
+        self.contacts = list(trusted_network or [])
+        self.by_name = {}
+        self.by_alias = {}
+        self.by_company = {}
+        for i, contact in enumerate(self.contacts):
+            name = normalize_name(contact.get('name'))
+            if name:
+                self.by_name.setdefault(name, i)
+                self.by_name.setdefault(short_name(name), i)
+            for alias in _split_list(contact.get('aliases')):
+                alias = normalize_name(alias)
+                if alias:
+                    self.by_alias.setdefault(alias, i)
+                    self.by_alias.setdefault(short_name(alias), i)
+            companies = _split_list(contact.get('companies')) + _split_list(contact.get('past_companies'))
+            if contact.get('company'):
+                companies.append(contact['company'])
+            for company in {normalize_company(c) for c in companies}:
+                if company:
+                    self.by_company.setdefault(company, []).append(i)
+
+    def __len__(self):
+        return len(self.contacts)
+
+    def lookup_name(self, name):
+        """(contact index, 'name' | 'alias') for a person's name, or (None, None)."""
+        key = normalize_name(name)
+        if not key:
+            return None, None
+        for index, match in ((self.by_name, 'name'), (self.by_alias, 'alias')):
+            i = index.get(key)
+            if i is None:
+                i = index.get(short_name(key))
+            if i is not None:
+                return i, match
+        return None, None
+
+    def _path(self, i, match, via=None):
+        contact = self.contacts[i]
+        score = contact.get('trust_score', 5)
+        try:
+            score = int(score)
+        except (TypeError, ValueError):
+            score = 5
+        path = {
+            'name': contact.get('name'),
+            'in_tnl': True,
+            'tnl_score': score,
+            'match': match,
+            'path_score': round(score * MATCH_WEIGHTS[match], 2)
+        }
+        if via:
+            path['via'] = via
+        return path
+
+    def match_profile(self, profile):
+        """
+        Warm paths for one profile, best first: TNL contacts among its shared
+        connections, then TNL contacts with the profile's company in their
+        history, then the remaining (non-TNL) shared connections.
+        """
+        paths, seen, others = [], set(), []
+        for shared in profile.get('shared_connections') or []:
+            i, match = self.lookup_name(shared)
+            if i is None:
+                others.append({'name': shared, 'in_tnl': False, 'match': 'shared'})
+            elif i not in seen:
+                seen.add(i)
+                paths.append(self._path(i, match))
+
+        company = normalize_company(profile_company(profile))
+        for i in self.by_company.get(company, []) if company else []:
+            if i not in seen:
+                seen.add(i)
+                paths.append(self._path(i, 'company', via=profile_company(profile)))
+
+        # Stable sort: ties keep the order the card listed them in
+        paths.sort(key=lambda p: -p['path_score'])
+        return paths + others
+
+
+def match_profiles(profile_list, trusted_network, index=None):
+    """
+    Annotate every profile with mutual_connections, tnl_connection and
+    best_path_score from the TNL index. Deterministic: the same inputs always
+    give the same output.
+    """
+    index = index or TNLIndex(trusted_network)
+    for profile in profile_list:
+        mutual = index.match_profile(profile)
+        tnl_paths = [m for m in mutual if m['in_tnl']]
+        profile['mutual_connections'] = mutual
+        profile['tnl_connection'] = bool(tnl_paths)
+        profile['best_path_score'] = tnl_paths[0]['path_score'] if tnl_paths else 0
+    return profile_list
+
+
+def _synthetic_data(n_profiles, n_tnl, shared_per_profile):
+    first = ['Ana', 'Ben', 'Chloe', 'Dev', 'Elena', 'Felix', 'Grace', 'Hugo', 'Iris', 'Jon',
+             'Kira', 'Leo', 'Maya', 'Nico', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sam', 'Tara']
+    last = [f"Surname{i}" for i in range(600)]
+    people = [f"{first[i % len(first)]} {last[(i // len(first)) % len(last)]}" for i in range(n_tnl * 2)]
+    companies = [f"Company {i} Inc" for i in range(n_tnl // 5 or 1)]
+    tnl = [{'name': people[i], 'trust_score': 1 + i % 10, 'company': companies[i % len(companies)],
+            'aliases': [f"{people[i]} Jr."]} for i in range(n_tnl)]
+    profiles = []
+    for p in range(n_profiles):
+        # Half of the shared connections are TNL contacts, half are not
+        shared = [people[(p * 7 + k * 13) % len(people)] for k in range(shared_per_profile)]
+        profiles.append({'name': f"Prospect {p}", 'headline': f"VP Sales at {companies[p % len(companies)]}",
+                         'connection_level': '2nd', 'shared_connections': shared})
+    return profiles, tnl
+
+
+def benchmark_matching(n_profiles=10000, n_tnl=5000, shared_per_profile=5, naive_sample=200):
+    """
+    Time index build and matching on synthetic data, against a naive scan of
+    the whole TNL per shared connection (measured on `naive_sample` profiles
+    and extrapolated).
+    """
+    profiles, tnl = _synthetic_data(n_profiles, n_tnl, shared_per_profile)
+
+    start = time.perf_counter()
+    index = TNLIndex(tnl)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    match_profiles(profiles, tnl, index=index)
+    match_s = time.perf_counter() - start
+
+    # The naive scan gets no memoized normalization either
+    normalize = normalize_name.__wrapped__
+    start = time.perf_counter()
+    for profile in profiles[:naive_sample]:
+        for shared in profile['shared_connections']:
+            key = normalize(shared)
+            next((c for c in tnl if normalize(c['name']) == key), None)
+    naive_s = (time.perf_counter() - start) * n_profiles / max(min(naive_sample, n_profiles), 1)
+
+    return {
+        'profiles': n_profiles,
+        'tnl_contacts': n_tnl,
+        'lookups': n_profiles * (shared_per_profile + 1),
+        'tnl_matched_profiles': sum(1 for p in profiles if p['tnl_connection']),
+        'index_build_s': round(build_s, 3),
+        'match_s': round(match_s, 3),
+        'naive_estimate_s': round(naive_s, 1),
+        'speedup': round(naive_s / max(match_s, 1e-9))
+    }
+
+
+if __name__ == '__main__':
+    #   python tnl_matcher.py [n_profiles] [n_tnl]
+    import sys
+
+    n_profiles = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    n_tnl = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    results = benchmark_matching(n_profiles, n_tnl)
+    print(f"Matched {results['profiles']} profiles against {results['tnl_contacts']} TNL contacts "
+          f"({results['tnl_matched_profiles']} with a TNL path)")
+    print(f"Index build: {results['index_build_s']}s, matching: {results['match_s']}s "
+          f"for {results['lookups']} lookups")
+    print(f"Naive scan (estimated): {results['naive_estimate_s']}s, {results['speedup']}x slower")
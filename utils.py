@@ -8,29 +8,15 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
 def extract_text_from_file(filepath):
-    """Extract text from uploaded files (product description)"""
+    """Extract text from uploaded files (product description), page by page and cached by file hash"""
+    from text_extraction import extract_document_text
+
     file_ext = filepath.split('.')[-1].lower()
-    
+    if file_ext not in ['pdf', 'docx', 'doc', 'txt']:
+        return "Unsupported file format. Please upload a PDF, DOCX, DOC, or TXT file."
+
     try:
-        if file_ext == 'pdf':
-            # For PDF files
-            from pdfminer.high_level import extract_text
-            return extract_text(filepath)
-            
-        elif file_ext in ['docx', 'doc']:
-            # For Word documents
-            import docx
-            doc = docx.Document(filepath)
-            return '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-            
-        elif file_ext == 'txt':
-            # For text files
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return f.read()
-                
-        else:
-            return "Unsupported file format. Please upload a PDF, DOCX, DOC, or TXT file."
-            
+        return extract_document_text(filepath)
     except Exception as e:
         print(f"Error extracting text: {e}")
         return ""
@@ -0,0 +1,362 @@
+# warm_paths.py
+import heapq
+import threading
+import time
+from array import array
+
+from tnl_matcher import TNLIndex, normalize_name, short_name, normalize_company, profile_company, _split_list
+
+# Intro paths as a weighted graph: the user -> people the user knows (TNL
+# contacts and other shared connections) -> prospects. Edge weights are
+# costs, so the warmest path is the shortest one.
+
+USER = 0
+
+DIRECT_COST = 1.0           # user -> 1st-degree prospect
+SHARED_CONTACT_COST = 4.0   # user -> a shared connection outside the TNL
+MATCH_COSTS = {'name': 1.0, 'alias': 1.0, 'company': 2.0, 'shared': 1.0}
+
+
+def trust_cost(trust_score):
+    """Trust 10 -> 1.0 ... trust 1 -> 4.0."""
+    try:
+        trust = min(max(int(trust_score), 1), 10)
+    except (TypeError, ValueError):
+        trust = 5
+    return 1.0 + (10 - trust) / 3.0
+
+
+def profile_key(profile):
+    url = profile.get('profile_url') or ''
+    if url and url.rstrip('/') != 'https://www.linkedin.com/sales':
+        return url
+    return f"{normalize_name(profile.get('name'))}|{profile.get('headline') or ''}"
+
+
+def _contact_signature(contact):
+    return (contact.get('trust_score'), tuple(_split_list(contact.get('aliases'))),
+            tuple(_split_list(contact.get('companies'))), tuple(_split_list(contact.get('past_companies'))),
+            contact.get('company'))
+
+
+def _profile_signature(profile):
+    return (profile.get('connection_level'), tuple(profile.get('shared_connections') or []),
+            profile_company(profile))
+
+
+class WarmPathGraph:
+    """
+    Weighted intro graph with per-prospect path caching.
+
+    Edges live in per-node dicts so the TNL and profiles can change one at a
+    time; searches run over a compact reverse adjacency (CSR arrays) compiled
+    from them when stale. sync() diffs the TNL and profile list against the
+    last call, only re-matches and invalidates the prospects whose edges
+    actually changed, and drops the nodes of whatever left both lists.
+    """
+
+    def __init__(self, k=3):
+        self.k = k
+        self.node_keys = [('user', None)]
+        self.node_ids = {('user', None): USER}
+        self.labels = ['You']
+        self.out_edges = [{}]
+        self.in_sources = [set()]
+        self.contacts = {}            # normalized name -> (signature, contact)
+        self.prospects = {}           # profile key -> (signature, mutual connections)
+        self.name_refs = {}           # normalized shared-connection name -> {profile keys}
+        self.company_refs = {}        # normalized company -> {profile keys}
+        self.prospect_refs = {}       # profile key -> (name keys, company key)
+        self.index = TNLIndex([])
+        self._path_cache = {}
+        self._csr = None
+        self._lock = threading.RLock()
+        self.stats = {'syncs': 0, 'rematched': 0, 'pruned': 0, 'path_hits': 0, 'path_misses': 0}
+
+    # Nodes and edges
+
+    def _node(self, kind, key, label=None):
+        node = self.node_ids.get((kind, key))
+        if node is None:
+            node = len(self.node_keys)
+            self.node_ids[(kind, key)] = node
+            self.node_keys.append((kind, key))
+            self.labels.append(label or key)
+            self.out_edges.append({})
+            self.in_sources.append(set())
+            self._csr = None
+        elif label:
+            self.labels[node] = label
+        return node
+
+    def _set_edge(self, source, target, cost):
+        if self.out_edges[source].get(target) != cost:
+            self.out_edges[source][target] = cost
+            self.in_sources[target].add(source)
+            self._csr = None
+
+    def _remove_edge(self, source, target):
+        if self.out_edges[source].pop(target, None) is not None:
+            self.in_sources[target].discard(source)
+            self._csr = None
+
+    def _prune_nodes(self):
+        """
+        Drop nodes of contacts and prospects that are gone, and shared
+        connections no prospect links to any more, renumbering the rest.
+        """
+        live = [node for node, (kind, key) in enumerate(self.node_keys)
+                if kind == 'user' or (kind == 'contact' and key in self.contacts)
+                or (kind == 'prospect' and key in self.prospects)
+                or (kind == 'shared' and self.out_edges[node])]
+        if len(live) == len(self.node_keys):
+            return
+        remap = {old: new for new, old in enumerate(live)}
+        self.stats['pruned'] += len(self.node_keys) - len(live)
+        self.node_keys = [self.node_keys[node] for node in live]
+        self.node_ids = {key: node for node, key in enumerate(self.node_keys)}
+        self.labels = [self.labels[node] for node in live]
+        self.out_edges = [{remap[t]: cost for t, cost in self.out_edges[node].items() if t in remap}
+                          for node in live]
+        self.in_sources = [{remap[s] for s in self.in_sources[node] if s in remap} for node in live]
+        self._csr = None
+
+    def _compile(self):
+        """Reverse adjacency as CSR arrays: in-edges of node n are rev_sources[offsets[n]:offsets[n+1]]."""
+        n = len(self.node_keys)
+        incoming = [[] for _ in range(n)]
+        for source, edges in enumerate(self.out_edges):
+            for target, cost in edges.items():
+                incoming[target].append((source, cost))
+        offsets = array('l', [0]) * (n + 1)
+        sources = array('l')
+        costs = array('d')
+        for node in range(n):
+            for source, cost in incoming[node]:
+                sources.append(source)
+                costs.append(cost)
+            offsets[node + 1] = len(sources)
+        self._csr = (offsets, sources, costs)
+        return self._csr
+
+    # Incremental updates
+
+    def _affected_by_contact(self, name, contact):
+        """Prospects whose matches may involve this contact."""
+        keys = set()
+        names = {name} | {normalize_name(a) for a in _split_list(contact.get('aliases'))}
+        for n in names:
+            # Prospects are filed under full and first+last names, so any
+            # pair TNLIndex can match shares one of these keys
+            keys |= self.name_refs.get(n, set())
+            keys |= self.name_refs.get(short_name(n), set())
+        companies = _split_list(contact.get('companies')) + _split_list(contact.get('past_companies'))
+        if contact.get('company'):
+            companies.append(contact['company'])
+        for company in companies:
+            keys |= self.company_refs.get(normalize_company(company), set())
+        node = self.node_ids.get(('contact', name))
+        if node is not None:
+            keys |= {self.node_keys[t][1] for t in self.out_edges[node]}
+        return keys
+
+    def _sync_contacts(self, trusted_network):
+        current = {}
+        for contact in trusted_network or []:
+            name = normalize_name(contact.get('name'))
+            if name and name not in current:
+                current[name] = (_contact_signature(contact), contact)
+
+        affected = set()
+        changed = False
+        for name, (signature, contact) in current.items():
+            old = self.contacts.get(name)
+            if old and old[0] == signature:
+                continue
+            changed = True
+            node = self._node('contact', name, contact.get('name'))
+            self._set_edge(USER, node, trust_cost(contact.get('trust_score', 5)))
+            affected |= self._affected_by_contact(name, contact)
+            if old:
+                affected |= self._affected_by_contact(name, old[1])
+        for name in set(self.contacts) - set(current):
+            changed = True
+            affected |= self._affected_by_contact(name, self.contacts[name][1])
+            self._remove_edge(USER, self.node_ids[('contact', name)])
+
+        if changed:
+            self.index = TNLIndex([contact for _, contact in current.values()])
+        self.contacts = current
+        return affected
+
+    def _unlink_prospect(self, key):
+        node = self.node_ids.get(('prospect', key))
+        if node is None:
+            return
+        for source in list(self.in_sources[node]):
+            self._remove_edge(source, node)
+        name_keys, company = self.prospect_refs.pop(key, ((), None))
+        for name in name_keys:
+            self.name_refs.get(name, set()).discard(key)
+        if company:
+            self.company_refs.get(company, set()).discard(key)
+        self._path_cache.pop(key, None)
+
+    def _link_prospect(self, key, profile):
+        node = self._node('prospect', key, profile.get('name'))
+        name_keys = set()
+        for shared in profile.get('shared_connections') or []:
+            name = normalize_name(shared)
+            name_keys |= {name, short_name(name)} if name else set()
+        for name in name_keys:
+            self.name_refs.setdefault(name, set()).add(key)
+        company = normalize_company(profile_company(profile))
+        if company:
+            self.company_refs.setdefault(company, set()).add(key)
+        self.prospect_refs[key] = (name_keys, company)
+
+        if profile.get('connection_level') == '1st':
+            self._set_edge(USER, node, DIRECT_COST)
+            mutual = []
+        else:
+            mutual = self.index.match_profile(profile)
+            for path in mutual:
+                name = normalize_name(path['name'])
+                if path['in_tnl']:
+                    via = self._node('contact', name, path['name'])
+                else:
+                    via = self._node('shared', name, path['name'])
+                    self._set_edge(USER, via, SHARED_CONTACT_COST)
+                self._set_edge(via, node, MATCH_COSTS[path['match']])
+        self._path_cache.pop(key, None)
+        self.stats['rematched'] += 1
+        return mutual
+
+    def sync(self, profiles, trusted_network):
+        """Bring the graph up to date with these profiles and this TNL."""
+        with self._lock:
+            self.stats['syncs'] += 1
+            affected = self._sync_contacts(trusted_network)
+
+            current = {}
+            for profile in profiles:
+                current[profile_key(profile)] = profile
+            for key in set(self.prospects) - set(current):
+                self._unlink_prospect(key)
+                del self.prospects[key]
+
+            for key, profile in current.items():
+                signature = _profile_signature(profile)
+                old = self.prospects.get(key)
+                if old and old[0] == signature and key not in affected:
+                    continue
+                self._unlink_prospect(key)
+                self.prospects[key] = (signature, self._link_prospect(key, profile))
+
+            # Contacts whose trust changed alter path costs without re-matching
+            for key in affected & set(current):
+                self._path_cache.pop(key, None)
+
+            self._prune_nodes()
+
+    # Queries
+
+    def mutual_connections(self, profile):
+        entry = self.prospects.get(profile_key(profile))
+        return [dict(m) for m in entry[1]] if entry else []
+
+    def k_shortest_paths(self, target, k=None):
+        """
+        The k cheapest user -> target paths, as (cost, [node, ...]) from the
+        user. Dijkstra over the reverse CSR from the target, letting each
+        node settle up to k times.
+        """
+        k = k or self.k
+        offsets, sources, costs = self._csr or self._compile()
+        settled = {}
+        paths = []
+        heap = [(0.0, target, (target,))]
+        while heap and len(paths) < k:
+            cost, node, path = heapq.heappop(heap)
+            if settled.get(node, 0) >= k:
+                continue
+            settled[node] = settled.get(node, 0) + 1
+            if node == USER:
+                paths.append((round(cost, 3), list(reversed(path))))
+                continue
+            for i in range(offsets[node], offsets[node + 1]):
+                source = sources[i]
+                if source not in path:
+                    heapq.heappush(heap, (cost + costs[i], source, path + (source,)))
+        return paths
+
+    def best_paths(self, profile, k=None):
+        """Cached warm paths to one prospect: [{'cost', 'via': [names]}, ...]."""
+        key = profile_key(profile)
+        with self._lock:
+            cached = self._path_cache.get(key)
+            if cached is not None:
+                self.stats['path_hits'] += 1
+                return cached
+            self.stats['path_misses'] += 1
+            node = self.node_ids.get(('prospect', key))
+            paths = []
+            if node is not None:
+                for cost, nodes in self.k_shortest_paths(node, k):
+                    paths.append({'cost': cost, 'via': [self.labels[n] for n in nodes[1:-1]]})
+            self._path_cache[key] = paths
+            return paths
+
+
+def rank_by_warm_paths(profile_list, trusted_network, graph=None):
+    """Annotate profiles with mutual connections and warm paths from the graph."""
+    graph = graph or WarmPathGraph()
+    graph.sync(profile_list, trusted_network)
+    for profile in profile_list:
+        mutual = graph.mutual_connections(profile)
+        paths = graph.best_paths(profile)
+        profile['mutual_connections'] = mutual
+        profile['tnl_connection'] = any(m['in_tnl'] for m in mutual)
+        profile['warm_paths'] = paths
+        profile['path_cost'] = paths[0]['cost'] if paths else None
+    return profile_list
+
+
+def benchmark_warm_paths(n_profiles=10000, n_tnl=5000):
+    """Full rank on synthetic data, then re-rank after changing one TNL contact."""
+    from tnl_matcher import _synthetic_data
+
+    profiles, tnl = _synthetic_data(n_profiles, n_tnl, 5)
+    graph = WarmPathGraph()
+
+    start = time.perf_counter()
+    rank_by_warm_paths(profiles, tnl, graph)
+    full_s = time.perf_counter() - start
+
+    tnl[0] = dict(tnl[0], trust_score=10 if tnl[0].get('trust_score') != 10 else 1)
+    rematched = graph.stats['rematched']
+    start = time.perf_counter()
+    rank_by_warm_paths(profiles, tnl, graph)
+    incremental_s = time.perf_counter() - start
+
+    return {
+        'profiles': n_profiles,
+        'tnl_contacts': n_tnl,
+        'nodes': len(graph.node_keys),
+        'edges': sum(len(edges) for edges in graph.out_edges),
+        'full_rank_s': round(full_s, 3),
+        'incremental_rank_s': round(incremental_s, 3),
+        'rematched_after_change': graph.stats['rematched'] - rematched
+    }
+
+
+if __name__ == '__main__':
+    #   python warm_paths.py [n_profiles] [n_tnl]
+    import sys
+
+    results = benchmark_warm_paths(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+                                   int(sys.argv[2]) if len(sys.argv) > 2 else 5000)
+    print(f"Graph: {results['nodes']} nodes, {results['edges']} edges "
+          f"({results['profiles']} prospects, {results['tnl_contacts']} TNL contacts)")
+    print(f"Full rank: {results['full_rank_s']}s; after one TNL change: {results['incremental_rank_s']}s "
+          f"({results['rematched_after_change']} prospects re-matched)")